@@ -0,0 +1,315 @@
+"""
+Bulk-ingest every supported file under a directory, without going through /upload.
+
+Files are hashed, parsed and OCR'd by a process pool; their chunks are
+embedded and written to Chroma in large batches by this process. Progress is
+checkpointed per file, so re-running the same command after an interruption
+skips everything already ingested (and files unchanged since a failure,
+unless --retry-failed).
+
+Stop the API server first when it uses the embedded Chroma store, or point
+both at a Chroma server (CHROMA_HOST).
+
+Run from the backend directory:
+
+    python -m app.bulk_ingest /archive/pdfs --workers 8
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+
+from app.config import settings
+from app.services.chunker import TextChunker
+from app.services.doc_registry import DocumentRegistry
+from app.services.document_processor import SUPPORTED_EXTENSIONS, DocumentProcessor
+from app.services.document_removal import remove_document
+from app.services.embedding_server import EmbeddingClient, load_authkey, parse_address
+from app.services.ingest_checkpoint import IngestCheckpoint
+from app.services.lexical_index import LexicalIndex
+from app.services.llm_cache import LLMResponseCache
+from app.services.metadata_store import MetadataStore
+from app.services.vector_service import VectorService
+
+logger = logging.getLogger("bulk_ingest")
+
+HASH_BLOCK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 10.0  # Seconds between progress log lines
+
+# Per-process state of pool workers, set up by _init_worker
+_processor: Optional[DocumentProcessor] = None
+_metadata_store: Optional[MetadataStore] = None
+
+def _init_worker():
+    global _processor, _metadata_store
+    logging.basicConfig(level=logging.WARNING)
+    # One OCR thread per process: the pool already spreads files across cores
+    _processor = DocumentProcessor(
+        ocr_dpi=settings.OCR_DPI,
+        ocr_workers=1,
+        ocr_batch_pages=settings.OCR_BATCH_PAGES,
+        chunker=TextChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.EMBEDDING_MODEL),
+        pdf_extractor=settings.PDF_EXTRACTOR
+    )
+    _metadata_store = MetadataStore(settings.METADATA_DB_PATH)
+
+def _process_file(path: str, doc_id: str) -> Dict:
+    """Hash a file and, unless that content is already ingested, parse and chunk it (runs in a pool worker)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+
+    existing = _metadata_store.find_by_hash(content_hash)
+    if existing:
+        return {"path": path, "content_hash": content_hash, "duplicate_of": existing["doc_id"]}
+
+    processed = _processor.process_document(path, doc_id)
+    return {"path": path, "content_hash": content_hash, "processed": processed}
+
+def discover(root: str, extensions) -> Iterator[str]:
+    """Supported files under root, in a stable order"""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in extensions:
+                yield os.path.abspath(os.path.join(directory, filename))
+
+class BulkIngester:
+    """Feeds a directory through the process pool and writes the results to the stores in batches"""
+
+    def __init__(self, vector_service: VectorService, metadata_store: MetadataStore, checkpoint: IngestCheckpoint,
+                 workers: int, batch_chunks: int, retry_failed: bool = False,
+                 llm_cache: Optional[LLMResponseCache] = None):
+        self.vector_service = vector_service
+        self.metadata_store = metadata_store
+        # The API server's response cache, so answers built from removed documents go with them
+        self.llm_cache = llm_cache
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.batch_chunks = batch_chunks
+        self.retry_failed = retry_failed
+
+        self.stats = {"files": 0, "skipped": 0, "done": 0, "duplicate": 0, "failed": 0, "chunks": 0}
+        self._buffer: List[Dict] = []
+        self._buffered_chunks = 0
+        self._hashes_this_run: Dict[str, str] = {}
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def recover(self):
+        """Remove partial writes of files that were in flight when a previous run stopped"""
+        interrupted = self.checkpoint.with_status("pending")
+        for entry in interrupted:
+            remove_document(entry["doc_id"], self.vector_service, self.metadata_store, self.llm_cache)
+        if interrupted:
+            logger.info(f"Rolled back {len(interrupted)} files left pending by an interrupted run")
+
+    def _should_skip(self, path: str, previous: Optional[Dict], size: int, mtime: float) -> bool:
+        if previous is None or previous["size"] != size or previous["mtime"] != mtime:
+            return False
+        if previous["status"] in ("done", "duplicate"):
+            return True
+        return previous["status"] == "failed" and not self.retry_failed
+
+    def _retire(self, previous: Optional[Dict]):
+        """Remove the document ingested from an earlier version of a file that is about to be re-ingested"""
+        if previous is None or previous["status"] != "done" or not previous["doc_id"]:
+            return
+        # Other files marked as duplicates of it still point at that document
+        if self.checkpoint.is_referenced(previous["doc_id"], exclude_path=previous["path"]):
+            return
+        remove_document(previous["doc_id"], self.vector_service, self.metadata_store, self.llm_cache)
+
+    def run(self, root: str, extensions=SUPPORTED_EXTENSIONS) -> Dict:
+        self.recover()
+        previous = self.checkpoint.load()
+        files: Dict[str, Dict] = {}
+
+        # Bound in-flight files so parsed chunks don't pile up in memory ahead of the embedder
+        max_in_flight = self.workers * 4
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker) as pool:
+            in_flight: Dict = {}  # future -> path
+            for path in discover(root, extensions):
+                stat = os.stat(path)
+                self.stats["files"] += 1
+                if self._should_skip(path, previous.get(path), stat.st_size, stat.st_mtime):
+                    self.stats["skipped"] += 1
+                    continue
+
+                self._retire(previous.get(path))
+                files[path] = {"path": path, "size": stat.st_size, "mtime": stat.st_mtime,
+                               "doc_id": f"DOC_{uuid.uuid4().hex[:8]}"}
+                in_flight[pool.submit(_process_file, path, files[path]["doc_id"])] = path
+                if len(in_flight) >= max_in_flight:
+                    self._collect(in_flight, files)
+
+            while in_flight:
+                self._collect(in_flight, files)
+        self._flush()
+
+        return self.summary()
+
+    def _collect(self, in_flight: Dict, files: Dict[str, Dict]):
+        """Handle whichever in-flight files finish next"""
+        finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in finished:
+            entry = files.pop(in_flight.pop(future))
+            try:
+                result = future.result()
+            except Exception as e:
+                # Unreadable file, or a worker process that died
+                logger.error(f"Failed to process {entry['path']}: {str(e)}")
+                self._finish([entry], "failed", error=str(e))
+                continue
+            entry["content_hash"] = result["content_hash"]
+
+            # Same content already ingested, by the app or earlier in this run
+            duplicate_of = result.get("duplicate_of") or self._hashes_this_run.get(result["content_hash"])
+            if duplicate_of:
+                self._finish([{**entry, "doc_id": duplicate_of}], "duplicate")
+                continue
+
+            processed = result["processed"]
+            if processed.get("error") or not processed.get("content"):
+                self._finish([entry], "failed", error=processed.get("error") or "No text extracted")
+                continue
+
+            self._hashes_this_run[result["content_hash"]] = entry["doc_id"]
+            entry["processed"] = processed
+            self._buffer.append(entry)
+            self._buffered_chunks += len(processed["content"])
+            if self._buffered_chunks >= self.batch_chunks:
+                self._flush()
+        self._report()
+
+    def _flush(self):
+        """Embed and write the buffered documents in one batch"""
+        if not self._buffer:
+            return
+        batch, self._buffer, self._buffered_chunks = self._buffer, [], 0
+
+        # Recorded before writing, so a crash mid-write is rolled back by the next run
+        self.checkpoint.mark({**entry, "status": "pending"} for entry in batch)
+        if self.vector_service.add_documents([entry["processed"] for entry in batch]):
+            written = batch
+        else:
+            # One bad document fails the whole batch; retry one by one to isolate it
+            written = []
+            for entry in batch:
+                self.vector_service.delete_document(entry["doc_id"])
+                if self.vector_service.add_document(entry["processed"]):
+                    written.append(entry)
+                else:
+                    self._finish([entry], "failed", error="Failed to add to vector database")
+
+        now = time.time()
+        for entry in written:
+            processed = entry["processed"]
+            self.metadata_store.upsert_document(
+                entry["doc_id"],
+                filename=os.path.basename(entry["path"]),
+                # Not file_path: that is an upload the app owns and deletes along with the document
+                source_path=entry["path"],
+                content_hash=entry["content_hash"],
+                total_pages=processed.get("total_pages", 1),
+                chunk_count=len(processed["content"]),
+                created_at=now,
+                ingested_at=now
+            )
+            entry["chunks"] = len(processed["content"])
+            self.stats["chunks"] += entry["chunks"]
+        self._finish(written, "done")
+
+    def _finish(self, entries: List[Dict], status: str, error: Optional[str] = None):
+        self.checkpoint.mark({**entry, "status": status, "error": error} for entry in entries)
+        self.stats[status] += len(entries)
+
+    def _report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            summary = self.summary()
+            logger.info(
+                f"{summary['done']} ingested, {summary['duplicate']} duplicates, {summary['failed']} failed, "
+                f"{summary['skipped']} skipped: {summary['files_per_second']} files/sec, "
+                f"{summary['chunks_per_second']} chunks/sec"
+            )
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self._start
+        processed = self.stats["done"] + self.stats["duplicate"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "seconds": round(elapsed, 1),
+            "files_per_second": round(processed / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(self.stats["chunks"] / elapsed, 1) if elapsed else 0.0
+        }
+
+def build_vector_service() -> VectorService:
+    embedding_service = None
+    if settings.EMBEDDING_SERVER_ADDRESS:
+        embedding_service = EmbeddingClient(
+            parse_address(settings.EMBEDDING_SERVER_ADDRESS),
+            load_authkey(settings.EMBEDDING_SERVER_AUTHKEY, settings.EMBEDDING_SERVER_AUTHKEY_FILE),
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            request_timeout=settings.EMBEDDING_SERVER_TIMEOUT
+        )
+    return VectorService(
+        settings.CHROMA_DB_PATH,
+        settings.EMBEDDING_MODEL,
+        embedding_batch_size=settings.EMBEDDING_BATCH_SIZE,
+        embedding_backend=settings.EMBEDDING_BACKEND,
+        onnx_dir=settings.EMBEDDING_ONNX_DIR,
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        registry=DocumentRegistry(settings.DOC_REGISTRY_PATH),
+        lexical_index=LexicalIndex(settings.LEXICAL_INDEX_PATH),
+        embedding_service=embedding_service
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parse/OCR processes")
+    parser.add_argument("--batch-chunks", type=int, default=settings.BULK_INGEST_BATCH_CHUNKS,
+                        help="Chunks embedded and written per batch")
+    parser.add_argument("--checkpoint", default=settings.BULK_INGEST_CHECKPOINT_PATH)
+    parser.add_argument("--retry-failed", action="store_true", help="Retry files that failed in earlier runs")
+    parser.add_argument("--extensions", default=",".join(SUPPORTED_EXTENSIONS),
+                        help="Comma-separated extensions to ingest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+
+    ingester = BulkIngester(
+        build_vector_service(),
+        MetadataStore(settings.METADATA_DB_PATH),
+        IngestCheckpoint(args.checkpoint),
+        workers=max(1, args.workers),
+        batch_chunks=args.batch_chunks,
+        retry_failed=args.retry_failed,
+        llm_cache=LLMResponseCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_BYTES) if settings.LLM_CACHE_ENABLED else None
+    )
+    extensions = tuple(ext if ext.startswith(".") else f".{ext}" for ext in args.extensions.lower().split(","))
+    try:
+        summary = ingester.run(args.directory, extensions)
+    except KeyboardInterrupt:
+        # Files written so far are checkpointed; anything pending is rolled back on the next run
+        print(json.dumps({"interrupted": True, **ingester.summary()}, indent=2))
+        sys.exit(130)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
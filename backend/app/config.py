@@ -10,18 +10,100 @@ class Settings:
     # Database settings
     CHROMA_DB_PATH = "./data/chroma_db"
     UPLOAD_DIR = "./data/uploads"
+    LLM_CACHE_PATH = "./data/llm_cache.sqlite3"
+    METADATA_DB_PATH = "./data/metadata.sqlite3"
+    DOC_REGISTRY_PATH = "./data/doc_registry.sqlite3"
+    LEXICAL_INDEX_PATH = "./data/lexical_index.sqlite3"
+    
+    # Set these to use a Chroma server instead of the embedded store. The embedded
+    # store keeps its HNSW index in process memory, so it is single-process only;
+    # running uvicorn with --workers N needs a shared Chroma server.
+    CHROMA_HOST = os.getenv("CHROMA_HOST")
+    CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
     
     # Model settings
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE = 64
+    # torch (sentence-transformers, fp32), onnx (ONNX Runtime, fp32) or onnx-int8 (ONNX Runtime,
+    # int8-quantized weights; fastest on CPU). Check accuracy with benchmarks.embedding_benchmark
+    # before switching, and re-ingest so stored and query vectors come from the same backend.
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_ONNX_DIR = "./data/onnx"  # Exported and quantized ONNX models
+    # Set to share one embedding model between processes (uvicorn --workers N, bulk ingest):
+    # a Unix socket path or "host:port" where python -m app.services.embedding_server listens
+    EMBEDDING_SERVER_ADDRESS = os.getenv("EMBEDDING_SERVER_ADDRESS")
+    EMBEDDING_SERVER_SOCKET = "./data/embedding_server.sock"  # Where the server listens when no address is set
+    # Handshake secret. Server messages are pickles, so whoever holds it can run code in the server.
+    # Unset: the server generates one into EMBEDDING_SERVER_AUTHKEY_FILE (owner-only) for local clients.
+    EMBEDDING_SERVER_AUTHKEY = os.getenv("EMBEDDING_SERVER_AUTHKEY")
+    EMBEDDING_SERVER_AUTHKEY_FILE = "./data/embedding_server.key"
+    EMBEDDING_SERVER_MAX_BATCH = 256  # Texts the server encodes in one model call
+    EMBEDDING_SERVER_MAX_WAIT_MS = 5.0  # How long the server waits for more requests to batch together
+    EMBEDDING_SERVER_TIMEOUT = 60.0  # Seconds a client waits for an answer before failing the request
     GEMINI_MODEL = "models/gemini-1.5-flash"
     
     # Processing settings
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    CHUNK_SIZE = 1000
-    CHUNK_OVERLAP = 200
+    MAX_UPLOAD_REQUEST_SIZE = 200 * 1024 * 1024  # Whole /upload request body, checked before it is read
+    UPLOAD_CONCURRENCY = 4  # Files of one upload request saved at the same time
+    # Chunk sizes are in embedding-model tokens; all-MiniLM-L6-v2 truncates input at 256
+    # tokens (including special tokens), so anything longer would never be embedded
+    CHUNK_SIZE = 250
+    CHUNK_OVERLAP = 48
+    INGEST_WORKERS = 2  # Background ingestion worker threads
+    # Chunks embedded and written at a time while the rest of a document is still being parsed
+    INGEST_STREAM_WINDOW = 256
+    # PDF text-layer extraction: pypdf2 (pure Python), pymupdf (fast, C; AGPL-3.0, opt-in via
+    # requirements-pymupdf.txt) or auto (pymupdf if installed)
+    PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "pypdf2")
+    BULK_INGEST_CHECKPOINT_PATH = "./data/bulk_ingest.sqlite3"  # Per-file progress of python -m app.bulk_ingest
+    BULK_INGEST_BATCH_CHUNKS = 4096  # Chunks embedded and written to Chroma per bulk write
+    
+    # Query cache settings
+    QUERY_CACHE_MAX_ENTRIES = 256  # Cached search result lists
+    QUERY_CACHE_TTL = 600.0  # Seconds
+    
+    # Retrieval settings
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")  # vector, lexical or hybrid
+    LEXICAL_BUDGET_MS = 50.0  # Hybrid search drops BM25 results that take longer than this
+    RRF_K = 60  # Reciprocal rank fusion damping constant
+    RETRIEVAL_CANDIDATES = 50  # Chunks fetched per query before selection
+    RETRIEVAL_MAX_CHUNKS_PER_DOC = 5  # Context chunks sent to the LLM per document
+    RETRIEVAL_MAX_DOCUMENTS = 20  # Documents (LLM calls) per query
+    RETRIEVAL_MIN_RELEVANCE = 0.25  # Cosine similarity below which chunks are dropped
+    RETRIEVAL_MMR_LAMBDA = 0.7  # 1.0 = pure relevance, lower favours diversity
+    RETRIEVAL_DUPLICATE_THRESHOLD = 0.95  # Chunks this similar to a selected one are dropped
+    
+    # LLM backend: "gemini", or "fake" for offline load tests and benchmarks
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+    FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))  # Seconds per simulated call
+    FAKE_LLM_LATENCY_JITTER = float(os.getenv("FAKE_LLM_LATENCY_JITTER", "0.1"))
+    FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0.0"))  # Simulated rate-limit errors
+    FAKE_LLM_JSON_SHAPE = os.getenv("FAKE_LLM_JSON_SHAPE", "clean")  # clean, fenced, prose, invalid or mixed
+    
+    # LLM scheduling settings
+    LLM_MAX_CONCURRENCY = 8  # Parallel Gemini calls per query
+    LLM_CALL_TIMEOUT = 30.0  # Seconds per Gemini call
+    LLM_MAX_RETRIES = 3  # Retries on rate-limit / unavailable errors
+    LLM_BACKOFF_BASE = 1.0  # Seconds, doubled on every retry
+    LLM_CONTEXT_TOKEN_BUDGET = 3000  # Document tokens packed into one extraction prompt
+    LLM_BATCH_TOKEN_BUDGET = 2000  # Document tokens per batched extraction call (0 disables batching)
+    LLM_BATCH_MAX_DOCUMENTS = 6  # Documents per batched extraction call
+    LLM_BATCH_SMALL_DOC_TOKENS = 500  # Only documents with at most this much context are batched
+    
+    # LLM response cache settings
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB of cached responses
+    
+    # Health check settings
+    HEALTH_CHECK_INTERVAL = 30.0  # Seconds between background dependency checks
+    HEALTH_CHECK_TIMEOUT = 10.0  # Seconds before a single check counts as failed
     
     # OCR settings
     TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+    OCR_DPI = 200
+    OCR_WORKERS = 0  # 0 = one per CPU core
+    OCR_BATCH_PAGES = 8  # Pages rasterized at a time; caps peak memory and temp disk
 
     def __init__(self):
         os.makedirs(self.UPLOAD_DIR, exist_ok=True)
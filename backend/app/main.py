@@ -1,23 +1,42 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+import time
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from typing import List, Optional
-import shutil
+from typing import List, Optional, Tuple
+import aiofiles
+import asyncio
+import hashlib
 import os
+import json
 import uuid
 import logging
 from pathlib import Path
 
 from app.config import settings
 from app.services.document_processor import DocumentProcessor
+from app.services.chunker import TextChunker
 from app.services.vector_service import VectorService
+from app.services.embedding_server import EmbeddingClient, load_authkey, parse_address
 from app.services.llm_service import LLMService
-import google.generativeai as genai
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_providers import create_provider
+from app.services.ingestion_queue import IngestionQueue
+from app.services.metadata_store import MetadataStore
+from app.services.document_removal import remove_document
+from app.services.doc_registry import DocumentRegistry
+from app.services.lexical_index import LexicalIndex
+from app.services.retrieval import RetrievalStage
+from app.services.streaming import prefetch
+from app.services.health import HealthMonitor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Service modules defer their heavy libraries (torch, OpenCV, Chroma, Gemini) to first use
+logger.info(f"Imported app modules in {time.perf_counter() - _import_start:.2f}s")
 
 # Initialize FastAPI app
 app = FastAPI(title="Document Research & Theme Identification Chatbot")
@@ -31,6 +50,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Refuse oversized uploads from their Content-Length, before the body is spooled to disk"""
+    if request.url.path == "/upload":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_REQUEST_SIZE:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds {settings.MAX_UPLOAD_REQUEST_SIZE} bytes"}
+            )
+    return await call_next(request)
+
 # Mount static files
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
@@ -43,44 +74,327 @@ if not os.path.exists(STATIC_DIR):
 
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-# Initialize services
-document_processor = DocumentProcessor()
-vector_service = VectorService(settings.CHROMA_DB_PATH, settings.EMBEDDING_MODEL)
-llm_service = LLMService(settings.GEMINI_API_KEY, settings.GEMINI_MODEL)
+# Services that load models or open stores are built by initialize_services() after
+# startup, so the process starts serving liveness probes right away
+document_processor: Optional[DocumentProcessor] = None
+vector_service: Optional[VectorService] = None
+llm_service: Optional[LLMService] = None
+retrieval_stage = RetrievalStage(
+    max_chunks_per_doc=settings.RETRIEVAL_MAX_CHUNKS_PER_DOC,
+    max_documents=settings.RETRIEVAL_MAX_DOCUMENTS,
+    min_relevance=settings.RETRIEVAL_MIN_RELEVANCE,
+    mmr_lambda=settings.RETRIEVAL_MMR_LAMBDA,
+    duplicate_threshold=settings.RETRIEVAL_DUPLICATE_THRESHOLD
+)
+
+def _build_document_processor() -> DocumentProcessor:
+    return DocumentProcessor(
+        ocr_dpi=settings.OCR_DPI,
+        ocr_workers=settings.OCR_WORKERS,
+        ocr_batch_pages=settings.OCR_BATCH_PAGES,
+        chunker=TextChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.EMBEDDING_MODEL),
+        pdf_extractor=settings.PDF_EXTRACTOR
+    )
+
+def _build_vector_service() -> VectorService:
+    embedding_service = None
+    if settings.EMBEDDING_SERVER_ADDRESS:
+        # One model shared by every worker process instead of a copy per worker
+        embedding_service = EmbeddingClient(
+            parse_address(settings.EMBEDDING_SERVER_ADDRESS),
+            load_authkey(settings.EMBEDDING_SERVER_AUTHKEY, settings.EMBEDDING_SERVER_AUTHKEY_FILE),
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            request_timeout=settings.EMBEDDING_SERVER_TIMEOUT
+        )
+    return VectorService(
+        settings.CHROMA_DB_PATH,
+        settings.EMBEDDING_MODEL,
+        embedding_batch_size=settings.EMBEDDING_BATCH_SIZE,
+        embedding_backend=settings.EMBEDDING_BACKEND,
+        onnx_dir=settings.EMBEDDING_ONNX_DIR,
+        cache_max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+        cache_ttl=settings.QUERY_CACHE_TTL,
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        registry=DocumentRegistry(settings.DOC_REGISTRY_PATH),
+        lexical_index=LexicalIndex(settings.LEXICAL_INDEX_PATH),
+        search_mode=settings.SEARCH_MODE,
+        lexical_budget=settings.LEXICAL_BUDGET_MS / 1000,
+        rrf_k=settings.RRF_K,
+        embedding_service=embedding_service
+    )
+
+def _build_llm_service() -> LLMService:
+    return LLMService(
+        create_provider(
+            settings.LLM_PROVIDER,
+            api_key=settings.GEMINI_API_KEY,
+            model_name=settings.GEMINI_MODEL,
+            latency=settings.FAKE_LLM_LATENCY,
+            latency_jitter=settings.FAKE_LLM_LATENCY_JITTER,
+            failure_rate=settings.FAKE_LLM_FAILURE_RATE,
+            json_shape=settings.FAKE_LLM_JSON_SHAPE
+        ),
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        call_timeout=settings.LLM_CALL_TIMEOUT,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_base=settings.LLM_BACKOFF_BASE,
+        cache=LLMResponseCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_BYTES) if settings.LLM_CACHE_ENABLED else None,
+        context_token_budget=settings.LLM_CONTEXT_TOKEN_BUDGET,
+        batch_token_budget=settings.LLM_BATCH_TOKEN_BUDGET,
+        batch_max_documents=settings.LLM_BATCH_MAX_DOCUMENTS,
+        batch_small_doc_tokens=settings.LLM_BATCH_SMALL_DOC_TOKENS
+    )
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # Bytes read per step when saving uploads
+
+# Document metadata and ingestion jobs, shared by every worker process
+metadata_store = MetadataStore(settings.METADATA_DB_PATH)
+
+def _ingest_file(job: dict, progress) -> dict:
+    """Parse, OCR and embed one uploaded file (runs on an ingestion worker thread)"""
+    doc_id = job["doc_id"]
+    
+    # An identical upload may have finished ingesting while this one was queued
+    existing = metadata_store.find_by_hash(job["content_hash"]) if job.get("content_hash") else None
+    if existing and existing["doc_id"] != doc_id:
+        if os.path.exists(job["file_path"]):
+            os.remove(job["file_path"])
+        return {
+            "duplicate_of": existing["doc_id"],
+            "pages": existing["total_pages"] or 1,
+            "chunks": existing["chunk_count"] or 0
+        }
+    
+    # A retried job may have left partial chunks behind, and answers cached from them
+    if job["attempts"] > 1:
+        remove_document(doc_id, vector_service, metadata_store, llm_service.cache)
+    
+    counters = {}
+    
+    def track(**values):
+        counters.update(values)
+        progress(**values)
+    
+    # Parse on a background thread while earlier chunks are embedded and written,
+    # so large PDFs never sit in memory whole
+    chunks = prefetch(
+        document_processor.iter_chunks(job["file_path"], doc_id, progress=track),
+        settings.INGEST_STREAM_WINDOW
+    )
+    try:
+        chunk_count = vector_service.add_document_stream(doc_id, chunks, window=settings.INGEST_STREAM_WINDOW, progress=track)
+        if chunk_count is None:
+            raise RuntimeError("Failed to add to vector database")
+        if chunk_count == 0:
+            raise RuntimeError("No text could be extracted from the document")
+        
+        # Store metadata
+        metadata_store.upsert_document(
+            doc_id,
+            filename=job["filename"],
+            file_path=job["file_path"],
+            content_hash=job.get("content_hash"),
+            total_pages=counters.get("pages_total", 1),
+            chunk_count=chunk_count,
+            created_at=job["created_at"],
+            ingested_at=time.time()
+        )
+    except BaseException:
+        # Windows already written would be searchable, and adopted by reconcile() on restart
+        remove_document(doc_id, vector_service, metadata_store, llm_service.cache)
+        raise
+    finally:
+        # Stops the parsing thread if the stream was abandoned part way
+        chunks.close()
+    
+    return {
+        "pages": counters.get("pages_total", 1),
+        "chunks": chunk_count
+    }
+
+ingestion_queue = IngestionQueue(_ingest_file, num_workers=settings.INGEST_WORKERS, store=metadata_store)
 
-# Store document metadata
-document_metadata = {}
+def _uploaded_files() -> dict:
+    """doc_id -> path for every file in the upload directory"""
+    return {
+        Path(name).stem: os.path.join(settings.UPLOAD_DIR, name)
+        for name in os.listdir(settings.UPLOAD_DIR)
+        if name.startswith("DOC_")
+    }
+
+def _service_stats() -> dict:
+    """Cache and throughput counters reported by /health"""
+    return {
+        "embedding": vector_service.embedding_service.get_stats(),
+        "cache": vector_service.get_cache_stats(),
+        "search": vector_service.get_search_stats(),
+        "retrieval": retrieval_stage.get_stats(),
+        "llm_cache": llm_service.get_cache_stats(),
+        "llm_usage": llm_service.get_usage_stats()
+    }
+
+def _check_embedding() -> dict:
+    """Round trip to the shared embedding server, when the app uses one"""
+    embedding_service = vector_service.embedding_service
+    if not isinstance(embedding_service, EmbeddingClient):
+        return {"server": None}
+    return embedding_service.check(timeout=settings.HEALTH_CHECK_TIMEOUT / 2)
+
+# Dependency checks run in the background once services are up; probes only read the last snapshot
+health_monitor = HealthMonitor(
+    {
+        "llm": lambda: llm_service.check_reachable(),
+        "chroma": lambda: vector_service.heartbeat(),
+        "embedding": _check_embedding,
+        "ingestion": lambda: {"queue_depth": ingestion_queue.queue_depth()},
+        "stats": _service_stats
+    },
+    # Without its embedding server a worker can neither ingest nor answer queries
+    critical=("chroma", "embedding") if settings.EMBEDDING_SERVER_ADDRESS else ("chroma",),
+    interval=settings.HEALTH_CHECK_INTERVAL,
+    timeout=settings.HEALTH_CHECK_TIMEOUT
+)
+
+# Progress of initialize_services(), reported by the health endpoints
+startup_state = {"status": "initializing", "seconds": {}, "error": None}
+services_task: Optional[asyncio.Task] = None
+
+async def _timed_build(name: str, build):
+    """Run a blocking constructor off the event loop, recording how long it took"""
+    start = time.perf_counter()
+    result = await asyncio.to_thread(build)
+    startup_state["seconds"][name] = round(time.perf_counter() - start, 2)
+    return result
+
+async def initialize_services():
+    """Build the heavy services concurrently, then start the workers that depend on them"""
+    global document_processor, vector_service, llm_service
+    
+    start = time.perf_counter()
+    try:
+        document_processor, vector_service, llm_service = await asyncio.gather(
+            _timed_build("document_processor", _build_document_processor),
+            _timed_build("vector_service", _build_vector_service),
+            _timed_build("llm_service", _build_llm_service)
+        )
+        
+        # Bring the metadata store in line with whatever is in Chroma
+        await asyncio.to_thread(lambda: metadata_store.reconcile(vector_service.get_all_doc_ids(), _uploaded_files()))
+        await ingestion_queue.start()
+        await health_monitor.start()
+    except Exception as e:
+        startup_state.update(status="failed", error=str(e))
+        logger.error(f"Service initialization failed: {str(e)}")
+        raise
+    
+    startup_state["seconds"]["total"] = round(time.perf_counter() - start, 2)
+    startup_state["status"] = "ready"
+    logger.info(f"Services initialized in {startup_state['seconds']['total']:.2f}s: {startup_state['seconds']}")
+
+@app.on_event("startup")
+async def start_services():
+    global services_task
+    services_task = asyncio.create_task(initialize_services())
+
+@app.on_event("shutdown")
+async def stop_services():
+    if services_task is not None and not services_task.done():
+        services_task.cancel()
+        await asyncio.gather(services_task, return_exceptions=True)
+    await ingestion_queue.stop()
+    await health_monitor.stop()
+
+# Paths served while services are still initializing
+NO_SERVICE_PATHS = ("/health", "/static")
+
+@app.middleware("http")
+async def wait_for_services(request: Request, call_next):
+    """Hold API requests until initialize_services() has finished; 503 if it failed"""
+    path = request.url.path
+    if path != "/" and not path.startswith(NO_SERVICE_PATHS) and services_task is not None:
+        try:
+            await asyncio.shield(services_task)
+        except Exception:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": f"Service failed to start: {startup_state['error']}"}
+            )
+    return await call_next(request)
 
 # Serve index.html from /static
 @app.get("/")
 async def serve_frontend():
     return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: the last background check found every critical dependency up"""
+    snapshot = health_monitor.snapshot()
+    status_code = 200 if snapshot["ready"] else 503
+    return JSONResponse(status_code=status_code, content={**snapshot, "startup": startup_state})
+
 @app.get("/health")
 async def health_check():
-    try:
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content("Say hello")
-        gemini_status = bool(response.text.strip())
-    except Exception as e:
-        logger.error(f"Gemini health check failed: {e}")
-        gemini_status = False
-
+    """Last background health snapshot, in the shape the frontend expects"""
+    snapshot = health_monitor.snapshot()
+    checks = snapshot["checks"]
+    stats = {key: value for key, value in checks.get("stats", {}).items() if key not in ("ok", "latency_ms")}
+    
     return {
-        "status": "healthy",
-        "documents_count": vector_service.get_document_count(),
-        "gemini_configured": gemini_status
+        "status": "healthy" if snapshot["ready"] else "degraded",
+        "documents_count": vector_service.get_document_count() if vector_service is not None else 0,
+        "gemini_configured": checks.get("llm", {}).get("ok", False),
+        **stats,
+        "ingestion_queue_depth": ingestion_queue.queue_depth(),
+        "checked_at": snapshot["checked_at"],
+        "startup": startup_state,
+        "checks": {name: result for name, result in checks.items() if name != "stats"}
     }
 
 
-@app.post("/upload")
-async def upload_documents(files: List[UploadFile] = File(...)):
-    """Upload multiple documents"""
-    uploaded_files = []
-    failed_files = []
+class UploadTooLarge(Exception):
+    pass
+
+async def _save_upload(file: UploadFile, file_path: str) -> Tuple[str, int]:
+    """
+    Stream an upload to disk without blocking the event loop.
+    
+    The sha256 digest is computed in the same pass, and the copy stops as soon
+    as the file passes MAX_FILE_SIZE.
     
-    for file in files:
+    Returns:
+        (content_hash, size_in_bytes)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while True:
+                block = await file.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > settings.MAX_FILE_SIZE:
+                    raise UploadTooLarge(f"File exceeds the {settings.MAX_FILE_SIZE // (1024 * 1024)}MB limit")
+                digest.update(block)
+                await buffer.write(block)
+    except BaseException:
+        # Never leave a partial file behind (including when the client disconnects)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return digest.hexdigest(), size
+
+async def _accept_upload(file: UploadFile, semaphore: asyncio.Semaphore) -> Tuple[str, dict]:
+    """Save one uploaded file and queue it; returns ("job" | "duplicate" | "failed", entry)"""
+    async with semaphore:
+        start = time.perf_counter()
         try:
             # Generate unique document ID
             doc_id = f"DOC_{uuid.uuid4().hex[:8]}"
@@ -88,55 +402,95 @@ async def upload_documents(files: List[UploadFile] = File(...)):
             # Save file
             file_extension = Path(file.filename).suffix
             file_path = os.path.join(settings.UPLOAD_DIR, f"{doc_id}{file_extension}")
+            content_hash, size = await _save_upload(file, file_path)
+            upload = {"size": size, "upload_seconds": round(time.perf_counter() - start, 3)}
             
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            # Process document
-            processed_doc = document_processor.process_document(file_path, doc_id)
-            
-            if "error" in processed_doc:
-                failed_files.append({
+            # Identical bytes were already ingested: link to that document instead of reprocessing
+            existing = await asyncio.to_thread(metadata_store.find_by_hash, content_hash)
+            if existing:
+                os.remove(file_path)
+                return "duplicate", {
                     "filename": file.filename,
-                    "error": processed_doc["error"]
-                })
-                continue
-            
-            # Add to vector database
-            success = vector_service.add_document(processed_doc)
-            
-            if success:
-                # Store metadata
-                document_metadata[doc_id] = {
-                    "original_filename": file.filename,
-                    "file_path": file_path,
-                    "total_pages": processed_doc.get("total_pages", 1),
-                    "content_count": len(processed_doc.get("content", []))
+                    "doc_id": existing["doc_id"],
+                    "existing_filename": existing["filename"],
+                    **upload
                 }
-                
-                uploaded_files.append({
-                    "doc_id": doc_id,
-                    "filename": file.filename,
-                    "pages": processed_doc.get("total_pages", 1),
-                    "chunks": len(processed_doc.get("content", []))
-                })
-            else:
-                failed_files.append({
+            
+            # Parsing, OCR and embedding happen on the worker pool
+            job = ingestion_queue.submit(doc_id, file.filename, file_path, content_hash)
+            if job["doc_id"] != doc_id:
+                # An identical upload is already queued or being ingested: this becomes a duplicate of it
+                os.remove(file_path)
+                return "duplicate", {
                     "filename": file.filename,
-                    "error": "Failed to add to vector database"
-                })
+                    "doc_id": job["doc_id"],
+                    "existing_filename": job["filename"],
+                    "job_id": job["job_id"],
+                    **upload
+                }
+            return "job", {**job, "upload": upload}
         
         except Exception as e:
-            logger.error(f"Error processing file {file.filename}: {str(e)}")
-            failed_files.append({
+            logger.error(f"Error saving file {file.filename}: {str(e)}")
+            return "failed", {
                 "filename": file.filename,
                 "error": str(e)
-            })
+            }
+        finally:
+            await file.close()
+
+@app.post("/upload")
+async def upload_documents(files: List[UploadFile] = File(...)):
+    """Accept uploads and queue them for background ingestion"""
+    # Files in the batch are saved concurrently; results keep the order they were sent in
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    outcomes = await asyncio.gather(*(_accept_upload(file, semaphore) for file in files))
     
     return {
-        "uploaded": uploaded_files,
-        "failed": failed_files,
-        "total_documents": vector_service.get_document_count()
+        "jobs": [entry for kind, entry in outcomes if kind == "job"],
+        "duplicates": [entry for kind, entry in outcomes if kind == "duplicate"],
+        "failed": [entry for kind, entry in outcomes if kind == "failed"]
+    }
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None):
+    """List ingestion jobs, optionally filtered by status"""
+    jobs = ingestion_queue.list_jobs(status)
+    return {
+        "jobs": jobs,
+        "total_count": len(jobs),
+        "queue_depth": ingestion_queue.queue_depth()
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status and progress of an ingestion job"""
+    job = ingestion_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Re-queue a failed ingestion job"""
+    job = ingestion_queue.retry(job_id)
+    if job is None:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} does not exist or has not failed")
+    return job
+
+def _retrieve(query: str) -> dict:
+    """Search, then cap, diversify and filter the hits into per-document LLM context (blocking)"""
+    search_results = vector_service.search(query, n_results=settings.RETRIEVAL_CANDIDATES, include_embeddings=True)
+    return retrieval_stage.select(query, search_results)
+
+def _format_answer(doc_id: str, answer_result: dict) -> dict:
+    """Shape a per-document answer for the API response"""
+    return {
+        "doc_id": doc_id,
+        "filename": (metadata_store.get_document(doc_id) or {}).get("filename", "Unknown"),
+        "answer": answer_result["answer"],
+        "citation": answer_result.get("citation", ""),
+        "has_answer": True
     }
 
 @app.post("/query")
@@ -146,10 +500,11 @@ async def query_documents(query: str = Form(...)):
         if not query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        # Search for relevant documents
-        search_results = vector_service.search(query, n_results=50)
+        # Search for relevant documents, grouped by document; embedding, Chroma and BM25
+        # all block, so they run off the event loop
+        doc_groups = await asyncio.to_thread(_retrieve, query)
         
-        if not search_results:
+        if not doc_groups:
             return {
                 "query": query,
                 "individual_answers": [],
@@ -157,30 +512,14 @@ async def query_documents(query: str = Form(...)):
                 "synthesis": "No relevant documents found for your query."
             }
         
-        # Group results by document
-        doc_groups = {}
-        for result in search_results:
-            doc_id = result["doc_id"]
-            if doc_id not in doc_groups:
-                doc_groups[doc_id] = []
-            doc_groups[doc_id].append(result)
-        
-        # Get answers from each document
+        # Get answers from all documents concurrently
         individual_answers = []
-        for doc_id, chunks in doc_groups.items():
-            answer_result = llm_service.extract_answer_from_document(query, chunks)
-            
+        for doc_id, answer_result in await llm_service.extract_answers(query, doc_groups):
             if answer_result["has_answer"]:
-                individual_answers.append({
-                    "doc_id": doc_id,
-                    "filename": document_metadata.get(doc_id, {}).get("original_filename", "Unknown"),
-                    "answer": answer_result["answer"],
-                    "citation": answer_result.get("citation", ""),
-                    "has_answer": True
-                })
+                individual_answers.append(_format_answer(doc_id, answer_result))
         
         # Identify themes across all answers
-        theme_analysis = llm_service.identify_themes(query, individual_answers)
+        theme_analysis = await llm_service.aidentify_themes(query, individual_answers)
         
         return {
             "query": query,
@@ -193,40 +532,101 @@ async def query_documents(query: str = Form(...)):
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def query_documents_stream(query: str = Form(...)):
+    """Stream query results as NDJSON: each document's answer as soon as it is ready, then themes"""
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    async def event_stream():
+        def event(payload: dict) -> str:
+            return json.dumps(payload) + "\n"
+        
+        try:
+            # Search for relevant documents, grouped by document (off the event loop)
+            doc_groups = await asyncio.to_thread(_retrieve, query)
+            
+            yield event({"type": "start", "query": query, "documents": len(doc_groups)})
+            
+            if not doc_groups:
+                yield event({
+                    "type": "themes",
+                    "themes": [],
+                    "synthesis": "No relevant documents found for your query."
+                })
+                yield event({"type": "done", "answers": 0})
+                return
+            
+            # Emit answers in completion order
+            individual_answers = []
+            async for doc_id, answer_result in llm_service.iter_document_answers(query, doc_groups):
+                if answer_result["has_answer"]:
+                    answer = _format_answer(doc_id, answer_result)
+                    individual_answers.append(answer)
+                    yield event({"type": "answer", **answer})
+            
+            # Identify themes across all answers
+            theme_analysis = await llm_service.aidentify_themes(query, individual_answers)
+            yield event({
+                "type": "themes",
+                "themes": theme_analysis.get("themes", []),
+                "synthesis": theme_analysis.get("overall_synthesis", "")
+            })
+            yield event({"type": "done", "answers": len(individual_answers)})
+        
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield event({"type": "error", "error": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/documents")
-async def list_documents():
-    """List all uploaded documents"""
-    doc_ids = vector_service.get_all_doc_ids()
+async def list_documents(limit: int = 100, cursor: Optional[int] = None):
+    """List uploaded documents, newest first; pass next_cursor back to get the following page"""
+    limit = max(1, min(limit, 1000))
+    entries, next_cursor = vector_service.list_documents(limit=limit, cursor=cursor)
+    metadata_by_id = metadata_store.get_documents(entry["doc_id"] for entry in entries)
     documents = []
     
-    for doc_id in doc_ids:
-        metadata = document_metadata.get(doc_id, {})
+    for entry in entries:
+        metadata = metadata_by_id.get(entry["doc_id"], {})
         documents.append({
-            "doc_id": doc_id,
-            "filename": metadata.get("original_filename", "Unknown"),
-            "pages": metadata.get("total_pages", 1),
-            "chunks": metadata.get("content_count", 0)
+            "doc_id": entry["doc_id"],
+            "filename": metadata.get("filename", "Unknown"),
+            "pages": metadata.get("total_pages") or 1,
+            "chunks": entry.get("chunk_count", metadata.get("chunk_count") or 0),
+            "ingested_at": metadata.get("ingested_at")
         })
     
     return {
         "documents": documents,
-        "total_count": len(documents)
+        "total_count": vector_service.get_document_count(),
+        "next_cursor": next_cursor
     }
 
+def _remove_upload(file_path: Optional[str]):
+    """Delete a stored upload; files outside UPLOAD_DIR (e.g. bulk-ingested originals) are never touched"""
+    if not file_path:
+        return
+    upload_dir = os.path.realpath(settings.UPLOAD_DIR)
+    path = os.path.realpath(file_path)
+    if os.path.commonpath([upload_dir, path]) == upload_dir and os.path.isfile(path):
+        os.remove(path)
+
 @app.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str):
     """Delete a specific document"""
     try:
-        success = vector_service.delete_document(doc_id)
+        # Chunks, metadata and cached answers built from this document
+        success, metadata = remove_document(doc_id, vector_service, metadata_store, llm_service.cache)
         
-        if success and doc_id in document_metadata:
+        if success and metadata:
             # Delete file
-            file_path = document_metadata[doc_id].get("file_path")
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-            
-            # Remove metadata
-            del document_metadata[doc_id]
+            _remove_upload(metadata.get("file_path"))
         
         return {"success": success, "message": f"Document {doc_id} deleted"}
     
@@ -240,15 +640,11 @@ async def clear_all_documents():
     try:
         # Reset vector database
         vector_service.reset_database()
+        llm_service.clear_cache()
         
-        # Delete all uploaded files
-        for doc_id, metadata in document_metadata.items():
-            file_path = metadata.get("file_path")
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-        
-        # Clear metadata
-        document_metadata.clear()
+        # Clear metadata and delete all uploaded files
+        for metadata in metadata_store.clear_documents():
+            _remove_upload(metadata.get("file_path"))
         
         return {"success": True, "message": "All documents cleared"}
     
@@ -0,0 +1,206 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+")
+APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+class TextChunker:
+    """Streaming chunker producing bounded, overlapping chunks measured in embedding-model tokens"""
+
+    def __init__(self, chunk_size: int = 250, chunk_overlap: int = 48, tokenizer_name: Optional[str] = "all-MiniLM-L6-v2"):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._tokenizer_loaded = False
+        self._tokenizer_lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        """The embedding model's tokenizer, loaded on first use (None if unavailable)"""
+        if not self._tokenizer_loaded:
+            with self._tokenizer_lock:
+                if not self._tokenizer_loaded:
+                    self._tokenizer = self._load_tokenizer()
+                    self._tokenizer_loaded = True
+        return self._tokenizer
+
+    def _load_tokenizer(self):
+        """Load only the tokenizer, not the model weights"""
+        if not self.tokenizer_name:
+            return None
+        try:
+            from transformers import AutoTokenizer
+
+            # Bare sentence-transformers names live under the sentence-transformers org
+            name = self.tokenizer_name if "/" in self.tokenizer_name else f"sentence-transformers/{self.tokenizer_name}"
+            return AutoTokenizer.from_pretrained(name)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {self.tokenizer_name}, approximating token counts: {str(e)}")
+            return None
+
+    def count_tokens(self, text: str) -> int:
+        """Number of embedding-model tokens in text (without special tokens)"""
+        if self.tokenizer is None:
+            return len(APPROX_TOKEN.findall(text))
+        return len(self.tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+    def chunk(self, units: Iterable[Dict], paged: bool = True) -> Iterator[Dict]:
+        """
+        Turn a stream of text units into bounded, overlapping chunks.
+
+        Args:
+            units: Dicts with "page", "paragraph" and "text", in document order.
+                Consumed lazily, so callers can feed pages as they are parsed.
+            paged: Whether page numbers are meaningful for citations.
+
+        Yields:
+            Chunk dicts with "text", "citation", "chunk_index" and the
+            page/paragraph span ("page", "paragraph", "page_end", "paragraph_end").
+        """
+        window: List[Tuple[str, int, int, int]] = []  # (text, tokens, page, paragraph)
+        window_tokens = 0
+        chunk_index = 0
+
+        for unit in units:
+            for piece, tokens in self._split_unit(unit["text"]):
+                if window and window_tokens + tokens > self.chunk_size:
+                    yield self._make_chunk(window, chunk_index, paged)
+                    chunk_index += 1
+                    window, window_tokens = self._overlap_tail(window, tokens)
+
+                window.append((piece, tokens, unit["page"], unit["paragraph"]))
+                window_tokens += tokens
+
+        if window:
+            yield self._make_chunk(window, chunk_index, paged)
+
+    def _split_unit(self, text: str) -> Iterator[Tuple[str, int]]:
+        """Split a paragraph into pieces of at most chunk_size tokens, preferring sentence boundaries"""
+        text = text.strip()
+        if not text:
+            return
+
+        tokens = self.count_tokens(text)
+        if tokens <= self.chunk_size:
+            yield text, tokens
+            return
+
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.chunk_size:
+                yield sentence, tokens
+            else:
+                yield from self._split_long_sentence(sentence)
+
+    def _split_long_sentence(self, sentence: str) -> Iterator[Tuple[str, int]]:
+        """
+        Hard-split a run-on sentence (e.g. a page that lost its line breaks) by words.
+
+        Pieces fill a whole chunk, so no sentence tail can carry over between
+        them; instead consecutive pieces share chunk_overlap tokens themselves.
+        """
+        if self.tokenizer is not None and getattr(self.tokenizer, "is_fast", False):
+            # Tokenize once and cut on token offsets instead of re-counting word by word
+            offsets = self.tokenizer(
+                sentence, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+            )["offset_mapping"]
+
+            def glued(index: int) -> bool:
+                """Whether token index continues the word of the token before it"""
+                return offsets[index][0] == offsets[index - 1][1]
+
+            start = 0
+            while start < len(offsets):
+                end = min(start + self.chunk_size, len(offsets))
+                # Don't cut inside a word: back off while the next token is glued to this one
+                while end < len(offsets) and end - 1 > start and glued(end):
+                    end -= 1
+                yield sentence[offsets[start][0]:offsets[end - 1][1]], end - start
+                if end >= len(offsets):
+                    return
+                # Step back by the overlap, to the start of a word
+                next_start = max(end - self.chunk_overlap, start + 1)
+                while next_start < end and glued(next_start):
+                    next_start += 1
+                start = next_start
+            return
+
+        piece: List[Tuple[str, int]] = []  # (word, tokens)
+        piece_tokens = 0
+        for word in sentence.split():
+            tokens = self.count_tokens(word)
+            if piece and piece_tokens + tokens > self.chunk_size:
+                yield " ".join(w for w, _ in piece), piece_tokens
+                # Carry the trailing words that fit in the overlap into the next piece
+                carried = []
+                carried_tokens = 0
+                for w, t in reversed(piece):
+                    if carried_tokens + t > self.chunk_overlap or carried_tokens + t + tokens > self.chunk_size:
+                        break
+                    carried.insert(0, (w, t))
+                    carried_tokens += t
+                piece, piece_tokens = carried, carried_tokens
+            piece.append((word, tokens))
+            piece_tokens += tokens
+
+        if piece:
+            yield " ".join(w for w, _ in piece), piece_tokens
+
+    def _overlap_tail(self, window: List[Tuple[str, int, int, int]], next_tokens: int) -> Tuple[List, int]:
+        """Trailing pieces of the emitted chunk to repeat at the start of the next one"""
+        budget = min(self.chunk_overlap, self.chunk_size - next_tokens)
+        tail = []
+        tail_tokens = 0
+        for piece in reversed(window):
+            if tail_tokens + piece[1] > budget:
+                break
+            tail.insert(0, piece)
+            tail_tokens += piece[1]
+        return tail, tail_tokens
+
+    def _make_chunk(self, window: List[Tuple[str, int, int, int]], chunk_index: int, paged: bool) -> Dict:
+        """Join window pieces into a chunk, keeping paragraph breaks"""
+        parts = []
+        previous = None
+        for text, _, page, paragraph in window:
+            if previous is None:
+                parts.append(text)
+            elif previous == (page, paragraph):
+                parts.append(" " + text)
+            else:
+                parts.append("\n\n" + text)
+            previous = (page, paragraph)
+
+        first_page, first_para = window[0][2], window[0][3]
+        last_page, last_para = window[-1][2], window[-1][3]
+
+        return {
+            "page": first_page,
+            "paragraph": first_para,
+            "page_end": last_page,
+            "paragraph_end": last_para,
+            "chunk_index": chunk_index,
+            "text": "".join(parts),
+            "citation": self._citation(first_page, first_para, last_page, last_para, paged)
+        }
+
+    def _citation(self, first_page: int, first_para: int, last_page: int, last_para: int, paged: bool) -> str:
+        """Human-readable span, e.g. "Page 3, Para 2-4" or "Para 5" """
+        if not paged:
+            return f"Para {first_para}" if first_para == last_para else f"Para {first_para}-{last_para}"
+        if first_page != last_page:
+            return f"Page {first_page}, Para {first_para} - Page {last_page}, Para {last_para}"
+        if first_para != last_para:
+            return f"Page {first_page}, Para {first_para}-{last_para}"
+        return f"Page {first_page}, Para {first_para}"
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import time
+
+from app.services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+class DocumentRegistry(SQLiteStore):
+    """Per-document chunk counts kept alongside the vector collection, so counts and listings never scan chunks"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS registry (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc_id TEXT NOT NULL UNIQUE,
+            chunk_count INTEGER NOT NULL,
+            added_at REAL NOT NULL
+        );
+
+        -- Running totals maintained by triggers, so counting is a single-row read
+        CREATE TABLE IF NOT EXISTS registry_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            documents INTEGER NOT NULL,
+            chunks INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO registry_totals (id, documents, chunks) VALUES (0, 0, 0);
+
+        CREATE TRIGGER IF NOT EXISTS registry_insert AFTER INSERT ON registry BEGIN
+            UPDATE registry_totals SET documents = documents + 1, chunks = chunks + NEW.chunk_count WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS registry_delete AFTER DELETE ON registry BEGIN
+            UPDATE registry_totals SET documents = documents - 1, chunks = chunks - OLD.chunk_count WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS registry_update AFTER UPDATE OF chunk_count ON registry BEGIN
+            UPDATE registry_totals SET chunks = chunks - OLD.chunk_count + NEW.chunk_count WHERE id = 0;
+        END;
+    """
+
+    ADDED_COLUMNS = {
+        # Bumped after every collection write, so each process can tell its cached searches are stale
+        "registry_totals": {"version": "INTEGER NOT NULL DEFAULT 0"}
+    }
+
+    def register(self, doc_id: str, chunk_count: int, replace: bool = False):
+        """Record chunks added for a document (replace=True sets the count instead of adding to it)"""
+        update = "excluded.chunk_count" if replace else "chunk_count + excluded.chunk_count"
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO registry (doc_id, chunk_count, added_at) VALUES (?, ?, ?) "
+                f"ON CONFLICT(doc_id) DO UPDATE SET chunk_count = {update}",
+                (doc_id, chunk_count, time.time())
+            )
+
+    def register_many(self, counts: Iterable[Tuple[str, int]], replace: bool = False):
+        """Bulk variant of register"""
+        update = "excluded.chunk_count" if replace else "chunk_count + excluded.chunk_count"
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO registry (doc_id, chunk_count, added_at) VALUES (?, ?, ?) "
+                f"ON CONFLICT(doc_id) DO UPDATE SET chunk_count = {update}",
+                [(doc_id, chunk_count, now) for doc_id, chunk_count in counts]
+            )
+
+    def unregister(self, doc_id: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM registry WHERE doc_id = ?", (doc_id,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM registry")
+
+    def totals(self) -> Dict:
+        """Document and chunk totals"""
+        row = self._connect().execute("SELECT documents, chunks FROM registry_totals WHERE id = 0").fetchone()
+        return {"documents": row["documents"], "chunks": row["chunks"]}
+
+    def version(self) -> int:
+        """Collection version shared by every process using this registry"""
+        return self._connect().execute("SELECT version FROM registry_totals WHERE id = 0").fetchone()[0]
+
+    def bump_version(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE registry_totals SET version = version + 1 WHERE id = 0")
+
+    def count(self) -> int:
+        return self.totals()["documents"]
+
+    def chunk_count(self, doc_id: str) -> int:
+        row = self._connect().execute("SELECT chunk_count FROM registry WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row["chunk_count"] if row is not None else 0
+
+    def all_doc_ids(self) -> List[str]:
+        return [row[0] for row in self._connect().execute("SELECT doc_id FROM registry")]
+
+    def page(self, limit: int = 100, cursor: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+        """
+        One page of documents, newest first, using keyset pagination.
+
+        Returns:
+            (entries, next_cursor): next_cursor is None on the last page.
+        """
+        if cursor is None:
+            rows = self._connect().execute(
+                "SELECT seq, doc_id, chunk_count, added_at FROM registry ORDER BY seq DESC LIMIT ?",
+                (limit + 1,)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT seq, doc_id, chunk_count, added_at FROM registry WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+                (cursor, limit + 1)
+            ).fetchall()
+
+        entries = [dict(row) for row in rows[:limit]]
+        next_cursor = entries[-1]["seq"] if len(rows) > limit else None
+        return entries, next_cursor
@@ -1,33 +1,76 @@
 import os
-import pytesseract
-from PIL import Image
-import PyPDF2
-import cv2
-import numpy as np
-from docx import Document
-from typing import Dict, List, Tuple
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from pdf2image import convert_from_path
+
+from app.services.chunker import TextChunker
+from app.services.pdf_extractors import create_pdf_extractor
 
 logger = logging.getLogger(__name__)
-pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
+
+# File types process_document accepts
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".docx", ".txt")
+
+# OCR, image and office-format libraries are imported on first use, so importing
+# this module (and app startup) doesn't pay for OpenCV, PIL and friends
+
+def _ocr_image_file(image_path: str) -> Tuple[str, float]:
+    """OCR an image on disk with the tesseract CLI, returning (text, seconds)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [os.getenv("TESSERACT_CMD") or "tesseract", image_path, "stdout"],
+        capture_output=True,
+        check=True,
+        # Tesseract's own OpenMP threads would oversubscribe the cores under the OCR pool
+        env={**os.environ, "OMP_THREAD_LIMIT": "1"}
+    )
+    return result.stdout.decode("utf-8", errors="replace"), time.perf_counter() - start
+
 class DocumentProcessor:
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        ocr_dpi: int = 200,
+        ocr_workers: int = 0,
+        ocr_batch_pages: int = 8,
+        chunker: Optional[TextChunker] = None,
+        pdf_extractor: str = "pypdf2"
+    ):
+        self.chunker = chunker or TextChunker()
+        self.pdf_extractor = create_pdf_extractor(pdf_extractor)
+        self.ocr_dpi = ocr_dpi
+        self.ocr_workers = ocr_workers or os.cpu_count() or 1
+        self.ocr_batch_pages = max(1, ocr_batch_pages)
+        # Shared by every document being processed at once (one per ingestion worker), so
+        # concurrent scanned uploads never run more than ocr_workers tesseract processes
+        self._ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="ocr")
     
-    def process_document(self, file_path: str, doc_id: str) -> Dict:
-        """Process a document and extract text with metadata"""
+    def process_document(self, file_path: str, doc_id: str, progress: Optional[Callable] = None) -> Dict:
+        """Process a document and extract text with metadata
+        
+        progress, if given, is called with keyword counters (pages_total,
+        pages_parsed, pages_ocr) as extraction advances.
+        """
         try:
             file_extension = os.path.splitext(file_path)[1].lower()
+            progress = progress or (lambda **counters: None)
             
             if file_extension == '.pdf':
-                return self._process_pdf(file_path, doc_id)
+                return self._process_pdf(file_path, doc_id, progress)
             elif file_extension in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-                return self._process_image(file_path, doc_id)
+                result = self._process_image(file_path, doc_id)
+                progress(pages_total=1, pages_parsed=1, pages_ocr=1)
+                return result
             elif file_extension == '.docx':
-                return self._process_docx(file_path, doc_id)
+                result = self._process_docx(file_path, doc_id)
+                progress(pages_total=1, pages_parsed=1)
+                return result
             elif file_extension == '.txt':
-                return self._process_txt(file_path, doc_id)
+                result = self._process_txt(file_path, doc_id)
+                progress(pages_total=1, pages_parsed=1)
+                return result
             else:
                 raise ValueError(f"Unsupported file type: {file_extension}")
                 
@@ -35,37 +78,92 @@ class DocumentProcessor:
             logger.error(f"Error processing document {doc_id}: {str(e)}")
             return {"doc_id": doc_id, "content": [], "error": str(e)}
     
-    def _process_pdf(self, file_path: str, doc_id: str) -> Dict:
-        """Extract text from PDF, with OCR fallback for scanned pages"""
-        content = []
+    def iter_chunks(self, file_path: str, doc_id: str, progress: Optional[Callable] = None) -> Iterator[Dict]:
+        """
+        Chunks of a document, produced as extraction advances.
+        
+        PDFs stream page by page, so callers can embed early chunks while later
+        pages are still being parsed and memory stays flat whatever the page
+        count. Other formats are small and are parsed whole. Raises on failure.
+        """
+        progress = progress or (lambda **counters: None)
+        if os.path.splitext(file_path)[1].lower() == '.pdf':
+            pages = self.iter_pdf_pages(file_path, progress)
+            units = (unit for page_num, text in pages for unit in self._paragraph_units(text, page_num))
+            yield from self.chunker.chunk(units, paged=True)
+            return
         
+        result = self.process_document(file_path, doc_id, progress)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        yield from result["content"]
+    
+    def iter_pdf_pages(self, file_path: str, progress: Callable = lambda **counters: None,
+                       ocr_timings: Optional[List[Dict]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        (page_number, text) for every page of a PDF, in order.
+        
+        Text-layer pages come straight from the extractor. Runs of scanned
+        pages are held back and OCR'd together, up to ocr_batch_pages at a
+        time, before any later page is yielded; nothing else is buffered.
+        """
+        scanned: List[int] = []
+        ocr_done = 0
+        
+        def ocr_run() -> List[Tuple[int, str]]:
+            nonlocal ocr_done
+            offset = ocr_done
+            results = self._ocr_pdf_pages(
+                file_path, scanned, lambda **counters: progress(pages_ocr=offset + counters["pages_ocr"])
+            )
+            ocr_done += len(scanned)
+            if ocr_timings is not None:
+                ocr_timings.extend(
+                    {"page": page_num, "seconds": round(seconds, 3)} for page_num, (_, seconds) in sorted(results.items())
+                )
+            return [(page_num, results.get(page_num, ("", 0.0))[0]) for page_num in scanned]
+        
+        pages = self.pdf_extractor.iter_pages(file_path, on_page_count=lambda count: progress(pages_total=count))
+        for page_num, text in pages:
+            text = (text or "").strip()
+            progress(pages_parsed=page_num)
+            
+            if len(text) < 50:  # Likely a scanned page
+                scanned.append(page_num)
+                if len(scanned) == self.ocr_batch_pages:
+                    yield from ocr_run()
+                    scanned = []
+                continue
+            
+            if scanned:
+                yield from ocr_run()
+                scanned = []
+            yield page_num, text
+        
+        if scanned:
+            yield from ocr_run()
+    
+    def _process_pdf(self, file_path: str, doc_id: str, progress: Callable = lambda **counters: None) -> Dict:
+        """Extract text from PDF, with OCR fallback for scanned pages"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    text = page.extract_text()
-                    if text:
-                        text = text.strip()
-                    else:
-                        text = ""
-                    
-                    if len(text) < 50:  # Likely a scanned page
-                        # Convert PDF page to image and OCR
-                        text = self._ocr_pdf_page(file_path, page_num - 1)
-                    
-                    if text:
-                        # Split into paragraphs
-                        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-                        for para_num, paragraph in enumerate(paragraphs, 1):
-                            content.append({
-                                "page": page_num,
-                                "paragraph": para_num,
-                                "text": paragraph,
-                                "citation": f"Page {page_num}, Para {para_num}"
-                            })
-            
-            return {"doc_id": doc_id, "content": content, "total_pages": len(pdf_reader.pages)}
+            counters = {}
+            
+            def track(**values):
+                counters.update(values)
+                progress(**values)
+            
+            # Chunk across page boundaries, keeping page/paragraph spans
+            ocr_timings = []
+            pages = self.iter_pdf_pages(file_path, track, ocr_timings)
+            units = (unit for page_num, text in pages for unit in self._paragraph_units(text, page_num))
+            content = list(self.chunker.chunk(units, paged=True))
+            
+            return {
+                "doc_id": doc_id,
+                "content": content,
+                "total_pages": counters.get("pages_total", 0),
+                "ocr_timings": ocr_timings
+            }
             
         except Exception as e:
             logger.error(f"Error processing PDF {doc_id}: {str(e)}")
@@ -74,6 +172,8 @@ class DocumentProcessor:
     def _process_image(self, file_path: str, doc_id: str) -> Dict:
         """Extract text from image using OCR"""
         try:
+            import cv2
+            
             # Preprocess image for better OCR
             image = cv2.imread(file_path)
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -81,19 +181,13 @@ class DocumentProcessor:
             # Apply threshold to get better OCR results
             _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
             
-            # OCR
-            text = pytesseract.image_to_string(thresh)
+            # OCR, in a slot of the shared pool
+            with tempfile.TemporaryDirectory(prefix="ocr_") as output_dir:
+                image_path = os.path.join(output_dir, "page.png")
+                cv2.imwrite(image_path, thresh)
+                text, _ = self._ocr_pool.submit(_ocr_image_file, image_path).result()
             
-            content = []
-            if text.strip():
-                paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-                for para_num, paragraph in enumerate(paragraphs, 1):
-                    content.append({
-                        "page": 1,
-                        "paragraph": para_num,
-                        "text": paragraph,
-                        "citation": f"Page 1, Para {para_num}"
-                    })
+            content = list(self.chunker.chunk(self._paragraph_units(text, 1), paged=True))
             
             return {"doc_id": doc_id, "content": content, "total_pages": 1}
             
@@ -104,18 +198,20 @@ class DocumentProcessor:
     def _process_docx(self, file_path: str, doc_id: str) -> Dict:
         """Extract text from DOCX file"""
         try:
+            from docx import Document
+            
             doc = Document(file_path)
-            content = []
-            
-            for para_num, paragraph in enumerate(doc.paragraphs, 1):
-                text = paragraph.text.strip()
-                if text:
-                    content.append({
-                        "page": 1,  # DOCX doesn't have clear page breaks
-                        "paragraph": para_num,
-                        "text": text,
-                        "citation": f"Para {para_num}"
-                    })
+            
+            units = (
+                {
+                    "page": 1,  # DOCX doesn't have clear page breaks
+                    "paragraph": para_num,
+                    "text": paragraph.text
+                }
+                for para_num, paragraph in enumerate(doc.paragraphs, 1)
+                if paragraph.text.strip()
+            )
+            content = list(self.chunker.chunk(units, paged=False))
             
             return {"doc_id": doc_id, "content": content, "total_pages": 1}
             
@@ -129,16 +225,7 @@ class DocumentProcessor:
             with open(file_path, 'r', encoding='utf-8') as file:
                 text = file.read()
             
-            content = []
-            paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-            
-            for para_num, paragraph in enumerate(paragraphs, 1):
-                content.append({
-                    "page": 1,
-                    "paragraph": para_num,
-                    "text": paragraph,
-                    "citation": f"Para {para_num}"
-                })
+            content = list(self.chunker.chunk(self._paragraph_units(text, 1), paged=False))
             
             return {"doc_id": doc_id, "content": content, "total_pages": 1}
             
@@ -146,31 +233,98 @@ class DocumentProcessor:
             logger.error(f"Error processing TXT {doc_id}: {str(e)}")
             return {"doc_id": doc_id, "content": [], "error": str(e)}
     
-    def _ocr_pdf_page(self, pdf_path: str, page_num: int) -> str:
+    def _paragraph_units(self, text: str, page_num: int) -> Iterator[Dict]:
+        """Split page text into paragraph units for the chunker"""
+        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+        for para_num, paragraph in enumerate(paragraphs, 1):
+            yield {"page": page_num, "paragraph": para_num, "text": paragraph}
+    
+    def _ocr_pdf_pages(self, pdf_path: str, page_numbers: List[int], progress: Callable = lambda **counters: None) -> Dict[int, Tuple[str, float]]:
         """
-        OCR a specific PDF page using pdf2image and pytesseract.
+        OCR several PDF pages using pdf2image and tesseract.
+
+        Pages are rasterized in bulk to a temporary directory, at most
+        ocr_batch_pages at a time so peak memory and disk stay bounded, and
+        OCR'd on the shared pool of ocr_workers threads. Each worker drives its
+        own tesseract process, so the pool spreads OCR across cores without
+        pickling images.
 
         Args:
             pdf_path (str): Path to the PDF file.
-            page_num (int): Page number to OCR (0-indexed).
+            page_numbers (List[int]): Pages to OCR (1-indexed).
 
         Returns:
-            str: Extracted text from the page, or empty string on failure.
+            Dict[int, Tuple[str, float]]: Page number -> (text, OCR seconds).
+            Pages that fail come back as empty text.
         """
-        try:
-            # Convert the specific page to an image (page_num is zero-based)
-            images = convert_from_path(pdf_path, first_page=page_num + 1, last_page=page_num + 1)
-            if not images:
-                logger.error(f"No images extracted from page {page_num} of {pdf_path}")
-                return ""
+        from pdf2image import convert_from_path
+        
+        results = {}
+        start = time.perf_counter()
+        
+        with tempfile.TemporaryDirectory(prefix="ocr_") as output_dir:
+            for batch in self._page_batches(page_numbers):
+                futures = {}
+                for first_page, last_page in batch:
+                    try:
+                        image_paths = convert_from_path(
+                            pdf_path,
+                            dpi=self.ocr_dpi,
+                            first_page=first_page,
+                            last_page=last_page,
+                            output_folder=output_dir,
+                            output_file=f"p{first_page:06d}x",  # Fixed width so no prefix contains another
+                            fmt="png",
+                            paths_only=True,
+                            thread_count=self.ocr_workers
+                        )
+                    except Exception as e:
+                        logger.error(f"Error rasterizing pages {first_page}-{last_page} of {pdf_path}: {str(e)}")
+                        continue
+                    
+                    for image_path in image_paths:
+                        # pdftoppm names each file <prefix>-<page number>.png
+                        page_num = int(os.path.splitext(image_path)[0].rsplit("-", 1)[1])
+                        futures[self._ocr_pool.submit(_ocr_image_file, image_path)] = (page_num, image_path)
+                
+                for future in as_completed(futures):
+                    page_num, image_path = futures[future]
+                    try:
+                        results[page_num] = future.result()
+                        logger.debug(f"OCR'd page {page_num} of {pdf_path} in {results[page_num][1]:.2f}s")
+                    except Exception as e:
+                        logger.error(f"Error OCRing PDF page {page_num} in {pdf_path}: {str(e)}")
+                        results[page_num] = ("", 0.0)
+                    finally:
+                        os.remove(image_path)
+                    progress(pages_ocr=len(results))
+        
+        if results:
+            ocr_seconds = [seconds for _, seconds in results.values()]
+            logger.info(
+                f"OCR'd {len(results)} pages of {pdf_path} in {time.perf_counter() - start:.1f}s "
+                f"on {self.ocr_workers} shared workers (per page: mean {sum(ocr_seconds) / len(ocr_seconds):.2f}s, "
+                f"max {max(ocr_seconds):.2f}s)"
+            )
+        
+        return results
+    
+    def _page_batches(self, page_numbers: List[int]) -> List[List[Tuple[int, int]]]:
+        """Split pages into batches of contiguous (first, last) runs, ocr_batch_pages pages per batch"""
+        batches = []
+        batch = []
+        batch_size = 0
+        for page_num in sorted(page_numbers):
+            if batch_size == self.ocr_batch_pages:
+                batches.append(batch)
+                batch, batch_size = [], 0
             
-            page_image = images[0]
-
-            # OCR the image using pytesseract
-            text = pytesseract.image_to_string(page_image)
-
-            return text
-
-        except Exception as e:
-            logger.error(f"Error OCRing PDF page {page_num} in {pdf_path}: {str(e)}")
-            return ""
+            if batch and batch[-1][1] == page_num - 1:
+                batch[-1] = (batch[-1][0], page_num)
+            else:
+                batch.append((page_num, page_num))
+            batch_size += 1
+        
+        if batch:
+            batches.append(batch)
+        return batches
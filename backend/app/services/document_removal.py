@@ -0,0 +1,32 @@
+from typing import Dict, Optional, Tuple
+import logging
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.metadata_store import MetadataStore
+from app.services.vector_service import VectorService
+
+logger = logging.getLogger(__name__)
+
+def remove_document(
+    doc_id: str,
+    vector_service: VectorService,
+    metadata_store: MetadataStore,
+    llm_cache: Optional[LLMResponseCache] = None
+) -> Tuple[bool, Optional[Dict]]:
+    """
+    Delete a document everywhere it is stored: its chunks, its metadata row
+    and every cached LLM response whose prompt included it.
+
+    The API and bulk ingest both delete through here, so neither can leave
+    answers built from a removed document in the response cache.
+
+    Returns:
+        (whether the chunks were deleted, the metadata row that was removed or None)
+    """
+    deleted = vector_service.delete_document(doc_id)
+    if llm_cache is not None:
+        removed = llm_cache.invalidate_documents([doc_id])
+        if removed:
+            logger.info(f"Invalidated {removed} cached LLM responses for {doc_id}")
+    metadata = metadata_store.delete_document(doc_id)
+    return deleted, metadata
@@ -0,0 +1,343 @@
+"""
+Shared embedding model process.
+
+One EmbeddingServer owns the model; app workers and ingest processes use an
+EmbeddingClient, which has the EmbeddingService interface. Requests arriving
+within a few milliseconds of each other are encoded in one model call.
+
+Run from the backend directory:
+
+    python -m app.services.embedding_server
+
+Connections carry pickles, so the server only talks to clients holding its
+authkey, and listens on an owner-only Unix socket unless given a TCP address.
+"""
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple, Union
+import argparse
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Address = Union[str, Tuple[str, int]]
+
+def parse_address(address: str) -> Address:
+    """"host:port" -> TCP address tuple; anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return (host or "127.0.0.1", int(port))
+    return address
+
+def load_authkey(authkey: Optional[str], key_file: str, create: bool = False) -> bytes:
+    """
+    The handshake secret: authkey when configured, otherwise the contents of key_file.
+
+    There is deliberately no built-in default. With create=True (the server)
+    a random key is written to key_file, readable only by its owner, when
+    the file doesn't exist yet; clients only ever read it.
+    """
+    if authkey:
+        return authkey.encode("utf-8")
+
+    if create and not os.path.exists(key_file):
+        os.makedirs(os.path.dirname(os.path.abspath(key_file)), exist_ok=True)
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # Another server process got there first
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            logger.info(f"Generated embedding server authkey in {key_file}")
+
+    if not os.path.exists(key_file):
+        raise RuntimeError(
+            f"No embedding server authkey: set EMBEDDING_SERVER_AUTHKEY, or start the server first so it writes {key_file}"
+        )
+    if os.stat(key_file).st_mode & 0o077:
+        raise RuntimeError(f"{key_file} is accessible to other users; chmod 600 it")
+    with open(key_file) as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"{key_file} is empty")
+    return key.encode("utf-8")
+
+class EmbeddingServer:
+    """Serves encode requests for one EmbeddingService, micro-batching concurrent requests"""
+
+    def __init__(self, embedding_service, address: Address, authkey: bytes, max_batch: int = 256, max_wait: float = 0.005):
+        self.embedding_service = embedding_service
+        self.address = address
+        self.authkey = authkey
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+
+        # Batching counters
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._texts = 0
+
+    def serve_forever(self):
+        threading.Thread(target=self._batch_loop, name="embed-batcher", daemon=True).start()
+
+        if isinstance(self.address, str):
+            # A stale socket file from a previous run would make bind() fail
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+        else:
+            logger.warning(
+                f"Embedding server listening on TCP {self.address}: any host that can reach it with the authkey "
+                f"can run code in this process; prefer a Unix socket"
+            )
+
+        # Every app worker thread may open its own connection at once; the default backlog is 1
+        with Listener(self.address, backlog=128, authkey=self.authkey) as listener:
+            if isinstance(self.address, str):
+                os.chmod(self.address, 0o600)
+            logger.info(f"Embedding server for {self.embedding_service.model_name} listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # Bad authkey or a client that hung up mid-handshake
+                    logger.warning(f"Rejected embedding client: {str(e)}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        """Answer one client connection's requests in order until it closes"""
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    op = request.get("op")
+                    if op == "encode":
+                        future = Future()
+                        self._queue.put((request["texts"], future))
+                        response = {"ok": True, "embeddings": future.result()}
+                    elif op == "info":
+                        response = {
+                            "ok": True,
+                            "model": self.embedding_service.model_name,
+                            "backend": self.embedding_service.backend,
+                            "dimension": self.embedding_service.dimension
+                        }
+                    elif op == "stats":
+                        response = {"ok": True, "stats": self.get_stats()}
+                    else:
+                        response = {"ok": False, "error": f"Unknown op {op!r}"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+
+                try:
+                    conn.send(response)
+                except (EOFError, OSError):
+                    return
+
+    def _batch_loop(self):
+        """Collect requests for up to max_wait (or max_batch texts), then encode them together"""
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: List[Tuple[List[str], Future]]):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            embeddings = self.embedding_service.encode(texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for request_texts, future in batch:
+            future.set_result(embeddings[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+        with self._lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._texts += len(texts)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.embedding_service.get_stats(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "requests_per_batch": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "texts_per_batch": round(self._texts / self._batches, 1) if self._batches else 0.0,
+                "queued": self._queue.qsize()
+            }
+
+class EmbeddingClient:
+    """Drop-in for EmbeddingService that encodes through a shared EmbeddingServer"""
+
+    def __init__(
+        self,
+        address: Address,
+        authkey: bytes,
+        batch_size: int = 64,
+        connect_timeout: float = 60.0,
+        request_timeout: float = 60.0
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.batch_size = batch_size
+        # How long to wait for an answer before giving up on a hung or overloaded server
+        self.request_timeout = request_timeout
+        # Idle connections; each request checks one out, so threads never share a connection
+        self._idle = []
+        self._pool_lock = threading.Lock()
+
+        # Wait for the server, which may still be loading its model
+        info = self._call({"op": "info"}, connect_timeout)
+        self.model_name = info["model"]
+        self.backend = info.get("backend", "torch")
+        self.dimension = info["dimension"]
+
+        self._lock = threading.Lock()
+        self._chunks_encoded = 0
+        self._encode_seconds = 0.0
+
+    def _connect(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Embedding server not reachable at {self.address}")
+                time.sleep(0.5)
+
+    def _call(self, request: Dict, connect_timeout: float = 5.0, timeout: Optional[float] = None) -> Dict:
+        timeout = self.request_timeout if timeout is None else timeout
+        # One retry on a fresh connection covers a server restart between requests
+        for attempt in range(2):
+            with self._pool_lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect(connect_timeout)
+
+            try:
+                conn.send(request)
+                if not conn.poll(timeout):
+                    raise TimeoutError(
+                        f"Embedding server at {self.address} did not answer {request['op']!r} within {timeout:.0f}s"
+                    )
+                response = conn.recv()
+            except (EOFError, OSError) as e:
+                # Also drops a timed-out connection, whose late answer would go to the next request
+                conn.close()
+                if attempt or isinstance(e, TimeoutError):
+                    raise
+                continue
+
+            with self._pool_lock:
+                self._idle.append(conn)
+            if not response["ok"]:
+                raise RuntimeError(f"Embedding server error: {response['error']}")
+            return response
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into L2-normalized float32 vectors"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        start = time.perf_counter()
+        embeddings = self._call({"op": "encode", "texts": list(texts)})["embeddings"]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._chunks_encoded += len(texts)
+            self._encode_seconds += elapsed
+        return embeddings
+
+    def encode_query(self, query: str) -> np.ndarray:
+        return self.encode([query])[0]
+
+    def check(self, timeout: float = 5.0) -> Dict:
+        """Ping the server (health checks); raises if it doesn't answer within timeout"""
+        start = time.perf_counter()
+        info = self._call({"op": "info"}, connect_timeout=timeout, timeout=timeout)
+        return {
+            "address": str(self.address),
+            "model": info["model"],
+            "round_trip_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    def get_stats(self) -> Dict:
+        """Round-trip throughput from this process, plus the server's own counters"""
+        with self._lock:
+            stats = {
+                "model": self.model_name,
+                "batch_size": self.batch_size,
+                "server_address": str(self.address),
+                "chunks_encoded": self._chunks_encoded,
+                "encode_seconds": round(self._encode_seconds, 3),
+                "chunks_per_second": round(self._chunks_encoded / self._encode_seconds, 1) if self._encode_seconds else 0.0
+            }
+        try:
+            stats["server"] = self._call({"op": "stats"})["stats"]
+        except Exception as e:
+            stats["server"] = {"error": str(e)}
+        return stats
+
+def main():
+    from app.config import settings
+    from app.services.embedding_service import EmbeddingService
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=settings.EMBEDDING_SERVER_ADDRESS or settings.EMBEDDING_SERVER_SOCKET,
+                        help="Unix socket path or host:port")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--backend", default=settings.EMBEDDING_BACKEND, help="torch, onnx or onnx-int8")
+    parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    # The model batches internally, so its batch size can be the whole server batch
+    embedding_service = EmbeddingService(args.model, batch_size=args.max_batch, backend=args.backend,
+                                         onnx_dir=settings.EMBEDDING_ONNX_DIR)
+    logger.info(f"Loaded {args.model} ({args.backend}) in {time.perf_counter() - start:.2f}s")
+
+    server = EmbeddingServer(
+        embedding_service,
+        parse_address(args.address),
+        load_authkey(settings.EMBEDDING_SERVER_AUTHKEY, settings.EMBEDDING_SERVER_AUTHKEY_FILE, create=True),
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000
+    )
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
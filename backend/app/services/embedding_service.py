@@ -0,0 +1,78 @@
+from typing import List, Dict
+import numpy as np
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# torch: sentence-transformers in fp32; onnx / onnx-int8: ONNX Runtime with fp32 / int8 weights
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+class EmbeddingService:
+    """Single embedding engine shared by ingestion and query paths"""
+
+    def __init__(self, model_name: str, batch_size: int = 64, backend: str = "torch", onnx_dir: str = "./data/onnx"):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {EMBEDDING_BACKENDS}")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        if backend == "torch":
+            # Imported here: torch and sentence-transformers take seconds to import
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name)
+        else:
+            from app.services.onnx_embedder import OnnxEmbedder
+            self.model = OnnxEmbedder(model_name, quantize=backend == "onnx-int8", cache_dir=onnx_dir)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+        # Throughput counters
+        self._lock = threading.Lock()
+        self._chunks_encoded = 0
+        self._encode_seconds = 0.0
+        self._last_chunks_per_second = 0.0
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in batches into L2-normalized float32 vectors"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        start = time.perf_counter()
+        embeddings = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        elapsed = time.perf_counter() - start
+        self._record(len(texts), elapsed)
+
+        return embeddings.astype(np.float32, copy=False)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Encode a single query string"""
+        return self.encode([query])[0]
+
+    def _record(self, count: int, elapsed: float):
+        """Update throughput counters"""
+        with self._lock:
+            self._chunks_encoded += count
+            self._encode_seconds += elapsed
+            if elapsed > 0:
+                self._last_chunks_per_second = count / elapsed
+
+    def get_stats(self) -> Dict:
+        """Encode throughput since startup"""
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "backend": self.backend,
+                "batch_size": self.batch_size,
+                "chunks_encoded": self._chunks_encoded,
+                "encode_seconds": round(self._encode_seconds, 3),
+                "chunks_per_second": round(self._chunks_encoded / self._encode_seconds, 1) if self._encode_seconds else 0.0,
+                "last_chunks_per_second": round(self._last_chunks_per_second, 1)
+            }
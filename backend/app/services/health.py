@@ -0,0 +1,81 @@
+from typing import Callable, Dict, Iterable, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """Runs dependency checks in the background so health probes only read the last result"""
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], Dict]],
+        critical: Iterable[str] = (),
+        interval: float = 30.0,
+        timeout: float = 10.0
+    ):
+        # Each check returns a dict of details and raises if the dependency is unhealthy
+        self.checks = checks
+        # Checks that must pass for the instance to be ready for traffic
+        self.critical = set(critical)
+        self.interval = interval
+        self.timeout = timeout
+        self._results: Dict[str, Dict] = {}
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Run the checks once, then keep refreshing them (call from the app startup hook)"""
+        await self.refresh()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {str(e)}")
+
+    async def refresh(self):
+        """Run every check concurrently, each off the event loop and under a timeout"""
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._run_check(name) for name in names))
+        self._results = dict(zip(names, results))
+        self._checked_at = time.time()
+
+    async def _run_check(self, name: str) -> Dict:
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(asyncio.to_thread(self.checks[name]), timeout=self.timeout)
+            result = {"ok": True, **(detail or {})}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {self.timeout:.0f}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+
+        if not result["ok"] and self._results.get(name, {}).get("ok", True):
+            logger.warning(f"Health check {name} failing: {result['error']}")
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    def is_ready(self) -> bool:
+        """Checks have run and every critical one passed"""
+        return self._checked_at is not None and all(
+            self._results.get(name, {}).get("ok", False) for name in self.critical
+        )
+
+    def snapshot(self) -> Dict:
+        """Last check results, without running anything"""
+        return {
+            "ready": self.is_ready(),
+            "checked_at": self._checked_at,
+            "checks": dict(self._results)
+        }
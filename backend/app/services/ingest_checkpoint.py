@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, List
+import time
+
+from app.services.sqlite_store import SQLiteStore
+
+# pending: handed to the vector store but not confirmed; done / duplicate / failed: final
+CHECKPOINT_STATUSES = ("pending", "done", "duplicate", "failed")
+
+class IngestCheckpoint(SQLiteStore):
+    """Per-file state of bulk ingest runs, so an interrupted run resumes where it stopped"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            doc_id TEXT,
+            status TEXT NOT NULL,
+            chunks INTEGER,
+            error TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_files_status ON files(status);
+        CREATE INDEX IF NOT EXISTS idx_files_doc_id ON files(doc_id);
+    """
+
+    def load(self) -> Dict[str, Dict]:
+        """path -> checkpoint row, for every file seen by earlier runs"""
+        rows = self._connect().execute("SELECT * FROM files").fetchall()
+        return {row["path"]: dict(row) for row in rows}
+
+    def mark(self, entries: Iterable[Dict]):
+        """Insert or replace the state of several files in one transaction"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime, doc_id, status, chunks, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (entry["path"], entry["size"], entry["mtime"], entry.get("doc_id"), entry["status"],
+                     entry.get("chunks"), entry.get("error"), now)
+                    for entry in entries
+                ]
+            )
+
+    def with_status(self, status: str) -> List[Dict]:
+        rows = self._connect().execute("SELECT * FROM files WHERE status = ?", (status,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def is_referenced(self, doc_id: str, exclude_path: str) -> bool:
+        """Whether any file other than exclude_path is recorded against doc_id"""
+        row = self._connect().execute(
+            "SELECT 1 FROM files WHERE doc_id = ? AND path != ? AND status IN ('pending', 'done', 'duplicate') LIMIT 1",
+            (doc_id, exclude_path)
+        ).fetchone()
+        return row is not None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM files GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
@@ -0,0 +1,330 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import asyncio
+import copy
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from app.services.metadata_store import MetadataStore
+
+logger = logging.getLogger(__name__)
+
+# Terminal job states
+FINISHED_STATUSES = ("completed", "failed")
+
+# Progress ticks (one per page or embedding window) are written to the store at most this often per job
+PROGRESS_PERSIST_INTERVAL = 0.5
+
+def _owner_alive(owner: Optional[str], own: str) -> bool:
+    """
+    Whether the worker process that owns a job may still be running it.
+
+    Owners are "host:pid". The SQLite store can't be shared across hosts,
+    so another hostname means an earlier container; our own id means an
+    earlier run of this process that happened to get the same pid.
+    """
+    if not owner or owner == own:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class IngestionQueue:
+    """Job queue that runs document ingestion on a pool of worker threads"""
+
+    def __init__(
+        self,
+        handler: Callable[[Dict, Callable], Dict],
+        num_workers: int = 2,
+        max_history: int = 1000,
+        store: Optional[MetadataStore] = None
+    ):
+        # handler(job, progress) does the work and returns a result dict; it raises on failure
+        self.handler = handler
+        # With a store, job state is written through so any worker process can report on it
+        self.store = store
+        self.num_workers = num_workers
+        self.max_history = max_history
+        self.jobs: Dict[str, Dict] = {}
+        # Guards self.jobs only; store writes happen outside it, from snapshots
+        self._lock = threading.Lock()
+        self._progress_persisted_at: Dict[str, float] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        # Recorded on each job, so a restarted server can tell which jobs were orphaned
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def start(self):
+        """Start the worker tasks (call from the app startup hook)"""
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="ingest")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+        if self.store is not None:
+            await asyncio.to_thread(self._adopt_orphaned_jobs)
+
+        # Re-queue anything submitted before the workers were running, or adopted above
+        with self._lock:
+            pending = [job_id for job_id, job in self.jobs.items() if job["status"] == "queued"]
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+
+        logger.info(f"Started {self.num_workers} ingestion workers")
+
+    def _adopt_orphaned_jobs(self):
+        """Take over queued or processing jobs left behind by a worker process that is gone"""
+        orphaned = [
+            job
+            for status in ("queued", "processing")
+            for job in self.store.list_jobs(status, limit=self.max_history)
+            if job["job_id"] not in self.jobs and not _owner_alive(job.get("owner"), self.owner)
+        ]
+        adopted = 0
+        for job in sorted(orphaned, key=lambda job: job["created_at"]):
+            # Sibling workers start at the same time; only one of them gets each job
+            if not self.store.claim_job(job["job_id"], self.owner, job["status"], job.get("owner")):
+                continue
+
+            job.update({"owner": self.owner, "progress": self._empty_progress(), "started_at": None})
+            if job["file_path"] and os.path.exists(job["file_path"]):
+                # Retried attempts clear any chunks the interrupted one wrote
+                job["status"] = "queued"
+                adopted += 1
+            else:
+                job.update({"status": "failed", "error": "Interrupted by a restart; uploaded file is missing",
+                            "finished_at": time.time()})
+            with self._lock:
+                self.jobs[job["job_id"]] = job
+                snapshot = self._snapshot(job)
+            self._persist(snapshot)
+
+        if orphaned:
+            logger.info(f"Re-queued {adopted} of {len(orphaned)} ingestion jobs interrupted by a restart")
+
+    async def stop(self):
+        """Cancel the workers and wait for running handlers to finish"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def submit(self, doc_id: str, filename: str, file_path: str, content_hash: Optional[str] = None) -> Dict:
+        """
+        Queue a persisted upload for processing and return the new job.
+
+        When a queued or processing job already has the same content_hash,
+        nothing is queued and that job is returned (its doc_id differs from
+        the one passed in).
+        """
+        job = {
+            "job_id": f"JOB_{uuid.uuid4().hex[:12]}",
+            "doc_id": doc_id,
+            "filename": filename,
+            "file_path": file_path,
+            "content_hash": content_hash,
+            "status": "queued",
+            "progress": self._empty_progress(),
+            "error": None,
+            "result": None,
+            "attempts": 0,
+            "owner": self.owner,
+            "version": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+
+        if content_hash and self.store is not None:
+            # Claimed in the store, so identical uploads racing on other workers can't both win
+            winner = self.store.claim_content(job)
+            if winner is not None:
+                return self._public(winner)
+
+        with self._lock:
+            if content_hash and self.store is None:
+                winner = next((
+                    other for other in self.jobs.values()
+                    if other["content_hash"] == content_hash and other["status"] not in FINISHED_STATUSES
+                ), None)
+                if winner is not None:
+                    return self._public(winner)
+            self.jobs[job["job_id"]] = job
+            self._prune_history()
+            snapshot = self._snapshot(job)
+        self._persist(snapshot)
+        if self.store is not None:
+            self.store.prune_jobs(self.max_history)
+
+        if self._queue is not None:
+            self._queue.put_nowait(job["job_id"])
+
+        return self._public(job)
+
+    def retry(self, job_id: str) -> Optional[Dict]:
+        """Re-queue a failed job; returns None if the job doesn't exist or hasn't failed"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None and self.store is not None:
+                # Submitted by another worker process; this one will run the retry
+                job = self.store.get_job(job_id)
+                if job is not None:
+                    self.jobs[job_id] = job
+            if job is None or job["status"] != "failed":
+                return None
+
+            job.update({
+                "status": "queued",
+                "owner": self.owner,
+                "progress": self._empty_progress(),
+                "error": None,
+                "started_at": None,
+                "finished_at": None
+            })
+            snapshot = self._snapshot(job)
+        self._persist(snapshot)
+        public = self._public(snapshot)
+
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+        return public
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a single job"""
+        if self.store is not None:
+            job = self.store.get_job(job_id)
+            return self._public(job) if job is not None else None
+
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return self._public(job) if job is not None else None
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Dict]:
+        """Snapshots of all known jobs, newest first"""
+        if self.store is not None:
+            return [self._public(job) for job in self.store.list_jobs(status, limit=self.max_history)]
+
+        with self._lock:
+            jobs = [self._public(job) for job in self.jobs.values() if status is None or job["status"] == status]
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        """Pull job ids off the queue and run the handler in the thread pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self._queue.get()
+            try:
+                with self._lock:
+                    job = self.jobs.get(job_id)
+                    if job is None or job["status"] != "queued":
+                        continue
+                    job["status"] = "processing"
+                    job["attempts"] += 1
+                    job["started_at"] = time.time()
+                    job_snapshot = self._snapshot(job)
+                # SQLite writes can wait on other writers; keep them off the event loop
+                await asyncio.to_thread(self._persist, job_snapshot)
+
+                def progress(**counters):
+                    self._update_progress(job_id, counters)
+
+                try:
+                    result = await loop.run_in_executor(self._executor, self.handler, job_snapshot, progress)
+                    outcome = self._finish(job_id, "completed", result=result)
+                except Exception as e:
+                    logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+                    outcome = self._finish(job_id, "failed", error=str(e))
+                if outcome is not None:
+                    await asyncio.to_thread(self._persist, outcome)
+            finally:
+                self._queue.task_done()
+
+    def _update_progress(self, job_id: str, counters: Dict):
+        """Called from worker threads as parsing, OCR and embedding advance"""
+        now = time.monotonic()
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job["progress"].update(counters)
+            # Every tick updates memory; the store gets the latest state every PROGRESS_PERSIST_INTERVAL
+            if now - self._progress_persisted_at.get(job_id, 0.0) < PROGRESS_PERSIST_INTERVAL:
+                return
+            self._progress_persisted_at[job_id] = now
+            snapshot = self._snapshot(job)
+        self._persist(snapshot)
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None) -> Optional[Dict]:
+        """Record the outcome of a job in memory; returns the snapshot to persist"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            self._progress_persisted_at.pop(job_id, None)
+            if job is None:
+                return None
+            job.update({
+                "status": status,
+                "result": result,
+                "error": error,
+                "finished_at": time.time()
+            })
+            return self._snapshot(job)
+
+    def _snapshot(self, job: Dict) -> Dict:
+        """Bump a job's version and copy it for persisting (called with the lock held)"""
+        job["version"] = (job.get("version") or 0) + 1
+        return copy.deepcopy(job)
+
+    def _persist(self, job: Dict):
+        """Write a job snapshot through to the shared store (called without the lock)"""
+        if self.store is not None:
+            try:
+                self.store.save_job(job)
+            except Exception as e:
+                logger.error(f"Failed to persist job {job['job_id']}: {str(e)}")
+
+    def _prune_history(self):
+        """Forget the oldest finished in-memory jobs once max_history is exceeded"""
+        excess = len(self.jobs) - self.max_history
+        if excess <= 0:
+            return
+
+        finished = sorted(
+            (job for job in self.jobs.values() if job["status"] in FINISHED_STATUSES),
+            key=lambda job: job["created_at"]
+        )
+        for job in finished[:excess]:
+            del self.jobs[job["job_id"]]
+
+    def _empty_progress(self) -> Dict:
+        return {
+            "pages_total": 0,
+            "pages_parsed": 0,
+            "pages_ocr": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0
+        }
+
+    def _public(self, job: Dict) -> Dict:
+        """Copy of a job without server-side paths or process ids"""
+        public = copy.deepcopy(job)
+        public.pop("file_path", None)
+        public.pop("owner", None)
+        return public
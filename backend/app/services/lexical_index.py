@@ -0,0 +1,137 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+import sqlite3
+import time
+
+from app.services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Identifiers such as "2021-CV-04817" or "s.12-3" stay whole: hyphens are token characters
+TOKEN_PATTERN = re.compile(r"[\w-]+", re.UNICODE)
+
+# Words that match nearly every chunk; BM25 gives them ~0 weight but FTS5 still has to score every row
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was "
+    "were what when where which who why will with about does did do".split()
+)
+
+# SQLite VM instructions between deadline checks while a search runs
+DEADLINE_CHECK_INTERVAL = 1000
+
+class LexicalIndex(SQLiteStore):
+    """BM25 full-text index (SQLite FTS5) over the same chunk ids as the vector collection"""
+
+    SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+            chunk_id UNINDEXED,
+            doc_id UNINDEXED,
+            text,
+            tokenize = "unicode61 tokenchars '-'"
+        );
+        -- FTS5 can't index doc_id, so deletes look up a document's rows here and remove them by rowid
+        CREATE TABLE IF NOT EXISTS chunk_rows (
+            row_id INTEGER PRIMARY KEY,
+            doc_id TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chunk_rows_doc_id ON chunk_rows(doc_id);
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self._backfill_chunk_rows()
+
+    def _backfill_chunk_rows(self):
+        """One-off fill of chunk_rows for indexes built before it existed"""
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM chunk_rows LIMIT 1").fetchone() is not None:
+            return
+        with conn:
+            cursor = conn.execute("INSERT INTO chunk_rows (row_id, doc_id) SELECT rowid, doc_id FROM chunks_fts")
+        if cursor.rowcount > 0:
+            logger.info(f"Backfilled lexical index row map with {cursor.rowcount} chunks")
+
+    def add(self, doc_id: str, chunks: Iterable[Tuple[str, str]]):
+        """Index (chunk_id, text) pairs of one document"""
+        conn = self._connect()
+        with conn:
+            row_ids = [
+                conn.execute(
+                    "INSERT INTO chunks_fts (chunk_id, doc_id, text) VALUES (?, ?, ?)", (chunk_id, doc_id, text)
+                ).lastrowid
+                for chunk_id, text in chunks
+            ]
+            conn.executemany(
+                "INSERT INTO chunk_rows (row_id, doc_id) VALUES (?, ?)", [(row_id, doc_id) for row_id in row_ids]
+            )
+
+    def delete_document(self, doc_id: str):
+        """Remove a document's chunks by rowid, without scanning the FTS table"""
+        conn = self._connect()
+        with conn:
+            row_ids = [row[0] for row in conn.execute("SELECT row_id FROM chunk_rows WHERE doc_id = ?", (doc_id,))]
+            conn.executemany("DELETE FROM chunks_fts WHERE rowid = ?", [(row_id,) for row_id in row_ids])
+            conn.execute("DELETE FROM chunk_rows WHERE doc_id = ?", (doc_id,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM chunks_fts")
+            conn.execute("DELETE FROM chunk_rows")
+
+    def count(self) -> int:
+        """Number of indexed chunks"""
+        return self._connect().execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0]
+
+    @staticmethod
+    def build_match(query: str) -> str:
+        """
+        Turn free text into an FTS5 MATCH expression.
+
+        Every term is quoted, so user input can never be parsed as FTS5 syntax,
+        and terms are OR-ed so partial matches still rank.
+        """
+        terms = []
+        for token in TOKEN_PATTERN.findall(query.lower()):
+            token = token.strip("-")
+            if token and token not in STOPWORDS and token not in terms:
+                terms.append(token)
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def search(self, query: str, limit: int = 10, deadline: Optional[float] = None) -> List[Dict]:
+        """
+        Best BM25 matches for a query.
+
+        With a deadline (a time.monotonic() value), SQLite abandons the query
+        once it passes and the search returns no matches, so a caller that
+        has stopped waiting doesn't keep a thread busy.
+
+        Returns:
+            [{"chunk_id", "doc_id", "score"}], best first; score is the negated
+            FTS5 bm25() value, so higher is better.
+        """
+        match = self.build_match(query)
+        if not match:
+            return []
+
+        conn = self._connect()
+        if deadline is not None:
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, DEADLINE_CHECK_INTERVAL)
+        try:
+            rows = conn.execute(
+                "SELECT chunk_id, doc_id, bm25(chunks_fts) AS rank FROM chunks_fts "
+                "WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            if deadline is not None and time.monotonic() > deadline:
+                logger.debug(f"Lexical search interrupted at its deadline: {str(e)}")
+            else:
+                logger.error(f"Lexical search failed: {str(e)}")
+            return []
+        finally:
+            if deadline is not None:
+                conn.set_progress_handler(None, 0)
+
+        return [{"chunk_id": row["chunk_id"], "doc_id": row["doc_id"], "score": -row["rank"]} for row in rows]
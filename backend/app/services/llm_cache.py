@@ -0,0 +1,155 @@
+from typing import Dict, Iterable, Optional
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+from app.services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache(SQLiteStore):
+    """Persistent, content-addressed cache of raw LLM responses backed by SQLite"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+        CREATE TABLE IF NOT EXISTS response_docs (
+            key TEXT NOT NULL REFERENCES responses(key) ON DELETE CASCADE,
+            doc_id TEXT NOT NULL,
+            PRIMARY KEY (key, doc_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_response_docs_doc_id ON response_docs(doc_id);
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        super().__init__(db_path)
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        """Content address for a (model, prompt) pair"""
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None"""
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache read failed: {str(e)}")
+            row = None
+
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return row[0] if row is not None else None
+
+    def put(self, key: str, response: str, doc_ids: Iterable[str]):
+        """Store a response and record which documents contributed to its prompt"""
+        try:
+            now = time.time()
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, response, len(response.encode("utf-8")), now, now)
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO response_docs (key, doc_id) VALUES (?, ?)",
+                    [(key, doc_id) for doc_id in set(doc_ids)]
+                )
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used responses until the cache fits in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+
+        with conn:
+            conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+        with self._stats_lock:
+            self.evictions += len(evicted)
+
+    def invalidate_documents(self, doc_ids: Iterable[str]) -> int:
+        """Drop every cached response whose prompt included one of the given documents"""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+
+        try:
+            conn = self._connect()
+            placeholders = ",".join("?" for _ in doc_ids)
+            with conn:
+                cursor = conn.execute(
+                    f"DELETE FROM responses WHERE key IN "
+                    f"(SELECT key FROM response_docs WHERE doc_id IN ({placeholders}))",
+                    doc_ids
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache invalidation failed: {str(e)}")
+            return 0
+
+    def clear(self):
+        """Drop all cached responses"""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache clear failed: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and on-disk size"""
+        try:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,205 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+JSON_SHAPES = ("clean", "fenced", "prose", "invalid", "mixed")
+
+class RetryableLLMError(Exception):
+    """Transient provider failure (rate limit, overload, outage) worth retrying"""
+
+class LLMResponse:
+    """Text of one model response plus token counts, when the provider reports them"""
+
+    def __init__(self, text: str, prompt_tokens: Optional[int] = None, response_tokens: Optional[int] = None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.response_tokens = response_tokens
+
+class LLMProvider:
+    """A model backend for LLMService; generate() is blocking and called from worker threads"""
+
+    name = "base"
+    model_name = ""
+    # Exceptions LLMService retries with backoff
+    retryable_errors: Tuple[type, ...] = (RetryableLLMError,)
+
+    def generate(self, prompt: str, json_mode: bool = False) -> LLMResponse:
+        raise NotImplementedError
+
+    def check(self) -> Dict:
+        """Cheap reachability check; raises if the backend is unavailable"""
+        raise NotImplementedError
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google-generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "models/gemini-1.5-flash"):
+        import google.generativeai as genai
+        from google.api_core import exceptions as google_exceptions
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.retryable_errors = (
+            RetryableLLMError,
+            google_exceptions.TooManyRequests,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+        )
+
+        # Native JSON output where the SDK supports it; parsing stays tolerant either way
+        try:
+            self._json_config = genai.GenerationConfig(response_mime_type="application/json")
+        except (AttributeError, TypeError):
+            logger.info("google-generativeai has no JSON response mode; relying on prompt instructions")
+            self._json_config = None
+
+    def generate(self, prompt: str, json_mode: bool = False) -> LLMResponse:
+        if json_mode and self._json_config is not None:
+            response = self.model.generate_content(prompt, generation_config=self._json_config)
+        else:
+            response = self.model.generate_content(prompt)
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            return LLMResponse(response.text, usage.prompt_token_count, usage.candidates_token_count)
+        return LLMResponse(response.text)
+
+    def check(self) -> Dict:
+        # count_tokens needs no generation and isn't billed
+        self.model.count_tokens("ping")
+        return {"provider": self.name, "model": self.model_name}
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Local stand-in for load tests and benchmarks: no network, no quota.
+
+    Responses are derived from the prompt (the same prompt always gets the
+    same answer, so the response cache behaves as in production) and follow
+    the extraction, batch and theme JSON formats LLMService asks for.
+
+    Args:
+        latency: Mean seconds per call.
+        latency_jitter: Uniform +/- seconds added to each call.
+        failure_rate: Fraction of calls raising RetryableLLMError.
+        json_shape: "clean", "fenced" (markdown fences), "prose" (text around
+            the JSON), "invalid" (no JSON at all) or "mixed" (random per call).
+        seed: Seed for latency and failure draws.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.3,
+        latency_jitter: float = 0.1,
+        failure_rate: float = 0.0,
+        json_shape: str = "clean",
+        seed: Optional[int] = None
+    ):
+        if json_shape not in JSON_SHAPES:
+            raise ValueError(f"Unknown json_shape {json_shape!r}; expected one of {JSON_SHAPES}")
+
+        self.model_name = f"fake-{json_shape}"
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.json_shape = json_shape
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt: str, json_mode: bool = False) -> LLMResponse:
+        with self._rng_lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.latency_jitter, self.latency_jitter))
+            fail = self._rng.random() < self.failure_rate
+            shape = self._rng.choice(JSON_SHAPES[:4]) if self.json_shape == "mixed" else self.json_shape
+
+        time.sleep(delay)
+        if fail:
+            raise RetryableLLMError("Simulated rate limit")
+
+        payload = self._respond(prompt)
+        return LLMResponse(self._shape(payload, shape))
+
+    def check(self) -> Dict:
+        return {"provider": self.name, "model": self.model_name}
+
+    def _respond(self, prompt: str) -> Any:
+        """Structured payload matching whichever format the prompt asks for"""
+        if '"answers": [' in prompt:
+            return {"answers": [self._extraction(doc_id, section) for doc_id, section in self._documents(prompt)]}
+        if '"themes": [' in prompt:
+            return self._themes(prompt)
+        if '"has_answer"' in prompt:
+            documents = self._documents(prompt)
+            return self._extraction(*documents[0]) if documents else self._extraction("unknown", "")
+        return "Simulated response."
+
+    def _documents(self, prompt: str) -> List[Tuple[str, str]]:
+        """(doc_id, content) sections of an extraction prompt"""
+        parts = re.split(r"Document ID: (\S+)", prompt)
+        return [(parts[i], parts[i + 1]) for i in range(1, len(parts) - 1, 2)]
+
+    def _extraction(self, doc_id: str, section: str) -> Dict:
+        chunks = re.findall(r"^\s*\[(\d+)\] \([^)]*\) (.*)$", section, re.MULTILINE)
+        digest = int(hashlib.sha1(f"{doc_id}\0{section}".encode("utf-8")).hexdigest(), 16)
+        if not chunks or digest % 4 == 0:
+            return {"doc_id": doc_id, "has_answer": False, "answer": "NO_RELEVANT_INFO", "relevant_chunks": []}
+
+        number, text = chunks[digest % len(chunks)]
+        return {
+            "doc_id": doc_id,
+            "has_answer": True,
+            "answer": f"According to {doc_id}: {' '.join(text.split()[:30])}",
+            "relevant_chunks": [int(number)]
+        }
+
+    def _themes(self, prompt: str) -> Dict:
+        doc_ids = re.findall(r"^\s*Document (?!Answers:)(\S+):", prompt, re.MULTILINE)
+        groups = [doc_ids[i::min(3, len(doc_ids))] for i in range(min(3, len(doc_ids)))] if doc_ids else []
+        return {
+            "themes": [
+                {
+                    "theme_name": f"Theme {number}",
+                    "description": f"Simulated theme covering {len(group)} documents",
+                    "supporting_documents": group,
+                    "synthesized_answer": f"Documents {', '.join(group)} agree on this point."
+                }
+                for number, group in enumerate(groups, 1)
+            ],
+            "overall_synthesis": f"Simulated synthesis across {len(doc_ids)} documents."
+        }
+
+    def _shape(self, payload: Any, shape: str) -> str:
+        """Render a payload the way real models sometimes do"""
+        if isinstance(payload, str):
+            return payload
+        text = json.dumps(payload, indent=2)
+        if shape == "fenced":
+            return f"```json\n{text}\n```"
+        if shape == "prose":
+            return f"Here is the analysis you asked for:\n{text}\nLet me know if you need more detail."
+        if shape == "invalid":
+            return "I could not format this as JSON, but the documents discuss the topic in general terms."
+        return text
+
+def create_provider(name: str, api_key: Optional[str] = None, model_name: str = "models/gemini-1.5-flash",
+                    **fake_options) -> LLMProvider:
+    """Provider selected by name ("gemini" or "fake")"""
+    if name == "gemini":
+        return GeminiProvider(api_key, model_name)
+    if name == "fake":
+        return FakeLLMProvider(**fake_options)
+    raise ValueError(f"Unknown LLM provider {name!r}")
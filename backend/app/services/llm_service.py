@@ -1,73 +1,313 @@
-import google.generativeai as genai
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterable, Optional, Tuple
+import asyncio
 import logging
-import json
+import math
+import random
 import re
+import threading
+import time
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_providers import LLMProvider, LLMResponse
+from app.services.structured_output import parse_json_response, validate_extraction, validate_themes
 
 logger = logging.getLogger(__name__)
 
+# Gemini averages roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, used for prompt budgeting without a count_tokens round-trip"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _valid_extraction(response_text: str) -> bool:
+    return validate_extraction(parse_json_response(response_text)) is not None
+
+def _valid_themes(response_text: str) -> bool:
+    return validate_themes(parse_json_response(response_text)) is not None
+
 class LLMService:
-    def __init__(self, api_key: str, model_name: str = "models/gemini-1.5-flash"):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
-        
-    def extract_answer_from_document(self, query: str, document_chunks: List[Dict]) -> Dict:
-        """Extract answer from a single document's chunks"""
-        try:
-            # Combine all chunks from the document
-            doc_text = "\n\n".join([chunk["text"] for chunk in document_chunks])
-            doc_id = document_chunks[0]["doc_id"]
-            
-            prompt = f"""
+    def __init__(
+        self,
+        provider: LLMProvider,
+        max_concurrency: int = 8,
+        call_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        cache: Optional[LLMResponseCache] = None,
+        context_token_budget: int = 3000,
+        batch_token_budget: int = 0,
+        batch_max_documents: int = 6,
+        batch_small_doc_tokens: int = 500
+    ):
+        # Gemini in production; FakeLLMProvider for offline load tests and benchmarks
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.cache = cache
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        # Document content tokens allowed in one extraction prompt
+        self.context_token_budget = context_token_budget
+        # Documents with at most batch_small_doc_tokens of context share one extraction call,
+        # up to batch_token_budget tokens and batch_max_documents per call (0 disables batching)
+        self.batch_token_budget = batch_token_budget
+        self.batch_max_documents = batch_max_documents
+        self.batch_small_doc_tokens = batch_small_doc_tokens
+
+        # Bounds the number of in-flight model calls across all queries. Calls run on their own
+        # threads so a hung upstream can't starve the default executor (cache, dedup, health).
+        # The semaphore is created on first use: this constructor may run on a worker thread,
+        # where Python 3.9's asyncio.Semaphore() can't find an event loop
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+        # Token usage and latency of every model call, for cost and latency dashboards
+        self._usage_lock = threading.Lock()
+        self._usage = {"calls": 0, "prompt_tokens": 0, "response_tokens": 0, "estimated": 0}
+        self._recent_calls = deque(maxlen=1000)
+        self._batch_stats = {"batches": 0, "batched_documents": 0, "batch_fallbacks": 0}
+        # Structured responses that parsed cleanly vs. ones that needed the fallback path
+        self._parse_stats = {kind: {"parsed": 0, "fallback": 0} for kind in ("extraction", "batch", "themes")}
+
+    def _generate(self, prompt: str, doc_ids: Iterable[str] = (), json_mode: bool = False,
+                  is_valid: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Run a model call, answering from the response cache when possible.
+
+        Responses are only cached when is_valid accepts them, so one that
+        fails to parse gets a fresh call next time instead of being replayed.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = LLMResponseCache.make_key(self.model_name, prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        response = self.provider.generate(prompt, json_mode)
+        response_text = response.text
+        self._record_usage(prompt, response, time.perf_counter() - start)
+
+        if cache_key is not None and (is_valid is None or is_valid(response_text)):
+            self.cache.put(cache_key, response_text, doc_ids)
+        return response_text
+
+    async def _generate_async(self, prompt: str, doc_ids: Iterable[str] = (), json_mode: bool = False,
+                              is_valid: Optional[Callable[[str], bool]] = None) -> str:
+        """Async variant of _generate, bounded by the shared scheduler"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = LLMResponseCache.make_key(self.model_name, prompt)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        response_text = await self._call_model_async(prompt, json_mode)
+
+        if cache_key is not None and (is_valid is None or is_valid(response_text)):
+            await asyncio.to_thread(self.cache.put, cache_key, response_text, list(doc_ids))
+        return response_text
+
+    async def _call_model_async(self, prompt: str, json_mode: bool = False) -> str:
+        """Run a model call off the event loop with a timeout and rate-limit backoff"""
+        attempt = 0
+        while True:
+            try:
+                if self._semaphore is None:
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                await self._semaphore.acquire()
+                start = time.perf_counter()
+                call = asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.provider.generate, prompt, json_mode
+                )
+                # A timeout only stops the wait: the slot stays taken until the thread really finishes
+                call.add_done_callback(self._release_slot)
+                response = await asyncio.wait_for(asyncio.shield(call), timeout=self.call_timeout)
+                latency = time.perf_counter() - start
+                response_text = response.text
+                self._record_usage(prompt, response, latency)
+                return response_text
+            except self.provider.retryable_errors as e:
+                if attempt >= self.max_retries:
+                    raise
+
+                # Exponential backoff with jitter, sleeping outside the semaphore
+                delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                logger.warning(
+                    f"{self.provider.name} call failed with {type(e).__name__}, "
+                    f"retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _release_slot(self, call: asyncio.Future):
+        self._semaphore.release()
+        if not call.cancelled():
+            # Retrieved so a call abandoned on timeout doesn't log "exception was never retrieved"
+            call.exception()
+
+    def _record_usage(self, prompt: str, response: LLMResponse, latency: float):
+        """Record token counts for one call, as reported by the provider when it can"""
+        if response.prompt_tokens is not None and response.response_tokens is not None:
+            prompt_tokens = response.prompt_tokens
+            response_tokens = response.response_tokens
+            estimated = False
+        else:
+            prompt_tokens = estimate_tokens(prompt)
+            response_tokens = estimate_tokens(response.text)
+            estimated = True
+
+        with self._usage_lock:
+            self._usage["calls"] += 1
+            self._usage["prompt_tokens"] += prompt_tokens
+            self._usage["response_tokens"] += response_tokens
+            self._usage["estimated"] += int(estimated)
+            self._recent_calls.append((prompt_tokens, response_tokens, latency))
+
+        logger.info(
+            f"LLM call: prompt_tokens={prompt_tokens} response_tokens={response_tokens} "
+            f"latency_ms={latency * 1000:.0f} estimated={estimated}"
+        )
+
+    def get_usage_stats(self) -> Dict:
+        """Cumulative token usage plus per-call averages and latency percentiles over recent calls"""
+        with self._usage_lock:
+            stats = dict(self._usage)
+            recent = list(self._recent_calls)
+
+        if recent:
+            latencies = sorted(call[2] for call in recent)
+            stats.update({
+                "avg_prompt_tokens": round(sum(call[0] for call in recent) / len(recent), 1),
+                "avg_response_tokens": round(sum(call[1] for call in recent) / len(recent), 1),
+                "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+                "latency_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+            })
+        with self._usage_lock:
+            stats["batching"] = dict(self._batch_stats)
+            stats["parsing"] = {
+                kind: {
+                    **counts,
+                    "fallback_rate": round(counts["fallback"] / (counts["parsed"] + counts["fallback"]), 3)
+                    if counts["parsed"] + counts["fallback"] else 0.0
+                }
+                for kind, counts in self._parse_stats.items()
+            }
+        return stats
+
+    def _count_parse(self, kind: str, parsed: bool):
+        with self._usage_lock:
+            self._parse_stats[kind]["parsed" if parsed else "fallback"] += 1
+
+    def check_reachable(self) -> Dict:
+        """Confirm the model backend answers, without generating anything"""
+        return self.provider.check()
+
+    def _doc_ids(self, items: List[Dict]) -> List[str]:
+        """Documents contributing to a prompt, used to invalidate cached responses"""
+        return sorted({item["doc_id"] for item in items if "doc_id" in item})
+
+    def clear_cache(self):
+        """Forget all cached responses"""
+        if self.cache is not None:
+            self.cache.clear()
+
+    def get_cache_stats(self) -> Dict:
+        """Response cache counters, or an empty dict when caching is disabled"""
+        return self.cache.get_stats() if self.cache is not None else {}
+
+    def _pack_chunks(self, document_chunks: List[Dict]) -> List[Dict]:
+        """Highest-relevance chunks that fit the context budget, returned in reading order"""
+        ranked = sorted(document_chunks, key=lambda chunk: -chunk.get("relevance_score", 0.0))
+        packed = []
+        used = 0
+        for chunk in ranked:
+            tokens = estimate_tokens(chunk["text"])
+            if packed and used + tokens > self.context_token_budget:
+                continue  # A shorter, less relevant chunk may still fit
+            packed.append(chunk)
+            used += tokens
+
+        return sorted(packed, key=lambda chunk: (chunk.get("page", 0), chunk.get("paragraph", 0)))
+
+    def _build_extraction_prompt(self, query: str, document_chunks: List[Dict]) -> str:
+        """Build the per-document answer extraction prompt from already packed chunks"""
+        # Number the chunks so relevant_chunks can be mapped back to citations
+        doc_text = "\n\n".join(
+            f"[{number}] ({chunk['citation']}) {chunk['text']}"
+            for number, chunk in enumerate(document_chunks, 1)
+        )
+        doc_id = document_chunks[0]["doc_id"]
+
+        return f"""
             Based on the following document content, answer the user's question.
             If the document contains relevant information, provide a clear answer.
             If the document doesn't contain relevant information, respond with "NO_RELEVANT_INFO".
-            
+
             Document ID: {doc_id}
-            Document Content:
+            Document Content (numbered chunks):
             {doc_text}
-            
+
             Question: {query}
-            
+
             Provide your answer in the following JSON format:
             {{
                 "has_answer": true/false,
                 "answer": "your answer here or NO_RELEVANT_INFO",
-                "relevant_chunks": [list of chunk indices that support the answer]
+                "relevant_chunks": [numbers of the chunks that support the answer, e.g. 1, 3]
             }}
             """
-            
-            response = self.model.generate_content(prompt)
-            
-            # Try to parse JSON response
-            try:
-                result = json.loads(response.text)
-            except:
-                # Fallback parsing
-                if "NO_RELEVANT_INFO" in response.text:
-                    result = {
-                        "has_answer": False,
-                        "answer": "NO_RELEVANT_INFO",
-                        "relevant_chunks": []
-                    }
-                else:
-                    result = {
-                        "has_answer": True,
-                        "answer": response.text,
-                        "relevant_chunks": [0]  # Default to first chunk
-                    }
-            
-            # Add citation information
-            if result["has_answer"]:
-                citations = []
-                for chunk_idx in result.get("relevant_chunks", [0]):
-                    if chunk_idx < len(document_chunks):
-                        citations.append(document_chunks[chunk_idx]["citation"])
-                
-                result["citation"] = ", ".join(citations) if citations else document_chunks[0]["citation"]
-            
-            return result
-            
+
+    def _parse_extraction_response(self, response_text: str, document_chunks: List[Dict]) -> Dict:
+        """Parse an extraction response and attach citations"""
+        result = validate_extraction(parse_json_response(response_text))
+        self._count_parse("extraction", result is not None)
+
+        if result is None:
+            # Fallback parsing
+            logger.warning(f"Unstructured extraction response: {response_text[:200]!r}")
+            if "NO_RELEVANT_INFO" in response_text:
+                result = {
+                    "has_answer": False,
+                    "answer": "NO_RELEVANT_INFO",
+                    "relevant_chunks": []
+                }
+            else:
+                result = {
+                    "has_answer": True,
+                    "answer": response_text,
+                    "relevant_chunks": [1]  # Default to first chunk
+                }
+
+        return self._attach_citations(result, document_chunks)
+
+    def _attach_citations(self, result: Dict, document_chunks: List[Dict]) -> Dict:
+        """Add citation information; chunk numbers are 1-based, as labelled in the prompt"""
+        if result["has_answer"]:
+            citations = []
+            for chunk_number in result.get("relevant_chunks") or [1]:
+                if isinstance(chunk_number, int) and 1 <= chunk_number <= len(document_chunks):
+                    citation = document_chunks[chunk_number - 1]["citation"]
+                    if citation not in citations:
+                        citations.append(citation)
+
+            result["citation"] = ", ".join(citations) if citations else document_chunks[0]["citation"]
+
+        return result
+
+    def extract_answer_from_document(self, query: str, document_chunks: List[Dict]) -> Dict:
+        """Extract answer from a single document's chunks"""
+        try:
+            packed = self._pack_chunks(document_chunks)
+            prompt = self._build_extraction_prompt(query, packed)
+            response_text = self._generate(prompt, self._doc_ids(packed), json_mode=True, is_valid=_valid_extraction)
+            return self._parse_extraction_response(response_text, packed)
+
         except Exception as e:
             logger.error(f"Error extracting answer from document: {str(e)}")
             return {
@@ -75,36 +315,201 @@ class LLMService:
                 "answer": f"Error processing document: {str(e)}",
                 "relevant_chunks": []
             }
-    
-    def identify_themes(self, query: str, document_answers: List[Dict]) -> Dict:
-        """Identify common themes across all document answers"""
+
+    async def aextract_answer_from_document(self, query: str, document_chunks: List[Dict]) -> Dict:
+        """Async variant of extract_answer_from_document using the bounded scheduler"""
         try:
-            # Filter documents that have relevant answers
-            relevant_answers = [
-                doc for doc in document_answers 
-                if doc.get("has_answer", False) and doc.get("answer", "") != "NO_RELEVANT_INFO"
-            ]
-            
-            if not relevant_answers:
-                return {
-                    "themes": [],
-                    "synthesis": "No relevant information found across the documents for this query."
-                }
-            
-            # Prepare context for theme identification
-            answers_context = ""
-            for i, doc in enumerate(relevant_answers):
-                answers_context += f"Document {doc['doc_id']}: {doc['answer']}\n\n"
-            
-            prompt = f"""
+            packed = self._pack_chunks(document_chunks)
+            prompt = self._build_extraction_prompt(query, packed)
+            response_text = await self._generate_async(
+                prompt, self._doc_ids(packed), json_mode=True, is_valid=_valid_extraction
+            )
+            return self._parse_extraction_response(response_text, packed)
+
+        except asyncio.TimeoutError:
+            doc_id = document_chunks[0]["doc_id"] if document_chunks else "unknown"
+            logger.error(f"Timed out extracting answer from document {doc_id}")
+            return {
+                "has_answer": False,
+                "answer": "Error processing document: timed out",
+                "relevant_chunks": []
+            }
+        except Exception as e:
+            logger.error(f"Error extracting answer from document: {str(e)}")
+            return {
+                "has_answer": False,
+                "answer": f"Error processing document: {str(e)}",
+                "relevant_chunks": []
+            }
+
+    def _plan_batches(self, doc_groups: Dict[str, List[Dict]]) -> List[Dict[str, List[Dict]]]:
+        """
+        Split documents into extraction calls.
+
+        Small documents are packed together under the batch token budget;
+        everything else gets a call of its own.
+        """
+        if self.batch_token_budget <= 0:
+            return [{doc_id: chunks} for doc_id, chunks in doc_groups.items()]
+
+        batches = []
+        current: Dict[str, List[Dict]] = {}
+        current_tokens = 0
+        for doc_id, chunks in doc_groups.items():
+            packed = self._pack_chunks(chunks)
+            tokens = sum(estimate_tokens(chunk["text"]) for chunk in packed)
+            if tokens > self.batch_small_doc_tokens:
+                batches.append({doc_id: packed})
+                continue
+
+            if current and (current_tokens + tokens > self.batch_token_budget or len(current) >= self.batch_max_documents):
+                batches.append(current)
+                current, current_tokens = {}, 0
+            current[doc_id] = packed
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _build_batch_prompt(self, query: str, batch: Dict[str, List[Dict]]) -> str:
+        """Build one extraction prompt covering several small documents"""
+        sections = []
+        for doc_id, chunks in batch.items():
+            doc_text = "\n".join(
+                f"[{number}] ({chunk['citation']}) {chunk['text']}"
+                for number, chunk in enumerate(chunks, 1)
+            )
+            sections.append(f"Document ID: {doc_id}\n{doc_text}")
+        documents_text = "\n\n".join(sections)
+
+        return f"""
+            Answer the user's question separately for each of the following documents,
+            using only that document's content. If a document doesn't contain relevant
+            information, use "NO_RELEVANT_INFO" as its answer.
+
+            Documents (chunks are numbered within each document):
+            {documents_text}
+
+            Question: {query}
+
+            Provide your answers in the following JSON format, with one entry per document:
+            {{
+                "answers": [
+                    {{
+                        "doc_id": "document ID",
+                        "has_answer": true/false,
+                        "answer": "your answer here or NO_RELEVANT_INFO",
+                        "relevant_chunks": [numbers of the chunks that support the answer, e.g. 1, 3]
+                    }}
+                ]
+            }}
+            """
+
+    def _parse_batch_response(self, response_text: str, batch: Dict[str, List[Dict]], count: bool = True) -> Dict[str, Dict]:
+        """Per-document answers from a batch response; documents missing from it are left out"""
+        data = parse_json_response(response_text)
+        entries = data.get("answers") if isinstance(data, dict) else None
+        if count:
+            self._count_parse("batch", isinstance(entries, list))
+        if not isinstance(entries, list):
+            return {}
+
+        answers = {}
+        for entry in entries:
+            doc_id = entry.get("doc_id") if isinstance(entry, dict) else None
+            result = validate_extraction(entry)
+            if doc_id not in batch or doc_id in answers or result is None:
+                continue
+            answers[doc_id] = self._attach_citations(result, batch[doc_id])
+        return answers
+
+    async def aextract_answers_batch(self, query: str, batch: Dict[str, List[Dict]]) -> List[Tuple[str, Dict]]:
+        """
+        Extract answers for several small documents with one call.
+
+        Documents the combined response doesn't answer cleanly (unparseable
+        output, a missing entry, or a failed call) fall back to their own calls.
+        """
+        answers: Dict[str, Dict] = {}
+        try:
+            prompt = self._build_batch_prompt(query, batch)
+            chunks = [chunk for doc_chunks in batch.values() for chunk in doc_chunks]
+            # Only a response answering every document is worth replaying from the cache
+            response_text = await self._generate_async(
+                prompt, self._doc_ids(chunks), json_mode=True,
+                is_valid=lambda text: len(self._parse_batch_response(text, batch, count=False)) == len(batch)
+            )
+            answers = self._parse_batch_response(response_text, batch)
+        except Exception as e:
+            logger.warning(f"Batched extraction for {len(batch)} documents failed: {str(e)}")
+
+        missing = [doc_id for doc_id in batch if doc_id not in answers]
+        with self._usage_lock:
+            self._batch_stats["batches"] += 1
+            self._batch_stats["batched_documents"] += len(batch)
+            self._batch_stats["batch_fallbacks"] += len(missing)
+
+        if missing:
+            logger.warning(f"Falling back to per-document extraction for {len(missing)} of {len(batch)} batched documents")
+            fallbacks = await asyncio.gather(
+                *(self.aextract_answer_from_document(query, batch[doc_id]) for doc_id in missing)
+            )
+            answers.update(zip(missing, fallbacks))
+
+        return [(doc_id, answers[doc_id]) for doc_id in batch]
+
+    async def iter_document_answers(
+        self, query: str, doc_groups: Dict[str, List[Dict]]
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield (doc_id, answer) pairs as soon as each extraction call finishes"""
+        async def run(batch: Dict[str, List[Dict]]) -> List[Tuple[str, Dict]]:
+            if len(batch) == 1:
+                doc_id, chunks = next(iter(batch.items()))
+                return [(doc_id, await self.aextract_answer_from_document(query, chunks))]
+            return await self.aextract_answers_batch(query, batch)
+
+        tasks = [asyncio.create_task(run(batch)) for batch in self._plan_batches(doc_groups)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for answer in await next_done:
+                    yield answer
+        finally:
+            # Don't leave calls running if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+
+    async def extract_answers(self, query: str, doc_groups: Dict[str, List[Dict]]) -> List[Tuple[str, Dict]]:
+        """Extract answers from all documents concurrently, keeping the doc_groups order"""
+        answers = {}
+        async for doc_id, answer in self.iter_document_answers(query, doc_groups):
+            answers[doc_id] = answer
+
+        return [(doc_id, answers[doc_id]) for doc_id in doc_groups]
+
+    def _relevant_answers(self, document_answers: List[Dict]) -> List[Dict]:
+        """Filter documents that have relevant answers"""
+        return [
+            doc for doc in document_answers
+            if doc.get("has_answer", False) and doc.get("answer", "") != "NO_RELEVANT_INFO"
+        ]
+
+    def _build_theme_prompt(self, query: str, relevant_answers: List[Dict]) -> str:
+        """Build the cross-document theme identification prompt"""
+        # Prepare context for theme identification
+        answers_context = ""
+        for i, doc in enumerate(relevant_answers):
+            answers_context += f"Document {doc['doc_id']}: {doc['answer']}\n\n"
+
+        return f"""
             Analyze the following answers from different documents and identify common themes.
             Group similar information together and provide a synthesized response.
-            
+
             Original Query: {query}
-            
+
             Document Answers:
             {answers_context}
-            
+
             Provide your analysis in the following JSON format:
             {{
                 "themes": [
@@ -117,79 +522,115 @@ class LLMService:
                 ],
                 "overall_synthesis": "Overall summary combining all themes"
             }}
-            
+
             Requirements:
             - Identify 1-3 main themes maximum
             - Each theme should have at least 2 supporting documents (if possible)
             - Provide clear, coherent synthesized answers
             - Reference specific document IDs
             """
-            
-            response = self.model.generate_content(prompt)
-            
-            try:
-                result = json.loads(response.text)
-            except:
-                # Fallback parsing
-                themes = []
-                if relevant_answers:
-                    # Create a simple theme grouping
-                    theme = {
-                        "theme_name": "Main Theme",
-                        "description": f"Information related to: {query}",
-                        "supporting_documents": [doc["doc_id"] for doc in relevant_answers],
-                        "synthesized_answer": self._simple_synthesis(relevant_answers)
-                    }
-                    themes.append(theme)
-                
-                result = {
-                    "themes": themes,
-                    "overall_synthesis": self._simple_synthesis(relevant_answers)
+
+    def _fallback_themes(self, query: str, relevant_answers: List[Dict], synthesis: str) -> Dict:
+        """Single-theme grouping used when the theme response can't be parsed"""
+        # Create a simple theme grouping
+        theme = {
+            "theme_name": "Main Theme",
+            "description": f"Information related to: {query}",
+            "supporting_documents": [doc["doc_id"] for doc in relevant_answers],
+            "synthesized_answer": synthesis
+        }
+
+        return {
+            "themes": [theme],
+            "overall_synthesis": synthesis
+        }
+
+    def _parse_theme_response(self, query: str, response_text: str, relevant_answers: List[Dict]) -> Dict:
+        """Parse a theme analysis, falling back to a single theme built locally"""
+        result = validate_themes(parse_json_response(response_text))
+        self._count_parse("themes", result is not None)
+
+        if result is None:
+            # Fallback parsing
+            logger.warning(f"Unstructured theme response: {response_text[:200]!r}")
+            result = self._fallback_themes(query, relevant_answers, self._simple_synthesis(relevant_answers))
+        return result
+
+    def identify_themes(self, query: str, document_answers: List[Dict]) -> Dict:
+        """Identify common themes across all document answers"""
+        try:
+            relevant_answers = self._relevant_answers(document_answers)
+
+            if not relevant_answers:
+                return {
+                    "themes": [],
+                    "synthesis": "No relevant information found across the documents for this query."
                 }
-            
-            return result
-            
+
+            prompt = self._build_theme_prompt(query, relevant_answers)
+            response_text = self._generate(prompt, self._doc_ids(relevant_answers), json_mode=True, is_valid=_valid_themes)
+            return self._parse_theme_response(query, response_text, relevant_answers)
+
         except Exception as e:
             logger.error(f"Error identifying themes: {str(e)}")
             return {
                 "themes": [],
                 "synthesis": f"Error analyzing themes: {str(e)}"
             }
-    
-    def _simple_synthesis(self, document_answers: List[Dict]) -> str:
-        """Simple fallback synthesis when JSON parsing fails"""
+
+    async def aidentify_themes(self, query: str, document_answers: List[Dict]) -> Dict:
+        """Async variant of identify_themes using the bounded scheduler"""
         try:
-            all_answers = " ".join([doc.get("answer", "") for doc in document_answers])
-            
-            prompt = f"""
-            Provide a brief synthesis of the following information:
-            {all_answers}
-            
-            Keep it concise and coherent, highlighting the main points.
-            """
-            
-            response = self.model.generate_content(prompt)
-            return response.text
-            
+            relevant_answers = self._relevant_answers(document_answers)
+
+            if not relevant_answers:
+                return {
+                    "themes": [],
+                    "synthesis": "No relevant information found across the documents for this query."
+                }
+
+            prompt = self._build_theme_prompt(query, relevant_answers)
+            response_text = await self._generate_async(
+                prompt, self._doc_ids(relevant_answers), json_mode=True, is_valid=_valid_themes
+            )
+            return self._parse_theme_response(query, response_text, relevant_answers)
+
+        except asyncio.TimeoutError:
+            logger.error("Timed out identifying themes")
+            return {
+                "themes": [],
+                "synthesis": "Error analyzing themes: timed out"
+            }
         except Exception as e:
-            return f"Multiple documents provide information about this topic. Please see individual document answers for details."
-    
+            logger.error(f"Error identifying themes: {str(e)}")
+            return {
+                "themes": [],
+                "synthesis": f"Error analyzing themes: {str(e)}"
+            }
+
+    def _simple_synthesis(self, document_answers: List[Dict]) -> str:
+        """Fallback synthesis assembled from the answers themselves, without another model call"""
+        parts = [f"{doc['doc_id']}: {doc['answer'].strip()}" for doc in document_answers if doc.get("answer")]
+        if not parts:
+            return "Multiple documents provide information about this topic. Please see individual document answers for details."
+        return " ".join(parts)
+
     def answer_general_question(self, query: str, context: str = "") -> str:
         """Answer general questions with optional context"""
         try:
             prompt = f"""
             Answer the following question clearly and concisely.
-            
+
             {f"Context: {context}" if context else ""}
-            
+
             Question: {query}
             """
-            
-            response = self.model.generate_content(prompt)
+
+            response = self.provider.generate(prompt)
             print("🔍 Raw Gemini response:\n", response.text)
 
             return response.text
-            
+
         except Exception as e:
             logger.error(f"Error answering general question: {str(e)}")
-            return f"Error generating response: {str(e)}"
\ No newline at end of file
+            return f"Error generating response: {str(e)}"
@@ -0,0 +1,265 @@
+from typing import Dict, Iterable, List, Optional
+import json
+import logging
+import os
+import time
+
+from app.services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FIELDS = (
+    "doc_id", "filename", "file_path", "source_path", "total_pages", "chunk_count",
+    "content_hash", "created_at", "ingested_at"
+)
+
+JOB_FIELDS = (
+    "job_id", "doc_id", "filename", "file_path", "content_hash", "status", "progress",
+    "error", "result", "attempts", "owner", "version", "created_at", "started_at", "finished_at"
+)
+
+class MetadataStore(SQLiteStore):
+    """Document metadata and ingestion jobs, persisted in SQLite and shared by all uvicorn workers"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            doc_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL DEFAULT 'Unknown',
+            file_path TEXT,
+            source_path TEXT,
+            total_pages INTEGER,
+            chunk_count INTEGER,
+            content_hash TEXT,
+            created_at REAL NOT NULL,
+            ingested_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at, doc_id);
+        CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
+
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            doc_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_path TEXT,
+            content_hash TEXT,
+            status TEXT NOT NULL,
+            progress TEXT,
+            error TEXT,
+            result TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            version INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_content_hash ON jobs(content_hash, status);
+    """
+
+    ADDED_COLUMNS = {
+        "jobs": {"content_hash": "TEXT", "owner": "TEXT", "version": "INTEGER NOT NULL DEFAULT 0"},
+        # file_path is a copy the app owns under UPLOAD_DIR; source_path is where bulk ingest read it from
+        "documents": {"source_path": "TEXT"}
+    }
+
+    # Documents
+
+    def upsert_document(self, doc_id: str, **fields):
+        """Insert or update a document row"""
+        fields = {key: value for key, value in fields.items() if key in DOCUMENT_FIELDS}
+        fields["doc_id"] = doc_id
+        fields.setdefault("created_at", time.time())
+
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields if column not in ("doc_id", "created_at"))
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT INTO documents ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(doc_id) DO UPDATE SET {updates}",
+                list(fields.values())
+            )
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        """Metadata for one document, or None"""
+        row = self._connect().execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_documents(self, doc_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Metadata for several documents, keyed by doc_id"""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return {}
+
+        placeholders = ",".join("?" for _ in doc_ids)
+        rows = self._connect().execute(
+            f"SELECT * FROM documents WHERE doc_id IN ({placeholders})", doc_ids
+        ).fetchall()
+        return {row["doc_id"]: dict(row) for row in rows}
+
+    def find_by_hash(self, content_hash: str) -> Optional[Dict]:
+        """An ingested document with exactly this content, or None"""
+        row = self._connect().execute(
+            "SELECT * FROM documents WHERE content_hash = ? AND ingested_at IS NOT NULL "
+            "ORDER BY created_at LIMIT 1",
+            (content_hash,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def list_documents(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Documents, newest first"""
+        rows = self._connect().execute(
+            "SELECT * FROM documents ORDER BY created_at DESC, doc_id DESC LIMIT ? OFFSET ?",
+            (limit, offset)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_documents(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def all_doc_ids(self) -> List[str]:
+        return [row[0] for row in self._connect().execute("SELECT doc_id FROM documents")]
+
+    def delete_document(self, doc_id: str) -> Optional[Dict]:
+        """Remove a document row, returning what was removed"""
+        document = self.get_document(doc_id)
+        if document is not None:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return document
+
+    def clear_documents(self) -> List[Dict]:
+        """Remove every document row, returning what was removed"""
+        conn = self._connect()
+        documents = [dict(row) for row in conn.execute("SELECT * FROM documents")]
+        with conn:
+            conn.execute("DELETE FROM documents")
+        return documents
+
+    def reconcile(self, vector_doc_ids: Iterable[str], upload_files: Dict[str, str]) -> Dict:
+        """
+        Make the document table agree with the vector collection.
+
+        Documents present in Chroma but unknown here (e.g. ingested before this
+        store existed) get a row named after their uploaded file; rows whose
+        chunks are gone from Chroma are dropped.
+
+        Args:
+            vector_doc_ids: Document ids present in the vector collection.
+            upload_files: doc_id -> uploaded file path, from the upload directory.
+        """
+        vector_doc_ids = set(vector_doc_ids)
+        known = set(self.all_doc_ids())
+
+        added = vector_doc_ids - known
+        for doc_id in added:
+            file_path = upload_files.get(doc_id)
+            self.upsert_document(
+                doc_id,
+                filename=os.path.basename(file_path) if file_path else "Unknown",
+                file_path=file_path,
+                ingested_at=time.time()
+            )
+
+        removed = known - vector_doc_ids
+        if removed:
+            conn = self._connect()
+            with conn:
+                conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(doc_id,) for doc_id in removed])
+
+        if added or removed:
+            logger.info(f"Reconciled metadata with vector store: {len(added)} added, {len(removed)} removed")
+        return {"added": len(added), "removed": len(removed)}
+
+    # Jobs
+
+    def save_job(self, job: Dict):
+        """
+        Insert or update an ingestion job.
+
+        Snapshots may be written from several threads out of order; one
+        with a lower version than the stored row is ignored.
+        """
+        conn = self._connect()
+        with conn:
+            self._write_job(conn, job)
+
+    def claim_content(self, job: Dict) -> Optional[Dict]:
+        """
+        Save a new job as the one ingesting its content_hash.
+
+        If a queued or processing job (from any worker process) already has
+        that hash, nothing is saved and that job is returned instead.
+        """
+        conn = self._connect()
+        with conn:
+            # Taking the write lock up front makes the check and the insert one atomic step
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE content_hash = ? AND status IN ('queued', 'processing') "
+                "ORDER BY created_at LIMIT 1",
+                (job["content_hash"],)
+            ).fetchone()
+            if row is not None:
+                return self._job_from_row(row)
+            self._write_job(conn, job)
+        return None
+
+    def _write_job(self, conn, job: Dict):
+        row = {field: job.get(field) for field in JOB_FIELDS}
+        row["progress"] = json.dumps(row["progress"] or {})
+        row["result"] = json.dumps(row["result"]) if row["result"] is not None else None
+        row["version"] = row["version"] or 0
+        updates = ", ".join(f"{field} = excluded.{field}" for field in JOB_FIELDS if field != "job_id")
+        conn.execute(
+            f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' for _ in JOB_FIELDS)}) "
+            f"ON CONFLICT(job_id) DO UPDATE SET {updates} WHERE excluded.version >= jobs.version",
+            [row[field] for field in JOB_FIELDS]
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job_from_row(row) if row is not None else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 1000) -> List[Dict]:
+        """Jobs, newest first"""
+        if status is None:
+            rows = self._connect().execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        return [self._job_from_row(row) for row in rows]
+
+    def claim_job(self, job_id: str, owner: str, status: str, previous_owner: Optional[str]) -> bool:
+        """Take over a job only if it is still in status and owned by previous_owner; False if someone else did"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET owner = ? WHERE job_id = ? AND status = ? AND owner IS ?",
+                (owner, job_id, status, previous_owner)
+            )
+        return cursor.rowcount == 1
+
+    def prune_jobs(self, keep: int):
+        """Drop the oldest finished jobs beyond the newest `keep`"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND job_id NOT IN "
+                "(SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                (keep,)
+            )
+
+    def _job_from_row(self, row) -> Dict:
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
@@ -0,0 +1,145 @@
+from typing import List, Optional
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class OnnxEmbedder:
+    """
+    Sentence embeddings from ONNX Runtime on CPU, optionally with int8 weights.
+
+    Mirrors the parts of SentenceTransformer that EmbeddingService uses, for
+    mean-pooled models such as all-MiniLM-L6-v2. The transformer is exported
+    to ONNX (and dynamically quantized) on first use and cached under cache_dir.
+    """
+
+    def __init__(self, model_name: str, quantize: bool = True, cache_dir: str = "./data/onnx",
+                 max_seq_length: int = 256, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        # Bare sentence-transformers names live under the sentence-transformers org
+        self.hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.quantize = quantize
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(self.hub_name)
+
+        model_dir = os.path.join(cache_dir, self.hub_name.replace("/", "__"))
+        model_path = self._prepare(model_dir)
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self._dimension = self.encode(["dimension probe"]).shape[1]
+
+    def _prepare(self, model_dir: str) -> str:
+        """Path of the ONNX model to load, exporting/quantizing it if not cached"""
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        int8_path = os.path.join(model_dir, "model.int8.onnx")
+
+        # Several worker processes may start at once; whoever gets the lock file exports
+        os.makedirs(model_dir, exist_ok=True)
+        with _ExportLock(os.path.join(model_dir, ".export.lock")):
+            if not os.path.exists(fp32_path):
+                self._export(fp32_path)
+            if self.quantize and not os.path.exists(int8_path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                start = time.perf_counter()
+                quantize_dynamic(fp32_path, int8_path + ".tmp", weight_type=QuantType.QInt8)
+                os.replace(int8_path + ".tmp", int8_path)
+                logger.info(f"Quantized {self.hub_name} to int8 in {time.perf_counter() - start:.1f}s")
+
+        return int8_path if self.quantize else fp32_path
+
+    def _export(self, path: str):
+        import torch
+        from transformers import AutoModel
+
+        start = time.perf_counter()
+        model = AutoModel.from_pretrained(self.hub_name)
+        model.eval()
+        sample = self.tokenizer(["an export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+        class TokenEmbeddings(torch.nn.Module):
+            """The transformer with only last_hidden_state as output; pooling stays in numpy"""
+
+            def __init__(self, transformer):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, *inputs):
+                return self.transformer(**dict(zip(input_names, inputs)))[0]
+
+        with torch.no_grad():
+            torch.onnx.export(
+                TokenEmbeddings(model),
+                tuple(sample[name] for name in input_names),
+                path + ".tmp",
+                input_names=input_names,
+                output_names=["token_embeddings"],
+                dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]},
+                opset_version=14
+            )
+        os.replace(path + ".tmp", path)
+        logger.info(f"Exported {self.hub_name} to ONNX in {time.perf_counter() - start:.1f}s")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str], batch_size: int = 64, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True, show_progress_bar: bool = False) -> np.ndarray:
+        """Mean-pooled (optionally L2-normalized) float32 embeddings, in input order"""
+        embeddings = None
+        # Batching texts of similar length keeps padding, and wasted compute, low
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for batch_start in range(0, len(texts), batch_size):
+            indices = order[batch_start:batch_start + batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[indices] = pooled
+
+        if embeddings is None:
+            return np.zeros((0, self._dimension), dtype=np.float32)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+class _ExportLock:
+    """Exclusive lock file, so only one process exports a model at a time"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        import fcntl
+
+        self._file = open(self.path, "w")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        import fcntl
+
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
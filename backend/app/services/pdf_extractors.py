@@ -0,0 +1,78 @@
+from typing import Callable, Iterator, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACTORS = ("auto", "pymupdf", "pypdf2")
+
+class PdfTextExtractor:
+    """Text-layer extraction for PDFs, one page at a time"""
+
+    name = "base"
+
+    def iter_pages(self, file_path: str, on_page_count: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        (page_number, text) for each page in order, 1-indexed.
+
+        on_page_count gets the total as soon as the file is open, so callers
+        that report progress don't have to parse the file a second time.
+        """
+        raise NotImplementedError
+
+class PyMuPDFExtractor(PdfTextExtractor):
+    """
+    MuPDF through PyMuPDF: C parser, several times faster than PyPDF2 on large or complex files.
+
+    PyMuPDF is AGPL-3.0, so it is an optional dependency and never the default.
+    """
+
+    name = "pymupdf"
+
+    def __init__(self):
+        import fitz
+        self._fitz = fitz
+
+    def iter_pages(self, file_path: str, on_page_count: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[int, str]]:
+        with self._fitz.open(file_path) as document:
+            if on_page_count:
+                on_page_count(document.page_count)
+            for index in range(document.page_count):
+                page = document.load_page(index)
+                text = page.get_text("text", sort=True)
+                # Drop the page's display list before loading the next one
+                del page
+                yield index + 1, text
+
+class PyPDF2Extractor(PdfTextExtractor):
+    """
+    Pure-Python fallback; needs no binary wheels.
+
+    PdfReader caches every object it has parsed until it is closed, so
+    memory grows with the part of the file read so far, not just one page.
+    """
+
+    name = "pypdf2"
+
+    def iter_pages(self, file_path: str, on_page_count: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[int, str]]:
+        import PyPDF2
+
+        with open(file_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            pages = reader.pages
+            if on_page_count:
+                on_page_count(len(pages))
+            for index in range(len(pages)):
+                yield index + 1, pages[index].extract_text() or ""
+
+def create_pdf_extractor(name: str = "pypdf2") -> PdfTextExtractor:
+    """Extractor by name; "auto" prefers PyMuPDF and falls back to PyPDF2 when it isn't installed"""
+    if name not in PDF_EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor {name!r}; expected one of {PDF_EXTRACTORS}")
+    if name in ("auto", "pymupdf"):
+        try:
+            return PyMuPDFExtractor()
+        except ImportError:
+            if name == "pymupdf":
+                raise
+            logger.info("PyMuPDF not installed; extracting PDF text with PyPDF2")
+    return PyPDF2Extractor()
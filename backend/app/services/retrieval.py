@@ -0,0 +1,150 @@
+from typing import Dict, List
+import logging
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Query tokens that look like identifiers (case numbers, statute sections, product codes)
+IDENTIFIER_PATTERN = re.compile(r"[\w./-]*\d[\w./-]*", re.UNICODE)
+
+class RetrievalStage:
+    """
+    Turns raw search hits into the per-document context sent to the LLM.
+
+    Chunks below a relevance cutoff are dropped (so irrelevant documents never
+    cost an LLM call), near-duplicate chunks of the same document are removed,
+    and maximal marginal relevance picks at most max_chunks_per_doc diverse
+    chunks per document.
+    """
+
+    def __init__(
+        self,
+        max_chunks_per_doc: int = 5,
+        max_documents: int = 20,
+        min_relevance: float = 0.25,
+        mmr_lambda: float = 0.7,
+        duplicate_threshold: float = 0.95
+    ):
+        self.max_chunks_per_doc = max_chunks_per_doc
+        self.max_documents = max_documents
+        self.min_relevance = min_relevance
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "queries": 0,
+            "candidates": 0,
+            "selected": 0,
+            "below_cutoff": 0,
+            "duplicates": 0,
+            "over_document_cap": 0,
+            "documents": 0
+        }
+
+    def select(self, query: str, results: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Pick the chunks to send to the LLM.
+
+        Args:
+            query: The user query (identifiers in it exempt exact matches from the cutoff).
+            results: Search results with relevance_score and embedding.
+
+        Returns:
+            doc_id -> chunks, documents ordered by their best chunk and chunks by relevance.
+        """
+        identifiers = [token.lower() for token in IDENTIFIER_PATTERN.findall(query) if len(token) >= 3]
+        eligible = [result for result in results if self._is_relevant(result, identifiers)]
+
+        selected, duplicates, over_cap = self._mmr(eligible)
+
+        doc_groups: Dict[str, List[Dict]] = {}
+        for result in sorted(selected, key=lambda r: -r["relevance_score"]):
+            result = {key: value for key, value in result.items() if key != "embedding"}
+            doc_groups.setdefault(result["doc_id"], []).append(result)
+        doc_groups = dict(list(doc_groups.items())[:self.max_documents])
+
+        with self._stats_lock:
+            self.stats["queries"] += 1
+            self.stats["candidates"] += len(results)
+            self.stats["selected"] += sum(len(chunks) for chunks in doc_groups.values())
+            self.stats["below_cutoff"] += len(results) - len(eligible)
+            self.stats["duplicates"] += duplicates
+            self.stats["over_document_cap"] += over_cap
+            self.stats["documents"] += len(doc_groups)
+
+        logger.debug(
+            f"Retrieval kept {len(selected)}/{len(results)} chunks from {len(doc_groups)} documents "
+            f"({len(results) - len(eligible)} below cutoff, {duplicates} duplicates, {over_cap} over cap)"
+        )
+        return doc_groups
+
+    def _is_relevant(self, result: Dict, identifiers: List[str]) -> bool:
+        """Above the cutoff, or a lexical hit containing an identifier quoted in the query"""
+        if result["relevance_score"] >= self.min_relevance:
+            return True
+        if result.get("match") in ("lexical", "both") and identifiers:
+            text = result["text"].lower()
+            return any(identifier in text for identifier in identifiers)
+        return False
+
+    def _mmr(self, candidates: List[Dict]):
+        """
+        Greedy maximal marginal relevance under the per-document cap.
+
+        Returns:
+            (selected, duplicates_dropped, dropped_over_cap)
+        """
+        if not candidates or any(candidate.get("embedding") is None for candidate in candidates):
+            # Without embeddings only the cap can be applied
+            selected, counts = [], {}
+            for candidate in candidates:
+                if counts.get(candidate["doc_id"], 0) < self.max_chunks_per_doc:
+                    selected.append(candidate)
+                    counts[candidate["doc_id"]] = counts.get(candidate["doc_id"], 0) + 1
+            return selected, 0, len(candidates) - len(selected)
+
+        # Embeddings are L2-normalised, so dot products are cosine similarities. Redundancy only
+        # counts within a document: every document is answered separately, with its own citations
+        vectors = np.vstack([np.asarray(candidate["embedding"], dtype=np.float32) for candidate in candidates])
+        doc_ids = np.array([candidate["doc_id"] for candidate in candidates])
+        similarity = np.where(doc_ids[:, None] == doc_ids[None, :], vectors @ vectors.T, 0.0)
+        relevance = np.array([candidate["relevance_score"] for candidate in candidates], dtype=np.float32)
+
+        remaining = list(range(len(candidates)))
+        chosen: List[int] = []
+        counts: Dict[str, int] = {}
+        duplicates = over_cap = 0
+
+        while remaining:
+            if chosen:
+                redundancy = similarity[np.ix_(remaining, chosen)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype=np.float32)
+            scores = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+
+            position = int(np.argmax(scores))
+            index = remaining.pop(position)
+            doc_id = candidates[index]["doc_id"]
+
+            if redundancy[position] >= self.duplicate_threshold:
+                duplicates += 1
+            elif counts.get(doc_id, 0) >= self.max_chunks_per_doc:
+                over_cap += 1
+            else:
+                chosen.append(index)
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        return [candidates[index] for index in chosen], duplicates, over_cap
+
+    def get_stats(self) -> Dict:
+        """Cumulative selection counters"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        queries = stats["queries"]
+        stats["avg_documents_per_query"] = round(stats["documents"] / queries, 2) if queries else 0.0
+        stats["avg_chunks_per_query"] = round(stats["selected"] / queries, 2) if queries else 0.0
+        return stats
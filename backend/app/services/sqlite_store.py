@@ -0,0 +1,41 @@
+from typing import Dict
+import os
+import sqlite3
+import threading
+
+class SQLiteStore:
+    """Base for the embedded SQLite stores: one connection per thread, WAL journaling"""
+
+    SCHEMA = ""
+    # Columns added after a table was first shipped: {table: {column: definition}}
+    ADDED_COLUMNS: Dict[str, Dict[str, str]] = {}
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        self._add_missing_columns(conn)
+        conn.commit()
+
+    def _add_missing_columns(self, conn: sqlite3.Connection):
+        """Bring tables created by older versions up to the current schema"""
+        for table, columns in self.ADDED_COLUMNS.items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers (and other processes) work alongside a writer"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,55 @@
+from typing import Iterable, Iterator, TypeVar
+import queue
+import threading
+
+T = TypeVar("T")
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def prefetch(items: Iterable[T], max_buffered: int = 256) -> Iterator[T]:
+    """
+    Iterate items on a background thread, up to max_buffered ahead of the consumer.
+
+    Lets a producer (page parsing, chunking) run while the consumer works on
+    earlier items (embedding), with memory bounded by max_buffered. Exceptions
+    raised by the producer are re-raised in the consumer; closing the returned
+    generator early stops the producer at its next item.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=max(1, max_buffered))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
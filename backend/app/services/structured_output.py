@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional
+import json
+import re
+
+# ```json ... ``` (or bare ```) fences that models like to wrap JSON in
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*```", re.DOTALL)
+
+def parse_json_response(text: str) -> Optional[Any]:
+    """
+    Parse JSON out of a model response, tolerating markdown fences and prose around it.
+
+    Returns None when no JSON value can be recovered.
+    """
+    if not text:
+        return None
+
+    candidates = [text.strip()]
+    candidates.extend(match.group(1) for match in FENCE_PATTERN.finditer(text))
+    # Outermost object, for responses like 'Here is the answer: {...}'
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+def _as_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return None
+
+def _as_int_list(value: Any) -> List[int]:
+    """Chunk numbers given as ints, numeric strings or a single number"""
+    if not isinstance(value, list):
+        value = [value]
+    numbers = []
+    for item in value:
+        if isinstance(item, bool):
+            continue
+        if isinstance(item, int):
+            numbers.append(item)
+        elif isinstance(item, str) and item.strip().isdigit():
+            numbers.append(int(item.strip()))
+    return numbers
+
+def validate_extraction(data: Any) -> Optional[Dict]:
+    """Normalise an extraction answer, or None if it doesn't match the schema"""
+    if not isinstance(data, dict):
+        return None
+
+    has_answer = _as_bool(data.get("has_answer"))
+    answer = data.get("answer")
+    if has_answer is None or not isinstance(answer, str):
+        return None
+
+    return {
+        "has_answer": has_answer and answer.strip() != "NO_RELEVANT_INFO",
+        "answer": answer,
+        "relevant_chunks": _as_int_list(data.get("relevant_chunks", []))
+    }
+
+def validate_themes(data: Any) -> Optional[Dict]:
+    """Normalise a theme analysis, or None if it doesn't match the schema"""
+    if not isinstance(data, dict) or not isinstance(data.get("themes"), list):
+        return None
+
+    themes = []
+    for theme in data["themes"]:
+        if not isinstance(theme, dict) or not isinstance(theme.get("theme_name"), str):
+            return None
+        supporting = theme.get("supporting_documents", [])
+        themes.append({
+            "theme_name": theme["theme_name"],
+            "description": str(theme.get("description", "")),
+            "supporting_documents": [str(doc_id) for doc_id in supporting] if isinstance(supporting, list) else [],
+            "synthesized_answer": str(theme.get("synthesized_answer", ""))
+        })
+
+    synthesis = data.get("overall_synthesis")
+    if not isinstance(synthesis, str):
+        return None
+
+    return {"themes": themes, "overall_synthesis": synthesis}
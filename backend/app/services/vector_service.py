@@ -1,102 +1,511 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple
+import hashlib
+import itertools
 import logging
+import threading
+import time
 import uuid
 
+import numpy as np
+
+from app.services.cache import TTLCache
+from app.services.doc_registry import DocumentRegistry
+from app.services.embedding_service import EmbeddingService
+from app.services.lexical_index import LexicalIndex
+
 logger = logging.getLogger(__name__)
 
+# Text hashes per metadata lookup when reusing stored embeddings
+EMBEDDING_LOOKUP_BATCH = 500
+# Chunks per collection.add() call; Chroma rejects batches above its max_batch_size
+COLLECTION_WRITE_BATCH = 5000
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Threads running lexical lookups; hybrid queries skip the lookup while all of them are busy
+LEXICAL_WORKERS = 4
+
+def text_hash(text: str, embedder: str = "") -> str:
+    """
+    Content key for a chunk's text, used to reuse embeddings of identical chunks.
+    
+    embedder identifies the model and backend, so vectors stored by a
+    different model (or an int8 export of the same one) are never reused.
+    """
+    return hashlib.sha1(f"{embedder}\0{text}".encode("utf-8")).hexdigest()
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercased with collapsed whitespace (the embedding model is uncased)"""
+    return " ".join(query.lower().split())
+
 class VectorService:
-    def __init__(self, db_path: str, embedding_model: str):
+    def __init__(
+        self,
+        db_path: str,
+        embedding_model: str,
+        embedding_batch_size: int = 64,
+        embedding_backend: str = "torch",
+        onnx_dir: str = "./data/onnx",
+        cache_max_entries: int = 256,
+        cache_ttl: float = 600.0,
+        chroma_host: Optional[str] = None,
+        chroma_port: int = 8000,
+        registry: Optional[DocumentRegistry] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        search_mode: str = "hybrid",
+        lexical_budget: float = 0.05,
+        rrf_k: int = 60,
+        embedding_service=None
+    ):
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {search_mode!r}; expected one of {SEARCH_MODES}")
+        
         self.db_path = db_path
-        self.embedding_model = SentenceTransformer(embedding_model)
+        self.registry = registry
+        # BM25 over the same chunk ids, fused with vector results by reciprocal rank
+        self.lexical_index = lexical_index
+        self.search_mode = search_mode if lexical_index is not None else "vector"
+        self.lexical_budget = lexical_budget
+        self.rrf_k = rrf_k
+        self._lexical_executor = ThreadPoolExecutor(max_workers=LEXICAL_WORKERS, thread_name_prefix="lexical")
+        self._stats_lock = threading.Lock()
+        self._lexical_in_flight = 0
+        self.lexical_timeouts = 0
+        self.lexical_skipped = 0
+        self.chroma_host = chroma_host
+        self.chroma_port = chroma_port
         
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=db_path,
-            settings=ChromaSettings(allow_reset=True)
-        )
+        if embedding_service is not None:
+            # Shared model (an EmbeddingClient for the embedding server)
+            self.embedding_service = embedding_service
+            self._open_collection()
+        else:
+            # Loading the embedding model and opening Chroma are independent and both slow;
+            # load the model on a worker thread while the collection opens
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-load") as loader:
+                model_future = loader.submit(
+                    self._load_embedding_service, embedding_model, embedding_batch_size, embedding_backend, onnx_dir
+                )
+                self._open_collection()
+                self.embedding_service = model_future.result()
+        self.embedder_id = f"{self.embedding_service.model_name}/{self.embedding_service.backend}"
+        
+        # Query embeddings only depend on the text; search results depend on the collection and
+        # are tagged with its version, shared through the registry when several processes write
+        self.query_embedding_cache = TTLCache(max_entries=cache_max_entries * 4, ttl=cache_ttl)
+        self.search_cache = TTLCache(max_entries=cache_max_entries, ttl=None)
+        self._collection_version = 0
+    
+    def _load_embedding_service(self, embedding_model: str, batch_size: int, backend: str, onnx_dir: str) -> EmbeddingService:
+        start = time.perf_counter()
+        service = EmbeddingService(embedding_model, batch_size=batch_size, backend=backend, onnx_dir=onnx_dir)
+        logger.info(f"Loaded embedding model {embedding_model} ({backend}) in {time.perf_counter() - start:.2f}s")
+        return service
+    
+    def _open_collection(self):
+        """Connect to Chroma, open the collection and backfill side indexes if needed"""
+        start = time.perf_counter()
+        self.client = self._create_client()
         
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name="documents",
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None  # Embeddings are always computed by EmbeddingService
+        )
+        
+        if self.registry is not None and self.registry.count() == 0 and self.collection.count() > 0:
+            self._backfill_registry()
+        if self.lexical_index is not None and self.lexical_index.count() == 0 and self.collection.count() > 0:
+            self._backfill_lexical_index()
+        logger.info(f"Opened Chroma collection in {time.perf_counter() - start:.2f}s")
+    
+    def _backfill_registry(self, page_size: int = 10000):
+        """One-off scan to register documents ingested before the registry existed"""
+        start = time.perf_counter()
+        counts = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for meta in page["metadatas"]:
+                counts[meta["doc_id"]] = counts.get(meta["doc_id"], 0) + 1
+            offset += len(page["ids"])
+        
+        self.registry.register_many(counts.items(), replace=True)
+        logger.info(f"Backfilled document registry with {len(counts)} documents in {time.perf_counter() - start:.1f}s")
+    
+    def _backfill_lexical_index(self, page_size: int = 10000):
+        """One-off scan to index chunks added before the lexical index existed"""
+        start = time.perf_counter()
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            by_doc: Dict[str, List[Tuple[str, str]]] = {}
+            for chunk_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                by_doc.setdefault(meta["doc_id"], []).append((chunk_id, text))
+            for doc_id, chunks in by_doc.items():
+                self.lexical_index.add(doc_id, chunks)
+            offset += len(page["ids"])
+        
+        logger.info(f"Backfilled lexical index with {offset} chunks in {time.perf_counter() - start:.1f}s")
+    
+    def _create_client(self):
+        """Embedded store by default; a Chroma server when several processes share the collection"""
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+        
+        if self.chroma_host:
+            return chromadb.HttpClient(
+                host=self.chroma_host,
+                port=self.chroma_port,
+                settings=ChromaSettings(allow_reset=True)
+            )
+        return chromadb.PersistentClient(
+            path=self.db_path,
+            settings=ChromaSettings(allow_reset=True)
         )
     
-    def add_document(self, doc_data: Dict) -> bool:
-        """Add processed document to vector database"""
+    def add_document(self, doc_data: Dict, progress: Optional[Callable] = None) -> bool:
+        """Add processed document to vector database
+        
+        progress, if given, is called with chunks_total / chunks_embedded counters.
+        """
+        if not doc_data.get("content"):
+            logger.warning(f"No content to add for document {doc_data.get('doc_id')}")
+            return False
+        return self.add_documents([doc_data], progress=progress)
+    
+    def add_document_stream(self, doc_id: str, chunks: Iterable[Dict], window: int = 256,
+                            progress: Optional[Callable] = None) -> Optional[int]:
+        """
+        Add a document whose chunks arrive as an iterator, embedding and writing window chunks at a time.
+        
+        Returns the number of chunks added, or None if a write failed. Errors
+        raised by the iterator propagate. Either way, windows already written
+        stay in the collection: callers must delete_document on failure.
+        """
+        added = 0
+        iterator = iter(chunks)
+        while True:
+            window_chunks = list(itertools.islice(iterator, window))
+            if not window_chunks:
+                break
+            if not self.add_documents([{"doc_id": doc_id, "content": window_chunks}]):
+                return None
+            added += len(window_chunks)
+            if progress:
+                progress(chunks_total=added, chunks_embedded=added)
+        return added
+    
+    def add_documents(self, docs: List[Dict], progress: Optional[Callable] = None) -> bool:
+        """
+        Add several processed documents with one embedding pass and bulk collection writes.
+        
+        Documents without content are skipped. Returns False (with nothing
+        written to the lexical index or registry) if embedding or the write fails.
+        """
         try:
-            doc_id = doc_data["doc_id"]
-            content_list = doc_data["content"]
-            
-            if not content_list:
-                logger.warning(f"No content to add for document {doc_id}")
-                return False
-            
             # Prepare data for ChromaDB
             ids = []
             documents = []
             metadatas = []
+            chunk_counts = {}
             
-            for item in content_list:
-                chunk_id = f"{doc_id}_{item['page']}_{item['paragraph']}"
-                ids.append(chunk_id)
-                documents.append(item["text"])
-                metadatas.append({
-                    "doc_id": doc_id,
-                    "page": item["page"],
-                    "paragraph": item["paragraph"],
-                    "citation": item["citation"]
-                })
-            
-            # Add to collection
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                metadatas=metadatas
-            )
+            for doc_data in docs:
+                doc_id = doc_data["doc_id"]
+                for item in doc_data["content"]:
+                    if "chunk_index" in item:
+                        chunk_id = f"{doc_id}_{item['chunk_index']}"
+                    else:
+                        chunk_id = f"{doc_id}_{item['page']}_{item['paragraph']}"
+                    ids.append(chunk_id)
+                    documents.append(item["text"])
+                    metadatas.append({
+                        "doc_id": doc_id,
+                        "page": item["page"],
+                        "paragraph": item["paragraph"],
+                        "chunk_index": item.get("chunk_index", -1),
+                        "citation": item["citation"],
+                        "text_hash": text_hash(item["text"], self.embedder_id)
+                    })
+                if doc_data["content"]:
+                    chunk_counts[doc_id] = len(doc_data["content"])
+            
+            if not ids:
+                return False
+            
+            # Identical chunks already in the collection (boilerplate paragraphs) keep their embedding
+            start = time.perf_counter()
+            reused = self._existing_embeddings([metadata["text_hash"] for metadata in metadatas])
+            embeddings = [reused.get(metadata["text_hash"]) for metadata in metadatas]
+            pending = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            
+            # Embed the rest in batches, reporting progress between batches
+            batch_size = self.embedding_service.batch_size
+            if progress:
+                progress(chunks_total=len(documents), chunks_embedded=len(documents) - len(pending))
+            for batch_start in range(0, len(pending), batch_size):
+                batch = pending[batch_start:batch_start + batch_size]
+                vectors = self.embedding_service.encode([documents[i] for i in batch]).tolist()
+                for i, vector in zip(batch, vectors):
+                    embeddings[i] = vector
+                if progress:
+                    progress(chunks_embedded=len(documents) - len(pending) + batch_start + len(batch))
+            elapsed = time.perf_counter() - start
             
-            logger.info(f"Added {len(documents)} chunks for document {doc_id}")
+            # Add to collection, in slices Chroma accepts in one call
+            for batch_start in range(0, len(ids), COLLECTION_WRITE_BATCH):
+                batch_end = batch_start + COLLECTION_WRITE_BATCH
+                self.collection.add(
+                    ids=ids[batch_start:batch_end],
+                    embeddings=embeddings[batch_start:batch_end],
+                    documents=documents[batch_start:batch_end],
+                    metadatas=metadatas[batch_start:batch_end]
+                )
+            if self.lexical_index is not None:
+                by_doc: Dict[str, List[Tuple[str, str]]] = {}
+                for chunk_id, text, metadata in zip(ids, documents, metadatas):
+                    by_doc.setdefault(metadata["doc_id"], []).append((chunk_id, text))
+                for doc_id, chunks in by_doc.items():
+                    self.lexical_index.add(doc_id, chunks)
+            self._invalidate_search_cache()
+            if self.registry is not None:
+                self.registry.register_many(chunk_counts.items())
+            
+            rate = len(documents) / elapsed if elapsed > 0 else 0.0
+            logger.info(
+                f"Added {len(documents)} chunks for {len(chunk_counts)} document(s) "
+                f"({len(documents) - len(pending)} reused, {rate:.1f} chunks/sec)"
+            )
             return True
             
         except Exception as e:
-            logger.error(f"Error adding document {doc_data.get('doc_id')}: {str(e)}")
+            logger.error(f"Error adding documents {[doc_data.get('doc_id') for doc_data in docs]}: {str(e)}")
             return False
     
-    def search(self, query: str, n_results: int = 10) -> List[Dict]:
-        """Search for relevant documents"""
+    def _existing_embeddings(self, text_hashes: List[str]) -> Dict[str, List[float]]:
+        """Embeddings already stored for any of these chunk texts, keyed by text hash"""
+        found = {}
+        unique = list(dict.fromkeys(text_hashes))
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
+            for batch_start in range(0, len(unique), EMBEDDING_LOOKUP_BATCH):
+                batch = unique[batch_start:batch_start + EMBEDDING_LOOKUP_BATCH]
+                results = self.collection.get(
+                    where={"text_hash": {"$in": batch}},
+                    include=["embeddings", "metadatas"]
+                )
+                for metadata, embedding in zip(results["metadatas"], results["embeddings"]):
+                    found.setdefault(metadata["text_hash"], list(embedding))
+        except Exception as e:
+            # Reuse is an optimisation; encoding everything is always correct
+            logger.warning(f"Embedding reuse lookup failed: {str(e)}")
+            return {}
+        return found
+    
+    def _invalidate_search_cache(self):
+        """Drop cached search results after the collection changes, in this process and every other"""
+        self._collection_version += 1
+        self.search_cache.clear()
+        if self.registry is not None:
+            self.registry.bump_version()
+    
+    def _current_version(self) -> int:
+        """Version of the collection, as changed by any process sharing it"""
+        if self.registry is not None:
+            return self.registry.version()
+        return self._collection_version
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit/miss counters for the query caches"""
+        return {
+            "query_embeddings": self.query_embedding_cache.get_stats(),
+            "search_results": self.search_cache.get_stats()
+        }
+    
+    def _embed_query(self, query: str, cache_key: str):
+        """Encode a query, reusing a cached embedding when available"""
+        query_embedding = self.query_embedding_cache.get(cache_key)
+        if query_embedding is None:
+            query_embedding = self.embedding_service.encode_query(query)
+            self.query_embedding_cache.set(cache_key, query_embedding)
+        return query_embedding
+    
+    def search(self, query: str, n_results: int = 10, mode: Optional[str] = None,
+               include_embeddings: bool = False) -> List[Dict]:
+        """
+        Search for relevant chunks.
+        
+        mode is "vector" (cosine similarity), "lexical" (BM25) or "hybrid"
+        (both, fused by reciprocal rank); it defaults to the service's search_mode.
+        relevance_score is always the cosine similarity to the query, so it
+        stays comparable whichever side found the chunk. With include_embeddings
+        each result also carries its chunk embedding (for diversification).
+        """
+        try:
+            mode = mode or self.search_mode
+            if self.lexical_index is None:
+                mode = "vector"
             
-            formatted_results = []
-            if results["documents"] and results["documents"][0]:
-                for i, doc in enumerate(results["documents"][0]):
-                    metadata = results["metadatas"][0][i]
-                    distance = results["distances"][0][i]
-                    
-                    formatted_results.append({
-                        "doc_id": metadata["doc_id"],
-                        "text": doc,
-                        "citation": metadata["citation"],
-                        "page": metadata["page"],
-                        "paragraph": metadata["paragraph"],
-                        "relevance_score": 1 - distance  # Convert distance to similarity
-                    })
+            cache_key = normalize_query(query)
+            search_key = (cache_key, n_results, mode, include_embeddings)
+            # Results computed against an older collection (by any worker) are never served
+            version = self._current_version()
+            cached = self.search_cache.get(search_key)
+            if cached is not None and cached[0] == version:
+                return [dict(result) for result in cached[1]]
+            
+            start = time.perf_counter()
+            
+            # The lexical lookup runs alongside query embedding and the ANN query
+            lexical_future = None
+            if mode != "vector":
+                lexical_future = self._submit_lexical(query, n_results, mode)
+            
+            query_embedding = self._embed_query(query, cache_key)
+            vector_results = self._vector_search(query_embedding, n_results, include_embeddings) if mode != "lexical" else []
             
-            return formatted_results
+            lexical_hits = []
+            if lexical_future is not None:
+                # In hybrid mode a slow lexical lookup is dropped rather than holding up the query
+                timeout = None if mode == "lexical" else max(0.0, self.lexical_budget - (time.perf_counter() - start))
+                try:
+                    lexical_hits = lexical_future.result(timeout=timeout)
+                except FuturesTimeoutError:
+                    with self._stats_lock:
+                        self.lexical_timeouts += 1
+                    logger.warning(f"Lexical search exceeded {self.lexical_budget * 1000:.0f}ms budget; using vector results only")
+            
+            formatted_results = self._fuse(vector_results, lexical_hits, query_embedding, n_results, include_embeddings)
+            
+            if version == self._current_version():
+                self.search_cache.set(search_key, (version, formatted_results))
+            
+            return [dict(result) for result in formatted_results]
             
         except Exception as e:
             logger.error(f"Error searching: {str(e)}")
             return []
     
+    def _submit_lexical(self, query: str, n_results: int, mode: str):
+        """
+        Start a lexical lookup, or return None when a hybrid query would only queue behind busy workers.
+        
+        Hybrid lookups stop at the lexical budget, after which their results would be dropped anyway.
+        """
+        with self._stats_lock:
+            if mode == "hybrid" and self._lexical_in_flight >= LEXICAL_WORKERS:
+                self.lexical_skipped += 1
+                return None
+            self._lexical_in_flight += 1
+        
+        deadline = time.monotonic() + self.lexical_budget if mode == "hybrid" else None
+        future = self._lexical_executor.submit(self.lexical_index.search, query, n_results, deadline)
+        future.add_done_callback(self._release_lexical_slot)
+        return future
+    
+    def _release_lexical_slot(self, future):
+        with self._stats_lock:
+            self._lexical_in_flight -= 1
+    
+    def _vector_search(self, query_embedding: np.ndarray, n_results: int, include_embeddings: bool = False) -> List[Dict]:
+        """Nearest chunks by cosine similarity"""
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        results = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=n_results,
+            include=include
+        )
+        
+        formatted_results = []
+        if results["documents"] and results["documents"][0]:
+            for i, doc in enumerate(results["documents"][0]):
+                formatted_results.append(self._format_result(
+                    results["ids"][0][i],
+                    doc,
+                    results["metadatas"][0][i],
+                    1 - results["distances"][0][i]  # Convert distance to similarity
+                ))
+                if include_embeddings:
+                    formatted_results[-1]["embedding"] = np.asarray(results["embeddings"][0][i], dtype=np.float32)
+        return formatted_results
+    
+    def _format_result(self, chunk_id: str, text: str, metadata: Dict, relevance_score: float) -> Dict:
+        return {
+            "chunk_id": chunk_id,
+            "doc_id": metadata["doc_id"],
+            "text": text,
+            "citation": metadata["citation"],
+            "page": metadata["page"],
+            "paragraph": metadata["paragraph"],
+            "relevance_score": relevance_score
+        }
+    
+    def _fuse(self, vector_results: List[Dict], lexical_hits: List[Dict], query_embedding: np.ndarray,
+              n_results: int, include_embeddings: bool = False) -> List[Dict]:
+        """Reciprocal rank fusion of the two rankings, best first"""
+        fused: Dict[str, float] = {}
+        for rank, result in enumerate(vector_results):
+            fused[result["chunk_id"]] = fused.get(result["chunk_id"], 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, hit in enumerate(lexical_hits):
+            fused[hit["chunk_id"]] = fused.get(hit["chunk_id"], 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        
+        results = {result["chunk_id"]: result for result in vector_results}
+        vector_ids = set(results)
+        lexical_ids = {hit["chunk_id"] for hit in lexical_hits}
+        
+        # Chunks found only lexically: fetch their text and score them against the query embedding
+        missing = [chunk_id for chunk_id in lexical_ids if chunk_id not in results]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+            for chunk_id, text, metadata, embedding in zip(
+                fetched["ids"], fetched["documents"], fetched["metadatas"], fetched["embeddings"]
+            ):
+                embedding = np.asarray(embedding, dtype=np.float32)
+                results[chunk_id] = self._format_result(chunk_id, text, metadata, float(np.dot(embedding, query_embedding)))
+                if include_embeddings:
+                    results[chunk_id]["embedding"] = embedding
+        
+        ranked = sorted((chunk_id for chunk_id in fused if chunk_id in results), key=lambda chunk_id: -fused[chunk_id])
+        formatted_results = []
+        for chunk_id in ranked[:n_results]:
+            result = results[chunk_id]
+            if chunk_id in vector_ids and chunk_id in lexical_ids:
+                result["match"] = "both"
+            else:
+                result["match"] = "vector" if chunk_id in vector_ids else "lexical"
+            result["fusion_score"] = round(fused[chunk_id], 6)
+            formatted_results.append(result)
+        return formatted_results
+    
+    def get_search_stats(self) -> Dict:
+        """Search mode and lexical budget overruns"""
+        with self._stats_lock:
+            return {
+                "mode": self.search_mode,
+                "lexical_budget_ms": round(self.lexical_budget * 1000, 1),
+                "lexical_timeouts": self.lexical_timeouts,
+                # Hybrid queries that ran vector-only because every lexical worker was busy
+                "lexical_skipped": self.lexical_skipped
+            }
+    
+    def heartbeat(self) -> Dict:
+        """Confirm the Chroma client and collection respond"""
+        self.client.heartbeat()
+        return {"chunks": self.collection.count(), "server": self.chroma_host or "embedded"}
+    
     def get_document_count(self) -> int:
         """Get total number of unique documents"""
         try:
+            if self.registry is not None:
+                return self.registry.count()
+            
             # Get all unique doc_ids
             results = self.collection.get(include=["metadatas"])
             if results["metadatas"]:
@@ -110,6 +519,9 @@ class VectorService:
     def get_all_doc_ids(self) -> List[str]:
         """Get all unique document IDs"""
         try:
+            if self.registry is not None:
+                return self.registry.all_doc_ids()
+            
             results = self.collection.get(include=["metadatas"])
             if results["metadatas"]:
                 doc_ids = list(set(meta["doc_id"] for meta in results["metadatas"]))
@@ -119,17 +531,35 @@ class VectorService:
             logger.error(f"Error getting doc IDs: {str(e)}")
             return []
     
+    def list_documents(self, limit: int = 100, cursor: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+        """Page through documents newest first; returns (entries, next_cursor)"""
+        if self.registry is not None:
+            return self.registry.page(limit, cursor)
+        
+        # Without a registry, fall back to a full scan (cursor is an offset here)
+        doc_ids = sorted(self.get_all_doc_ids())
+        offset = cursor or 0
+        entries = [{"doc_id": doc_id} for doc_id in doc_ids[offset:offset + limit]]
+        next_cursor = offset + limit if offset + limit < len(doc_ids) else None
+        return entries, next_cursor
+    
     def delete_document(self, doc_id: str) -> bool:
         """Delete all chunks of a document"""
         try:
             # Get all chunks for this document
             results = self.collection.get(
                 where={"doc_id": doc_id},
-                include=["metadatas"]
+                include=[]
             )
             
+            if self.registry is not None:
+                self.registry.unregister(doc_id)
+            if self.lexical_index is not None:
+                self.lexical_index.delete_document(doc_id)
+            
             if results["ids"]:
                 self.collection.delete(ids=results["ids"])
+                self._invalidate_search_cache()
                 logger.info(f"Deleted document {doc_id}")
                 return True
             
@@ -147,17 +577,20 @@ class VectorService:
             del self.collection
             
             # Recreate client and collection
-            self.client = chromadb.PersistentClient(
-                path=self.db_path,
-                settings=ChromaSettings(allow_reset=True)
-            )
+            self.client = self._create_client()
             
             # Reset and recreate collection
             self.client.reset()
             self.collection = self.client.get_or_create_collection(
                 name="documents",
-                metadata={"hnsw:space": "cosine"}
+                metadata={"hnsw:space": "cosine"},
+                embedding_function=None
             )
+            self._invalidate_search_cache()
+            if self.registry is not None:
+                self.registry.clear()
+            if self.lexical_index is not None:
+                self.lexical_index.clear()
             
             return True
         except Exception as e:
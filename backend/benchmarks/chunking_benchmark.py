@@ -0,0 +1,103 @@
+"""
+Compare the old paragraph splitter with TextChunker on index size and recall.
+
+Run from the backend directory:
+
+    python -m benchmarks.chunking_benchmark --docs 200 --output chunking.json
+"""
+from typing import Dict, List
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.chunker import TextChunker
+from app.services.embedding_service import EmbeddingService
+from benchmarks.synthetic_corpus import generate_corpus
+
+def paragraph_chunks(document: Dict) -> List[Dict]:
+    """The pre-chunker behaviour: one chunk per '\\n\\n' paragraph"""
+    paragraphs = [p.strip() for p in document["text"].split("\n\n") if p.strip()]
+    return [{"doc_id": document["doc_id"], "text": paragraph} for paragraph in paragraphs]
+
+def token_chunks(document: Dict, chunker: TextChunker) -> List[Dict]:
+    """TextChunker over the same paragraphs"""
+    units = (
+        {"page": 1, "paragraph": para_num, "text": paragraph}
+        for para_num, paragraph in enumerate(document["text"].split("\n\n"), 1)
+    )
+    return [{"doc_id": document["doc_id"], "text": chunk["text"]} for chunk in chunker.chunk(units, paged=False)]
+
+def evaluate(name: str, chunks: List[Dict], queries: List[Dict], embedder: EmbeddingService,
+             chunker: TextChunker, model_window: int, ks: List[int]) -> Dict:
+    """Index size and recall@k for one chunking strategy"""
+    token_counts = [chunker.count_tokens(chunk["text"]) for chunk in chunks]
+
+    start = time.perf_counter()
+    chunk_vectors = embedder.encode([chunk["text"] for chunk in chunks])
+    encode_seconds = time.perf_counter() - start
+
+    query_vectors = embedder.encode([query["query"] for query in queries])
+    scores = query_vectors @ chunk_vectors.T
+    ranked = np.argsort(-scores, axis=1)[:, :max(ks)]
+
+    # A query is answered if a retrieved chunk contains the planted code (i.e. it wasn't truncated away)
+    recall = {}
+    for k in ks:
+        hits = sum(
+            any(query["answer"] in chunks[idx]["text"] for idx in ranked[q, :k])
+            for q, query in enumerate(queries)
+        )
+        recall[f"recall@{k}"] = round(hits / len(queries), 4)
+
+    return {
+        "strategy": name,
+        "chunks": len(chunks),
+        "vector_bytes": int(chunk_vectors.nbytes),
+        "text_bytes": sum(len(chunk["text"].encode("utf-8")) for chunk in chunks),
+        "tokens_mean": round(float(np.mean(token_counts)), 1),
+        "tokens_max": int(np.max(token_counts)),
+        "chunks_over_model_window": sum(count > model_window for count in token_counts),
+        "encode_chunks_per_second": round(len(chunks) / encode_seconds, 1) if encode_seconds else 0.0,
+        **recall
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--chunk-size", type=int, default=settings.CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.CHUNK_OVERLAP)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.docs, args.paragraphs, seed=args.seed)
+    chunker = TextChunker(args.chunk_size, args.chunk_overlap, args.model)
+    embedder = EmbeddingService(args.model, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    model_window = embedder.model.max_seq_length - 2  # [CLS] and [SEP]
+    ks = [1, 5, 10]
+
+    baseline = [chunk for document in corpus["documents"] for chunk in paragraph_chunks(document)]
+    chunked = [chunk for document in corpus["documents"] for chunk in token_chunks(document, chunker)]
+
+    results = {
+        "config": vars(args),
+        "queries": len(corpus["queries"]),
+        "results": [
+            evaluate("paragraphs", baseline, corpus["queries"], embedder, chunker, model_window, ks),
+            evaluate("token_chunker", chunked, corpus["queries"], embedder, chunker, model_window, ks)
+        ]
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
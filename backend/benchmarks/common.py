@@ -0,0 +1,49 @@
+"""Shared helpers for the benchmark scripts: latency summaries and JSON reports"""
+from typing import Dict, List, Optional
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+def latency_summary(samples_ms: List[float]) -> Dict:
+    """p50/p95/p99/mean/max of latency samples in milliseconds"""
+    if not samples_ms:
+        return {"count": 0}
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(samples.size),
+        "p50_ms": round(float(np.percentile(samples, 50)), 2),
+        "p95_ms": round(float(np.percentile(samples, 95)), 2),
+        "p99_ms": round(float(np.percentile(samples, 99)), 2),
+        "mean_ms": round(float(samples.mean()), 2),
+        "max_ms": round(float(samples.max()), 2)
+    }
+
+def environment() -> Dict:
+    """Where and on what a run happened, so results are comparable"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def write_report(report: Dict, output: Optional[str] = None):
+    """Print the report and optionally save it as JSON"""
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            f.write(text)
@@ -0,0 +1,92 @@
+"""Write synthetic documents to disk as TXT, DOCX and PDF for ingest benchmarks"""
+from typing import Dict, List
+import os
+import textwrap
+
+from docx import Document
+
+FORMATS = ("txt", "docx", "pdf")
+
+# Layout of generated PDF pages (US Letter, Helvetica 10pt)
+PDF_LINE_WIDTH = 95  # Characters per line
+PDF_LINES_PER_PAGE = 52
+
+def write_txt(path: str, paragraphs: List[str]):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+def write_docx(path: str, paragraphs: List[str]):
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, paragraphs: List[str]):
+    """
+    Write a text-layer PDF without any PDF library.
+
+    Paragraphs are wrapped into lines and flowed over as many pages as
+    needed, with a blank line between paragraphs. Only a single built-in
+    font is used, so the file is a handful of plain objects plus an xref table.
+    """
+    lines: List[str] = []
+    for paragraph in paragraphs:
+        lines.extend(textwrap.wrap(paragraph, PDF_LINE_WIDTH) or [""])
+        lines.append("")
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[""]]
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then a (page, content) pair per page
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    }
+    page_refs = []
+    for index, page_lines in enumerate(pages):
+        page_num, content_num = 4 + 2 * index, 5 + 2 * index
+        page_refs.append(f"{page_num} 0 R")
+
+        text_ops = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in page_lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 760 Td {text_ops} ET".encode("latin-1", errors="replace")
+        objects[content_num] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page_num] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_num} 0 R >>"
+        ).encode("latin-1")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(pages)} >>".encode("latin-1")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for number in sorted(objects):
+        output += b"%010d 00000 n \n" % offsets[number]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(bytes(output))
+
+WRITERS = {"txt": write_txt, "docx": write_docx, "pdf": write_pdf}
+
+def write_corpus(documents: List[Dict], directory: str, formats=FORMATS) -> List[Dict]:
+    """
+    Write each synthetic document in every requested format.
+
+    Returns:
+        [{"doc_id", "format", "path", "bytes"}]
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = []
+    for document in documents:
+        paragraphs = [p for p in document["text"].split("\n\n") if p.strip()]
+        for fmt in formats:
+            path = os.path.join(directory, f"{document['doc_id']}.{fmt}")
+            WRITERS[fmt](path, paragraphs)
+            files.append({"doc_id": document["doc_id"], "format": fmt, "path": path, "bytes": os.path.getsize(path)})
+    return files
@@ -0,0 +1,144 @@
+"""
+Accuracy and throughput of the embedding backends against torch fp32.
+
+Encodes the chunks and questions of a synthetic corpus with every backend and
+reports, relative to the fp32 sentence-transformers baseline:
+
+  - cosine between each chunk's backend vector and its fp32 vector,
+  - drift in query-chunk cosine scores (what retrieval ranks by),
+  - overlap of each query's top-10 chunks with the fp32 top-10,
+  - encode throughput in chunks/sec.
+
+Exits with status 1 if any backend's minimum vector cosine falls below
+--min-cosine, so it can gate a switch of EMBEDDING_BACKEND.
+
+Run from the backend directory:
+
+    python -m benchmarks.embedding_benchmark --backends onnx,onnx-int8 --output embedding.json
+"""
+from typing import Dict, List
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.chunker import TextChunker
+from app.services.embedding_service import EmbeddingService
+from benchmarks.common import environment, write_report
+from benchmarks.synthetic_corpus import generate_corpus
+
+TOP_K = 10
+
+def corpus_texts(docs: int, paragraphs: int, seed: int, model: str):
+    """Chunk texts and query texts of a synthetic corpus"""
+    corpus = generate_corpus(docs, paragraphs, seed=seed)
+    chunker = TextChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, model)
+    chunks = []
+    for document in corpus["documents"]:
+        units = (
+            {"page": 1, "paragraph": para_num, "text": paragraph}
+            for para_num, paragraph in enumerate(document["text"].split("\n\n"), 1)
+        )
+        chunks.extend(chunk["text"] for chunk in chunker.chunk(units, paged=True))
+    queries = [query["query"] for query in corpus["queries"] + corpus["lookups"]]
+    return chunks, queries
+
+def encode_timed(service: EmbeddingService, texts: List[str], repeats: int):
+    """Embeddings of texts plus the best-of-repeats throughput"""
+    service.encode(texts[:service.batch_size])  # Warm up
+    best = float("inf")
+    embeddings = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = service.encode(texts)
+        best = min(best, time.perf_counter() - start)
+    return embeddings, round(len(texts) / best, 1)
+
+def compare(baseline: Dict, candidate: Dict) -> Dict:
+    """Agreement of a backend's vectors and rankings with the fp32 baseline"""
+    vector_cosines = np.sum(baseline["chunks"] * candidate["chunks"], axis=1)
+
+    baseline_scores = baseline["queries"] @ baseline["chunks"].T
+    candidate_scores = candidate["queries"] @ candidate["chunks"].T
+    score_drift = np.abs(candidate_scores - baseline_scores)
+
+    k = min(TOP_K, baseline_scores.shape[1])
+    baseline_top = np.argsort(-baseline_scores, axis=1)[:, :k]
+    candidate_top = np.argsort(-candidate_scores, axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(baseline_top, candidate_top)]
+    top1 = np.mean(baseline_top[:, 0] == candidate_top[:, 0])
+
+    return {
+        "vector_cosine_mean": round(float(vector_cosines.mean()), 5),
+        "vector_cosine_min": round(float(vector_cosines.min()), 5),
+        "score_drift_mean": round(float(score_drift.mean()), 5),
+        "score_drift_max": round(float(score_drift.max()), 5),
+        f"top{k}_overlap": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(top1), 4)
+    }
+
+def run(backends=("onnx", "onnx-int8"), docs: int = 50, paragraphs: int = 30, seed: int = 7,
+        repeats: int = 3, model: str = settings.EMBEDDING_MODEL, batch_size: int = settings.EMBEDDING_BATCH_SIZE) -> Dict:
+    chunks, queries = corpus_texts(docs, paragraphs, seed, model)
+
+    results = {}
+    for backend in ("torch",) + tuple(b for b in backends if b != "torch"):
+        load_start = time.perf_counter()
+        service = EmbeddingService(model, batch_size=batch_size, backend=backend, onnx_dir=settings.EMBEDDING_ONNX_DIR)
+        load_seconds = time.perf_counter() - load_start
+
+        chunk_embeddings, chunks_per_second = encode_timed(service, chunks, repeats)
+        query_embeddings = service.encode(queries)
+        results[backend] = {
+            "load_seconds": round(load_seconds, 2),
+            "chunks_per_second": chunks_per_second,
+            "chunks": chunk_embeddings,
+            "queries": query_embeddings
+        }
+
+    baseline = results["torch"]
+    report = {}
+    for backend, result in results.items():
+        report[backend] = {"load_seconds": result["load_seconds"], "chunks_per_second": result["chunks_per_second"]}
+        if backend != "torch":
+            report[backend]["speedup"] = round(result["chunks_per_second"] / baseline["chunks_per_second"], 2)
+            report[backend].update(compare(baseline, result))
+
+    return {
+        "config": {"backends": list(backends), "docs": docs, "paragraphs": paragraphs, "seed": seed,
+                   "repeats": repeats, "model": model, "batch_size": batch_size, "cpus": os.cpu_count()},
+        "chunks": len(chunks),
+        "queries": len(queries),
+        "backends": report
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="onnx,onnx-int8", help="Backends to compare with torch fp32")
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--min-cosine", type=float, default=0.98,
+                        help="Fail if any chunk's vector is less similar than this to its fp32 vector")
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    report = run(tuple(args.backends.split(",")), args.docs, args.paragraphs, args.seed,
+                 args.repeats, args.model, args.batch_size)
+    failed = [
+        backend for backend, result in report["backends"].items()
+        if result.get("vector_cosine_min", 1.0) < args.min_cosine
+    ]
+    report["accuracy_check"] = {"min_cosine": args.min_cosine, "failed": failed}
+    write_report({"environment": environment(), **report}, args.output)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
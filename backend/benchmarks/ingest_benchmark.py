@@ -0,0 +1,127 @@
+"""
+Ingest throughput: DocumentProcessor.process_document per format, then
+VectorService.add_document embedding throughput.
+
+Run from the backend directory:
+
+    python -m benchmarks.ingest_benchmark --docs 50 --output ingest.json
+"""
+from typing import Dict, List
+import argparse
+import os
+import tempfile
+import time
+
+from app.config import settings
+from app.services.chunker import TextChunker
+from app.services.document_processor import DocumentProcessor
+from app.services.vector_service import VectorService
+from benchmarks.common import environment, latency_summary, write_report
+from benchmarks.corpus_files import FORMATS, write_corpus
+from benchmarks.synthetic_corpus import generate_corpus
+
+def process_files(processor: DocumentProcessor, files: List[Dict]) -> Dict:
+    """Parse and chunk every file of one format"""
+    latencies = []
+    chunks = pages = 0
+    errors = 0
+    processed = []
+
+    start = time.perf_counter()
+    for file in files:
+        file_start = time.perf_counter()
+        result = processor.process_document(file["path"], file["doc_id"])
+        latencies.append((time.perf_counter() - file_start) * 1000)
+        if result.get("error"):
+            errors += 1
+            continue
+        chunks += len(result["content"])
+        pages += result.get("total_pages", 1)
+        processed.append(result)
+    elapsed = time.perf_counter() - start
+
+    total_bytes = sum(file["bytes"] for file in files)
+    return {
+        "files": len(files),
+        "errors": errors,
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(len(files) / elapsed, 2) if elapsed else 0.0,
+        "mb_per_second": round(total_bytes / (1024 * 1024) / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_second": round(chunks / elapsed, 1) if elapsed else 0.0,
+        "per_file": latency_summary(latencies),
+        "_processed": processed
+    }
+
+def embed_documents(documents: List[Dict], workdir: str, model: str, batch_size: int, backend: str) -> Dict:
+    """Index processed documents into a throwaway collection"""
+    service = VectorService(
+        os.path.join(workdir, "chroma"),
+        model,
+        embedding_batch_size=batch_size,
+        embedding_backend=backend,
+        onnx_dir=settings.EMBEDDING_ONNX_DIR
+    )
+    # Load the model before timing
+    service.embedding_service.encode(["warm up"])
+
+    chunks = sum(len(document["content"]) for document in documents)
+    start = time.perf_counter()
+    for document in documents:
+        service.add_document(document)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "documents": len(documents),
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(chunks / elapsed, 1) if elapsed else 0.0,
+        "embedding": service.embedding_service.get_stats()
+    }
+
+def run(docs: int = 50, paragraphs: int = 30, seed: int = 7, formats=FORMATS,
+        model: str = settings.EMBEDDING_MODEL, batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+        backend: str = settings.EMBEDDING_BACKEND) -> Dict:
+    corpus = generate_corpus(docs, paragraphs, seed=seed)
+    processor = DocumentProcessor(chunker=TextChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, model))
+    # Load the tokenizer before timing
+    processor.chunker.count_tokens("warm up")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        files = write_corpus(corpus["documents"], os.path.join(workdir, "files"), formats)
+
+        processing = {}
+        for fmt in formats:
+            processing[fmt] = process_files(processor, [file for file in files if file["format"] == fmt])
+
+        # Embed one format's output: chunk text is the same whichever format it came from
+        documents = processing[formats[0]].pop("_processed")
+        for result in processing.values():
+            result.pop("_processed", None)
+
+        return {
+            "config": {"docs": docs, "paragraphs": paragraphs, "seed": seed, "model": model,
+                       "batch_size": batch_size, "backend": backend},
+            "process_document": processing,
+            "add_document": embed_documents(documents, workdir, model, batch_size, backend)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated subset of txt,docx,pdf")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--backend", default=settings.EMBEDDING_BACKEND, help="torch, onnx or onnx-int8")
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    report = run(args.docs, args.paragraphs, args.seed, tuple(args.formats.split(",")), args.model,
+                 args.batch_size, args.backend)
+    write_report({"environment": environment(), **report}, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+PDF extraction throughput and memory: the previous whole-file PyPDF2 path
+against the streaming extractors.
+
+"legacy" reproduces the old _process_pdf: a PdfReader over the whole file,
+every page's text collected, then chunked in one go. "stream-<extractor>"
+consumes DocumentProcessor.iter_chunks with that extractor. Each run happens
+in a fresh process so peak RSS growth is attributable to it alone.
+
+Run from the backend directory:
+
+    python -m benchmarks.pdf_benchmark --pages 10,100,1000 --output pdf.json
+"""
+from typing import Dict
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from app.config import settings
+from app.services.chunker import TextChunker
+from app.services.document_processor import DocumentProcessor
+from app.services.pdf_extractors import create_pdf_extractor
+from benchmarks.common import environment, write_report
+from benchmarks.corpus_files import write_pdf
+from benchmarks.synthetic_corpus import generate_corpus
+
+PARAGRAPHS_PER_PAGE = 8  # Roughly what fits on one generated page
+
+def _legacy_chunks(processor: DocumentProcessor, path: str):
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        page_texts = {page_num: (page.extract_text() or "").strip() for page_num, page in enumerate(reader.pages, 1)}
+    units = (
+        unit
+        for page_num in range(1, len(page_texts) + 1)
+        for unit in processor._paragraph_units(page_texts[page_num], page_num)
+    )
+    return list(processor.chunker.chunk(units, paged=True))
+
+def _measure(mode: str, path: str, model: str) -> Dict:
+    """One timed extraction, run in a child process"""
+    extractor = "pypdf2" if mode == "legacy" else mode.split("-", 1)[1]
+    processor = DocumentProcessor(
+        ocr_workers=1,
+        chunker=TextChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, model),
+        pdf_extractor=extractor
+    )
+    processor.chunker.count_tokens("warm up")
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    first_chunk = None
+    chunks = 0
+    if mode == "legacy":
+        chunks = len(_legacy_chunks(processor, path))
+        first_chunk = time.perf_counter() - start
+    else:
+        for _ in processor.iter_chunks(path, "DOC_BENCH"):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            chunks += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": round(elapsed, 3),
+        "chunks": chunks,
+        "first_chunk_ms": round((first_chunk or elapsed) * 1000, 1),
+        "peak_rss_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb) / 1024, 1)
+    }
+
+def available_modes():
+    modes = ["legacy", "stream-pypdf2"]
+    try:
+        create_pdf_extractor("pymupdf")
+        modes.append("stream-pymupdf")
+    except ImportError:
+        pass
+    return modes
+
+def run(pages=(10, 100, 1000), modes=None, seed: int = 7, model: str = settings.EMBEDDING_MODEL) -> Dict:
+    modes = modes or available_modes()
+    context = multiprocessing.get_context("spawn")
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for page_count in pages:
+            corpus = generate_corpus(1, page_count * PARAGRAPHS_PER_PAGE, facts_per_doc=0, seed=seed)
+            paragraphs = [p for p in corpus["documents"][0]["text"].split("\n\n") if p.strip()]
+            path = os.path.join(workdir, f"bench_{page_count}.pdf")
+            write_pdf(path, paragraphs)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+
+            results[str(page_count)] = {"file_mb": round(size_mb, 2)}
+            for mode in modes:
+                with context.Pool(1) as pool:
+                    result = pool.apply(_measure, (mode, path, model))
+                result["pages_per_second"] = round(page_count / result["seconds"], 1) if result["seconds"] else 0.0
+                result["mb_per_second"] = round(size_mb / result["seconds"], 2) if result["seconds"] else 0.0
+                results[str(page_count)][mode] = result
+
+    return {"config": {"pages": list(pages), "modes": modes, "seed": seed, "model": model}, "pdf": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,100,1000", help="Comma-separated page counts")
+    parser.add_argument("--modes", help="Comma-separated subset of legacy,stream-pypdf2,stream-pymupdf")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    pages = tuple(int(count) for count in args.pages.split(","))
+    modes = args.modes.split(",") if args.modes else None
+    report = run(pages, modes, args.seed, args.model)
+    write_report({"environment": environment(), **report}, args.output)
+
+if __name__ == "__main__":
+    main()
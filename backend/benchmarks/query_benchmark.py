@@ -0,0 +1,183 @@
+"""
+/query latency under concurrent clients, end to end over HTTP.
+
+Starts the API with the fake LLM provider in a scratch directory (so its
+data/ folder is throwaway), uploads a synthetic TXT corpus through /upload,
+waits for ingestion, then has N client threads fire the corpus questions at
+/query. Pass --url to benchmark an already running server instead; the
+corpus is uploaded there too.
+
+Run from the backend directory:
+
+    python -m benchmarks.query_benchmark --docs 30 --clients 8 --requests 200 --output query.json
+"""
+from typing import Dict, List, Optional
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import environment, latency_summary, write_report
+from benchmarks.corpus_files import write_corpus
+from benchmarks.synthetic_corpus import generate_corpus
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _request(url: str, data: Optional[bytes] = None, headers: Optional[Dict] = None, timeout: float = 120.0) -> Dict:
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def _multipart(files: List[str]):
+    """Encode files as a multipart/form-data body under the "files" field"""
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for path in files:
+        body += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="files"; filename="{os.path.basename(path)}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        with open(path, "rb") as f:
+            body += f.read()
+        body += b"\r\n"
+    body += f"--{boundary}--\r\n".encode("utf-8")
+    return bytes(body), f"multipart/form-data; boundary={boundary}"
+
+def start_server(workdir: str, port: int, fake_latency: float, ready_timeout: float = 300.0) -> subprocess.Popen:
+    """Launch uvicorn with the fake LLM and wait until /health/ready passes"""
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(fake_latency),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=2).close()
+            return server
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Server not ready after {ready_timeout:.0f}s")
+
+def ingest(url: str, files: List[str], timeout: float = 1800.0) -> Dict:
+    """Upload files and wait until every job has finished"""
+    start = time.perf_counter()
+    body, content_type = _multipart(files)
+    uploaded = _request(f"{url}/upload", body, {"Content-Type": content_type})
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = _request(f"{url}/jobs")["jobs"]
+        if not any(job["status"] in ("queued", "processing") for job in jobs):
+            break
+        time.sleep(1.0)
+
+    return {
+        "files": len(files),
+        "jobs": len(uploaded["jobs"]),
+        "duplicates": len(uploaded["duplicates"]),
+        "failed": len(uploaded["failed"]),
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+
+def load_test(url: str, queries: List[str], clients: int, requests: int) -> Dict:
+    """Send `requests` queries from `clients` concurrent threads"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def send(index: int):
+        nonlocal errors
+        body = urllib.parse.urlencode({"query": queries[index % len(queries)]}).encode("utf-8")
+        start = time.perf_counter()
+        try:
+            _request(f"{url}/query", body, {"Content-Type": "application/x-www-form-urlencoded"})
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+        except (urllib.error.URLError, OSError, ValueError):
+            with lock:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "clients": clients,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "queries_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary(latencies)
+    }
+
+def run(docs: int = 30, paragraphs: int = 30, seed: int = 7, clients: int = 8, requests: int = 200,
+        fake_latency: float = 0.3, port: int = 8765, url: Optional[str] = None) -> Dict:
+    corpus = generate_corpus(docs, paragraphs, seed=seed)
+    # Mix both query sets so retrieval sees questions and exact lookups
+    queries = [q["query"] for pair in zip(corpus["queries"], corpus["lookups"]) for q in pair]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        files = write_corpus(corpus["documents"], os.path.join(workdir, "corpus"), ("txt",))
+
+        server = None
+        if url is None:
+            server = start_server(workdir, port, fake_latency)
+            url = f"http://127.0.0.1:{port}"
+        try:
+            ingestion = ingest(url, [file["path"] for file in files])
+            # One request per query first so cold and warm caches are reported separately
+            cold = load_test(url, queries, clients, len(queries))
+            warm = load_test(url, queries, clients, requests)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    return {
+        "config": {"docs": docs, "paragraphs": paragraphs, "seed": seed, "clients": clients,
+                   "requests": requests, "fake_llm_latency": fake_latency},
+        "ingestion": ingestion,
+        "query": {"cold": cold, "warm": warm}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=30)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--fake-latency", type=float, default=0.3, help="Seconds per simulated LLM call")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    report = run(args.docs, args.paragraphs, args.seed, args.clients, args.requests,
+                 args.fake_latency, args.port, args.url)
+    write_report({"environment": environment(), **report}, args.output)
+
+if __name__ == "__main__":
+    main()
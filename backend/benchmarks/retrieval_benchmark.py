@@ -0,0 +1,113 @@
+"""
+Recall@k and latency of vector-only, lexical-only and hybrid search.
+
+Indexes a synthetic corpus into a throwaway Chroma collection and lexical
+index, then runs two query sets: natural-language questions about planted
+facts, and lookups that quote a case number verbatim.
+
+Run from the backend directory:
+
+    python -m benchmarks.retrieval_benchmark --docs 200 --output retrieval.json
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.chunker import TextChunker
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_service import SEARCH_MODES, VectorService
+from benchmarks.synthetic_corpus import generate_corpus
+
+def build_index(corpus: Dict, chunker: TextChunker, workdir: str, args) -> VectorService:
+    """Chunk, embed and index every synthetic document"""
+    service = VectorService(
+        os.path.join(workdir, "chroma"),
+        args.model,
+        embedding_batch_size=settings.EMBEDDING_BATCH_SIZE,
+        lexical_index=LexicalIndex(os.path.join(workdir, "lexical.sqlite3")),
+        lexical_budget=args.budget_ms / 1000,
+        rrf_k=args.rrf_k
+    )
+    for document in corpus["documents"]:
+        units = (
+            {"page": 1, "paragraph": para_num, "text": paragraph}
+            for para_num, paragraph in enumerate(document["text"].split("\n\n"), 1)
+        )
+        service.add_document({"doc_id": document["doc_id"], "content": list(chunker.chunk(units, paged=False))})
+    return service
+
+def evaluate(service: VectorService, queries: List[Dict], mode: str, ks: List[int]) -> Dict:
+    """Recall@k and latency percentiles for one query set in one mode"""
+    hits = {k: 0 for k in ks}
+    latencies = []
+    for query in queries:
+        # Measure the uncached path: both caches would otherwise answer repeated runs
+        service.search_cache.clear()
+        service.query_embedding_cache.clear()
+
+        start = time.perf_counter()
+        results = service.search(query["query"], n_results=max(ks), mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        for k in ks:
+            if any(query["answer"] in result["text"] for result in results[:k]):
+                hits[k] += 1
+
+    return {
+        **{f"recall@{k}": round(hits[k] / len(queries), 4) for k in ks},
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--budget-ms", type=float, default=settings.LEXICAL_BUDGET_MS)
+    parser.add_argument("--rrf-k", type=int, default=settings.RRF_K)
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.docs, args.paragraphs, seed=args.seed)
+    chunker = TextChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, args.model)
+    ks = [1, 5, 10]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        service = build_index(corpus, chunker, workdir, args)
+        index_seconds = time.perf_counter() - start
+
+        results = []
+        for query_set in ("queries", "lookups"):
+            for mode in SEARCH_MODES:
+                results.append({
+                    "query_set": query_set,
+                    "mode": mode,
+                    **evaluate(service, corpus[query_set], mode, ks)
+                })
+
+        report = {
+            "config": vars(args),
+            "chunks": service.collection.count(),
+            "index_seconds": round(index_seconds, 1),
+            "queries_per_set": len(corpus["queries"]),
+            "lexical_budget_timeouts": service.get_search_stats()["lexical_timeouts"],
+            "results": results
+        }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+VectorService.search latency as the collection grows (10k, 100k, 1M chunks).
+
+Embedding a million real chunks would dominate the run, so the collection is
+filled with random unit vectors and filler text written straight into Chroma
+and the lexical index. Queries are real sentences encoded by the model; only
+the ranking work differs from production, which is what this measures.
+Sizes are reached incrementally in one collection, so each size only pays for
+the chunks added since the previous one.
+
+Run from the backend directory:
+
+    python -m benchmarks.search_benchmark --sizes 10000,100000 --output search.json
+"""
+from typing import Dict, List
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_service import SEARCH_MODES, VectorService
+from benchmarks.common import environment, latency_summary, write_report
+from benchmarks.synthetic_corpus import filler_sentence
+
+# Chroma rejects very large add() calls; stay well under its limit
+INSERT_BATCH = 5000
+CHUNKS_PER_DOC = 50
+
+def fill(service: VectorService, start: int, stop: int, rng: random.Random, np_rng: np.random.Generator):
+    """Insert chunks [start, stop) with random unit embeddings"""
+    dimension = service.embedding_service.dimension
+    for batch_start in range(start, stop, INSERT_BATCH):
+        batch_stop = min(batch_start + INSERT_BATCH, stop)
+        count = batch_stop - batch_start
+
+        vectors = np_rng.standard_normal((count, dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        ids, documents, metadatas = [], [], []
+        for index in range(batch_start, batch_stop):
+            doc_id = f"DOC_{index // CHUNKS_PER_DOC:06d}"
+            paragraph = index % CHUNKS_PER_DOC + 1
+            ids.append(f"{doc_id}_1_{paragraph}")
+            documents.append(" ".join(filler_sentence(rng) for _ in range(3)))
+            metadatas.append({
+                "doc_id": doc_id,
+                "page": 1,
+                "paragraph": paragraph,
+                "chunk_index": -1,
+                "citation": f"Page 1, Para {paragraph}"
+            })
+
+        service.collection.add(ids=ids, embeddings=vectors.tolist(), documents=documents, metadatas=metadatas)
+        if service.lexical_index is not None:
+            by_doc: Dict[str, List] = {}
+            for chunk_id, metadata, text in zip(ids, metadatas, documents):
+                by_doc.setdefault(metadata["doc_id"], []).append((chunk_id, text))
+            for doc_id, chunks in by_doc.items():
+                service.lexical_index.add(doc_id, chunks)
+
+def time_queries(service: VectorService, queries: List[str], mode: str, n_results: int) -> Dict:
+    latencies = []
+    for query in queries:
+        # Measure the full path, not the result or query-embedding caches
+        service.search_cache.clear()
+        service.query_embedding_cache.clear()
+        start = time.perf_counter()
+        service.search(query, n_results=n_results, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(latencies)
+
+def run(sizes=(10000, 100000, 1000000), queries: int = 50, modes=("vector", "hybrid"), n_results: int = 50,
+        seed: int = 7, model: str = settings.EMBEDDING_MODEL) -> Dict:
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    query_texts = [filler_sentence(rng) for _ in range(queries)]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        service = VectorService(
+            os.path.join(workdir, "chroma"),
+            model,
+            lexical_index=LexicalIndex(os.path.join(workdir, "lexical.sqlite3")),
+            lexical_budget=settings.LEXICAL_BUDGET_MS / 1000,
+            rrf_k=settings.RRF_K
+        )
+        # Load the model before timing
+        service.embedding_service.encode(["warm up"])
+
+        indexed = 0
+        for size in sorted(sizes):
+            start = time.perf_counter()
+            fill(service, indexed, size, rng, np_rng)
+            build_seconds = time.perf_counter() - start
+            indexed = size
+
+            results[str(size)] = {
+                "build_seconds": round(build_seconds, 2),
+                "chunks": service.collection.count(),
+                **{mode: time_queries(service, query_texts, mode, n_results) for mode in modes}
+            }
+            results[str(size)]["lexical_timeouts"] = service.get_search_stats().get("lexical_timeouts", 0)
+
+    return {
+        "config": {"sizes": list(sizes), "queries": queries, "modes": list(modes), "n_results": n_results,
+                   "seed": seed, "model": model},
+        "search": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated collection sizes")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--modes", default="vector,hybrid", help=f"Comma-separated subset of {','.join(SEARCH_MODES)}")
+    parser.add_argument("--n-results", type=int, default=settings.RETRIEVAL_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    sizes = tuple(int(size) for size in args.sizes.split(","))
+    report = run(sizes, args.queries, tuple(args.modes.split(",")), args.n_results, args.seed, args.model)
+    write_report({"environment": environment(), **report}, args.output)
+
+if __name__ == "__main__":
+    main()
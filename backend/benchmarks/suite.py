@@ -0,0 +1,75 @@
+"""
+Run the ingest, search and query benchmarks into one JSON report, and
+optionally compare it with an earlier report.
+
+Comparison walks both reports and flags every latency metric (keys ending
+in _ms) that rose, and every throughput metric (keys ending in _per_second)
+that fell, by more than --threshold. The exit status is 1 when anything
+regressed, so the suite can gate CI.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite --quick --output bench.json
+    python -m benchmarks.suite --quick --compare bench.json
+"""
+from typing import Dict, Iterator, List, Tuple
+import argparse
+import json
+import sys
+
+from benchmarks import ingest_benchmark, query_benchmark, search_benchmark
+from benchmarks.common import environment, write_report
+
+def _metrics(report: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """(dotted.path, value) of every numeric leaf"""
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _metrics(value, f"{path}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.1) -> List[Dict]:
+    """Metrics that got worse by more than threshold (a fraction of the baseline)"""
+    previous = dict(_metrics(baseline.get("results", {})))
+    regressions = []
+    for path, value in _metrics(current.get("results", {})):
+        before = previous.get(path)
+        if not before:
+            continue
+        change = (value - before) / before
+        if (path.endswith("_ms") and change > threshold) or (path.endswith("_per_second") and change < -threshold):
+            regressions.append({"metric": path, "baseline": before, "current": value, "change": round(change, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="Small corpora and a 10k/100k search sweep")
+    parser.add_argument("--skip", default="", help="Comma-separated benchmarks to skip: ingest,search,query")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed fractional regression")
+    parser.add_argument("--output", help="Write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    skip = set(filter(None, args.skip.split(",")))
+    results = {}
+    if "ingest" not in skip:
+        results["ingest"] = ingest_benchmark.run(docs=20 if args.quick else 100)
+    if "search" not in skip:
+        results["search"] = search_benchmark.run(sizes=(10000, 100000) if args.quick else (10000, 100000, 1000000))
+    if "query" not in skip:
+        results["query"] = query_benchmark.run(docs=20 if args.quick else 50, requests=100 if args.quick else 500)
+
+    report = {"environment": environment(), "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(baseline, report, args.threshold)
+        report["baseline"] = baseline.get("environment")
+
+    write_report(report, args.output)
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Deterministic synthetic documents with planted facts for benchmarks"""
+from typing import Dict, List
+import random
+
+SUBJECTS = [
+    "procurement", "safety", "licensing", "privacy", "audit", "emissions", "payroll",
+    "maintenance", "tenancy", "insurance", "export", "warranty", "grant", "zoning",
+    "pension", "clinical", "customs", "tariff", "security", "training"
+]
+
+FILLER_WORDS = (
+    "policy committee review annual report section requirement compliance standard board "
+    "member process approval document schedule budget quarter evidence record provision "
+    "authority amendment clause regulation notice hearing schedule obligation filing party "
+    "agreement assessment framework guidance operation facility resource capacity period"
+).split()
+
+LAYOUTS = ("paragraphs", "flattened", "fragmented")
+
+def make_code(rng: random.Random) -> str:
+    """Case-number style identifier, e.g. 2021-CV-04817"""
+    return f"{rng.randint(1990, 2024)}-{rng.choice(['CV', 'CR', 'AP', 'PX', 'RG'])}-{rng.randint(1000, 99999):05d}"
+
+def filler_sentence(rng: random.Random) -> str:
+    words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(8, 22))]
+    return " ".join(words).capitalize() + "."
+
+def generate_corpus(num_docs: int = 100, paragraphs_per_doc: int = 30, facts_per_doc: int = 3, seed: int = 7) -> Dict:
+    """
+    Build documents made of filler paragraphs with a few planted facts.
+
+    Each document uses one of three layouts, mimicking what extraction
+    produces in practice: clean paragraphs, "flattened" text with no blank
+    lines (PDFs that lose paragraph breaks), and "fragmented" text with one
+    short line per paragraph (DOCX-style).
+
+    Returns:
+        {"documents": [{"doc_id", "layout", "text"}],
+         "queries": [{"query", "answer", "doc_id"}],
+         "lookups": [{"query", "answer", "doc_id"}]}
+
+    "queries" are natural-language questions about a planted fact;
+    "lookups" quote the code itself, the way users search for case numbers.
+    """
+    rng = random.Random(seed)
+    documents = []
+    queries = []
+    lookups = []
+
+    for doc_num in range(num_docs):
+        doc_id = f"DOC_{doc_num:05d}"
+        layout = LAYOUTS[doc_num % len(LAYOUTS)]
+
+        paragraphs: List[List[str]] = [
+            [filler_sentence(rng) for _ in range(rng.randint(2, 7))]
+            for _ in range(paragraphs_per_doc)
+        ]
+
+        for _ in range(facts_per_doc):
+            subject = f"{rng.choice(SUBJECTS)} {rng.choice(SUBJECTS)}"
+            code = make_code(rng)
+            paragraph = rng.choice(paragraphs)
+            paragraph.insert(rng.randint(0, len(paragraph)), f"The {subject} case number for {doc_id} is {code}.")
+            queries.append({
+                "query": f"What is the {subject} case number for {doc_id}?",
+                "answer": code,
+                "doc_id": doc_id
+            })
+            lookups.append({
+                "query": f"Which matter is case {code}?",
+                "answer": code,
+                "doc_id": doc_id
+            })
+
+        if layout == "paragraphs":
+            text = "\n\n".join(" ".join(sentences) for sentences in paragraphs)
+        elif layout == "flattened":
+            text = " ".join(" ".join(sentences) for sentences in paragraphs)
+        else:
+            text = "\n\n".join(sentence for sentences in paragraphs for sentence in sentences)
+
+        documents.append({"doc_id": doc_id, "layout": layout, "text": text})
+
+    return {"documents": documents, "queries": queries, "lookups": lookups}
@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import os
+
+import pytest
+
+from app.services import llm_cache
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_providers import FakeLLMProvider
+from app.services.llm_service import LLMService
+
+CHUNKS = [
+    {"doc_id": "DOC_a", "text": "Invoices are due within thirty days.", "citation": "Page 1, Para 1", "page": 1, "paragraph": 1},
+    {"doc_id": "DOC_a", "text": "Late payments accrue two percent interest.", "citation": "Page 1, Para 2", "page": 1, "paragraph": 2}
+]
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(os.path.join(tmp_path, "llm_cache.db"))
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time() for the cache, so access order never ties"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+def make_service(cache, json_shape="clean"):
+    return LLMService(FakeLLMProvider(latency=0.0, latency_jitter=0.0, json_shape=json_shape), cache=cache)
+
+def test_key_depends_on_model_and_prompt():
+    key = LLMResponseCache.make_key("model-a", "prompt")
+    assert key == LLMResponseCache.make_key("model-a", "prompt")
+    assert key != LLMResponseCache.make_key("model-b", "prompt")
+    assert key != LLMResponseCache.make_key("model-a", "prompt.")
+    # The separator keeps (model, prompt) pairs from running into each other
+    assert LLMResponseCache.make_key("ab", "c") != LLMResponseCache.make_key("a", "bc")
+
+def test_repeated_prompt_is_answered_from_cache(cache):
+    service = make_service(cache)
+    first = service.extract_answer_from_document("When are invoices due?", CHUNKS)
+    second = service.extract_answer_from_document("When are invoices due?", CHUNKS)
+
+    assert first == second
+    assert service.provider.calls == 1
+    assert cache.get_stats()["hits"] == 1
+
+    service.extract_answer_from_document("What is the late fee?", CHUNKS)
+    assert service.provider.calls == 2
+
+def test_other_model_does_not_share_entries(cache):
+    make_service(cache, json_shape="clean").extract_answer_from_document("When are invoices due?", CHUNKS)
+    other = make_service(cache, json_shape="fenced")
+    other.extract_answer_from_document("When are invoices due?", CHUNKS)
+    assert other.provider.calls == 1
+
+def test_evicts_least_recently_used_by_bytes(tmp_path, clock):
+    cache = LLMResponseCache(os.path.join(tmp_path, "llm_cache.db"), max_bytes=250)
+    cache.put("a", "x" * 100, ["DOC_a"])
+    cache.put("b", "y" * 100, ["DOC_b"])
+    assert cache.get("a") is not None  # "b" is now the least recently used
+
+    cache.put("c", "z" * 100, ["DOC_c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 100
+    assert cache.get("c") == "z" * 100
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["size_bytes"] == 200
+
+def test_response_larger_than_budget_is_not_kept(tmp_path):
+    cache = LLMResponseCache(os.path.join(tmp_path, "llm_cache.db"), max_bytes=50)
+    cache.put("big", "x" * 100, [])
+    assert cache.get("big") is None
+
+def test_invalidate_documents_cascades_to_doc_links(cache):
+    cache.put("ab", "both", ["DOC_a", "DOC_b"])
+    cache.put("b", "b only", ["DOC_b"])
+    cache.put("c", "c only", ["DOC_c"])
+
+    assert cache.invalidate_documents(["DOC_b"]) == 2
+
+    assert cache.get("ab") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == "c only"
+    links = cache._connect().execute("SELECT key, doc_id FROM response_docs ORDER BY key").fetchall()
+    assert [tuple(row) for row in links] == [("c", "DOC_c")]
+
+def test_invalidate_nothing(cache):
+    cache.put("c", "c only", ["DOC_c"])
+    assert cache.invalidate_documents([]) == 0
+    assert cache.invalidate_documents(["DOC_missing"]) == 0
+    assert cache.get("c") == "c only"
+
+def test_unparseable_responses_are_not_cached(cache):
+    service = make_service(cache, json_shape="invalid")
+    service.extract_answer_from_document("When are invoices due?", CHUNKS)
+    service.extract_answer_from_document("When are invoices due?", CHUNKS)
+
+    assert service.provider.calls == 2
+    assert cache.get_stats()["entries"] == 0
+
+def test_unparseable_responses_are_not_cached_async(cache):
+    service = make_service(cache, json_shape="invalid")
+
+    async def ask_twice():
+        for _ in range(2):
+            await service.aextract_answer_from_document("When are invoices due?", CHUNKS)
+
+    asyncio.run(ask_twice())
+    assert service.provider.calls == 2
+    assert cache.get_stats()["entries"] == 0
+
+def test_wrapped_json_is_cached(cache):
+    # Fenced JSON still parses, so it is a valid response worth replaying
+    service = make_service(cache, json_shape="fenced")
+    service.extract_answer_from_document("When are invoices due?", CHUNKS)
+    service.extract_answer_from_document("When are invoices due?", CHUNKS)
+    assert service.provider.calls == 1
+
+def test_batch_missing_a_document_is_not_cached(cache, monkeypatch):
+    service = make_service(cache)
+    batch = {
+        "DOC_a": CHUNKS,
+        "DOC_b": [{**chunk, "doc_id": "DOC_b"} for chunk in CHUNKS]
+    }
+    # Drop one document's answer, as a truncated model response would
+    respond = service.provider._respond
+    monkeypatch.setattr(
+        service.provider, "_respond",
+        lambda prompt: {"answers": respond(prompt)["answers"][:1]} if '"answers": [' in prompt else respond(prompt)
+    )
+
+    async def ask():
+        return await service.aextract_answers_batch("When are invoices due?", batch)
+
+    answers = dict(asyncio.run(ask()))
+    assert set(answers) == {"DOC_a", "DOC_b"}
+    batch_key = LLMResponseCache.make_key(service.model_name, service._build_batch_prompt("When are invoices due?", batch))
+    assert cache.get(batch_key) is None
+    # Only DOC_b's own fallback call was cached
+    assert cache.get_stats()["entries"] == 1